@@ -13,6 +13,7 @@ from sqlalchemy import func
 import streamlit as st
 
 from config.database import get_db
+from components.figure_cache import cached_figure
 from database.models import (
     ServiceRequest, TestExecution, Equipment,
     EquipmentBooking, TestStatus, RequestStatus
@@ -224,8 +225,12 @@ def create_protocol_distribution_chart() -> go.Figure:
     Returns:
         Plotly figure
     """
-    data = get_protocol_distribution()
+    return _build_protocol_distribution_chart(get_protocol_distribution())
 
+
+@cached_figure
+def _build_protocol_distribution_chart(data: Dict[str, int]) -> go.Figure:
+    """Build the protocol distribution chart (cached by data fingerprint)"""
     fig = go.Figure(data=[go.Pie(
         labels=list(data.keys()),
         values=list(data.values()),
@@ -251,8 +256,13 @@ def create_monthly_trend_chart() -> go.Figure:
     Returns:
         Plotly figure
     """
-    df = get_monthly_test_trend(6)
+    # Only plotted columns are passed so the volatile 'date' column does not defeat the cache
+    return _build_monthly_trend_chart(get_monthly_test_trend(6)[['month', 'tests']])
+
 
+@cached_figure
+def _build_monthly_trend_chart(df: pd.DataFrame) -> go.Figure:
+    """Build the monthly trend chart (cached by data fingerprint)"""
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -282,8 +292,12 @@ def create_equipment_utilization_chart() -> go.Figure:
     Returns:
         Plotly figure
     """
-    df = get_equipment_utilization_data()
+    return _build_equipment_utilization_chart(get_equipment_utilization_data())
 
+
+@cached_figure
+def _build_equipment_utilization_chart(df: pd.DataFrame) -> go.Figure:
+    """Build the equipment utilization chart (cached by data fingerprint)"""
     fig = px.bar(
         df,
         x='equipment',
@@ -313,8 +327,12 @@ def create_success_rate_chart() -> go.Figure:
     Returns:
         Plotly figure
     """
-    success_rate = get_test_success_rate()
+    return _build_success_rate_chart(get_test_success_rate())
+
 
+@cached_figure
+def _build_success_rate_chart(success_rate: Dict[str, float]) -> go.Figure:
+    """Build the success rate chart (cached by data fingerprint)"""
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
         value=success_rate['passed'],
@@ -0,0 +1,203 @@
+"""
+Bifacial - BIFI-001 bifaciality, bifacial gain and equivalent irradiance
+========================================================================
+Computes the bifaciality coefficients of IEC TS 60904-1-2 from single-side
+I-V measurements (front side with the rear covered, rear side with the
+front covered), the bifacial gain of double-side illuminated measurements
+and the equivalent irradiance of every measurement:
+
+    φ_Isc = (Isc_r / G_r) / (Isc_f / G_f)
+    φ_Pmax = (Pmax_r / G_r) / (Pmax_f / G_f)
+    φ_Voc = Voc_r / Voc_f
+    φ = min(φ_Isc, φ_Pmax)
+    G_E = G_f + φ · G_r
+
+Each measurement in raw_data['measurements'] carries 'front_irradiance'
+and 'rear_irradiance' (W/m²) with either I-V arrays or extracted
+parameters; the side is inferred from which irradiance is non-zero. All
+curves of all executions analyzed together are extracted in one batch and
+the coefficients of every execution are grouped sums over that batch.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from components.iv_analysis import measurement_parameters
+from config.database import get_db
+from database.models import TestExecution, TestProtocol
+
+
+PROTOCOL_ID = 'BIFI-001'
+
+MEASUREMENT_FIELDS = ('front_irradiance', 'rear_irradiance', 'irradiance')
+
+
+def _group_mean(values: np.ndarray, mask: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Mean of the finite masked values per group (NaN for empty groups)"""
+    use = mask & np.isfinite(values)
+    sums = np.bincount(groups[use], weights=values[use], minlength=n_groups)
+    counts = np.bincount(groups[use], minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def analyze_bifacial(
+    measurements: List[Dict[str, Any]],
+    groups: Sequence[int] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Bifaciality coefficients per group and equivalent irradiance per measurement
+
+    Args:
+        measurements: BIFI-001 measurement dictionaries
+        groups: Group index per measurement, e.g. the execution it belongs
+            to (defaults to a single group)
+
+    Returns:
+        Tuple of (coefficients, measurements) DataFrames:
+        coefficients has one row per group with phi_isc, phi_voc, phi_pmax,
+        bifaciality, front_pmax_stc and the curve counts per side;
+        measurements has one row per measurement with group, side,
+        front_irradiance, rear_irradiance, equivalent_irradiance, isc, voc,
+        pmax and bifacial_gain (double-side measurements only)
+    """
+    n = len(measurements)
+    groups = np.zeros(n, dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+    n_groups = int(groups.max()) + 1 if n else 0
+
+    columns = measurement_parameters(measurements, MEASUREMENT_FIELDS)
+    front = np.where(
+        np.isfinite(columns['front_irradiance']), columns['front_irradiance'], columns['irradiance']
+    )
+    front = np.nan_to_num(front)
+    rear = np.nan_to_num(columns['rear_irradiance'])
+
+    front_only = (front > 0) & (rear <= 0)
+    rear_only = (front <= 0) & (rear > 0)
+    both = (front > 0) & (rear > 0)
+    side = np.select([front_only, rear_only, both], ['front', 'rear', 'bifacial'], 'none')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Isc and Pmax per unit irradiance of each single-side curve
+        isc_front = _group_mean(columns['isc'] / front, front_only, groups, n_groups)
+        pmax_front = _group_mean(columns['pmax'] / front, front_only, groups, n_groups)
+        isc_rear = _group_mean(columns['isc'] / rear, rear_only, groups, n_groups)
+        pmax_rear = _group_mean(columns['pmax'] / rear, rear_only, groups, n_groups)
+
+        phi_isc = isc_rear / isc_front
+        phi_pmax = pmax_rear / pmax_front
+        phi_voc = (
+            _group_mean(columns['voc'], rear_only, groups, n_groups)
+            / _group_mean(columns['voc'], front_only, groups, n_groups)
+        )
+    bifaciality = np.fmin(phi_isc, phi_pmax)
+
+    phi = bifaciality[groups] if n else np.zeros(0)
+    equivalent = front + np.where(np.isfinite(phi), phi, np.nan) * rear
+    equivalent = np.where(rear > 0, equivalent, front)
+
+    # Gain over the front-only power at the same front irradiance
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gain = columns['pmax'] / (pmax_front[groups] * front) - 1 if n else np.zeros(0)
+    gain = np.where(both, gain, np.nan)
+
+    coefficients = pd.DataFrame({
+        'phi_isc': phi_isc,
+        'phi_voc': phi_voc,
+        'phi_pmax': phi_pmax,
+        'bifaciality': bifaciality,
+        'front_pmax_stc': pmax_front * 1000,
+        'n_front': np.bincount(groups[front_only], minlength=n_groups),
+        'n_rear': np.bincount(groups[rear_only], minlength=n_groups),
+        'n_bifacial': np.bincount(groups[both], minlength=n_groups)
+    })
+
+    table = pd.DataFrame({
+        'group': groups,
+        'side': side,
+        'front_irradiance': front,
+        'rear_irradiance': rear,
+        'equivalent_irradiance': equivalent,
+        'isc': columns['isc'],
+        'voc': columns['voc'],
+        'pmax': columns['pmax'],
+        'bifacial_gain': gain
+    })
+
+    return coefficients, table
+
+
+def analyze_executions(
+    test_execution_ids: Sequence[int] = None,
+    service_request_id: int = None,
+    save: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Bifaciality of BIFI-001 executions in one batch
+
+    Pass a service request to analyze every module of a shipment. The
+    measurements of all executions are extracted together; results are
+    stored in processed_data['bifacial'].
+
+    Args:
+        test_execution_ids: Executions to analyze
+        service_request_id: Analyze all BIFI-001 executions of this request
+        save: Write the results back to the executions
+
+    Returns:
+        DataFrame of coefficients with test_execution_id and sample_id
+        columns, or None on error
+    """
+    try:
+        with get_db() as db:
+            query = db.query(TestExecution)
+            if service_request_id is not None:
+                query = query.join(
+                    TestProtocol, TestExecution.protocol_id == TestProtocol.id
+                ).filter(
+                    TestExecution.service_request_id == service_request_id,
+                    TestProtocol.protocol_id == PROTOCOL_ID
+                )
+            if test_execution_ids is not None:
+                query = query.filter(TestExecution.id.in_(list(test_execution_ids)))
+
+            tests = [
+                test for test in query.order_by(TestExecution.id).all()
+                if test.raw_data and test.raw_data.get('measurements')
+            ]
+            if not tests:
+                return None
+
+            measurements, groups = [], []
+            for position, test in enumerate(tests):
+                measurements.extend(test.raw_data['measurements'])
+                groups.extend([position] * len(test.raw_data['measurements']))
+
+            coefficients, table = analyze_bifacial(measurements, groups)
+            coefficients.insert(0, 'test_execution_id', [test.id for test in tests])
+            coefficients.insert(1, 'sample_id', [test.sample_id for test in tests])
+
+            if save:
+                for position, test in enumerate(tests):
+                    summary = coefficients.iloc[position].drop(['test_execution_id', 'sample_id'])
+                    rows = table[table['group'] == position].drop(columns='group')
+
+                    processed = dict(test.processed_data or {})
+                    processed['bifacial'] = {
+                        **{
+                            key: None if pd.isna(value) else (
+                                int(value) if key.startswith('n_') else float(value)
+                            )
+                            for key, value in summary.items()
+                        },
+                        'measurements': rows.replace({np.nan: None}).to_dict('records')
+                    }
+                    test.processed_data = processed
+
+        return coefficients
+
+    except Exception as e:
+        print(f"Error analyzing bifaciality: {e}")
+        return None
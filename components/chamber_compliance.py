@@ -0,0 +1,332 @@
+"""
+Chamber Compliance - Incremental setpoint/tolerance checking for HF/DH chambers
+===============================================================================
+Evaluates TestData rows against their setpoint and tolerance and folds
+them into per-series running totals. Contiguous out-of-tolerance runs are
+stored as ChamberExcursion rows.
+
+Only rows appended since the last check are read. The running totals and
+any excursion still open at the end of the data are kept in
+processed_data['chamber_compliance'][measurement_type].
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert
+
+from config.database import get_db
+from config.settings import config
+from database.models import ChamberExcursion, TestData, TestExecution
+
+
+@dataclass
+class ComplianceState:
+    """Running compliance totals of one series"""
+    last_id: int = 0  # Last TestData id folded in
+    last_time: Optional[str] = None  # ISO timestamp of the last sample
+    last_status: int = 0  # 1 above, -1 below, 0 within tolerance
+    samples: int = 0
+    evaluated_seconds: float = 0.0
+    out_of_spec_seconds: float = 0.0
+    gap_seconds: float = 0.0  # Intervals longer than the gap limit (not judged)
+    excursion_count: int = 0
+    longest_excursion_seconds: float = 0.0
+    max_deviation: float = 0.0  # Largest distance beyond a tolerance limit
+    open_start: Optional[str] = None  # Start of an excursion still in progress
+    open_peak: float = 0.0
+    open_samples: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ComplianceState':
+        return cls(**data) if data else cls()
+
+
+def _to_ns(value: Optional[str]) -> Optional[int]:
+    return pd.Timestamp(value).value if value else None
+
+
+def _from_ns(value: int) -> datetime:
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def fold_samples(
+    state: ComplianceState,
+    times_ns: np.ndarray,
+    values: np.ndarray,
+    setpoints: np.ndarray,
+    tolerances: np.ndarray,
+    max_gap_seconds: float = None
+) -> List[Dict[str, Any]]:
+    """
+    Fold new samples into a compliance state
+
+    Each interval between consecutive samples takes the status of the
+    earlier sample; the interval from the previous batch's last sample to
+    the first new one is included, so batches join seamlessly.
+
+    Args:
+        state: Running state (updated in place)
+        times_ns: Sample times as int64 nanoseconds (ascending, after state.last_time)
+        values: Measured values
+        setpoints: Setpoint per sample
+        tolerances: Tolerance per sample
+        max_gap_seconds: Longer intervals count as data gaps
+
+    Returns:
+        Excursions closed by these samples (start_time, end_time,
+        duration_seconds, sample_count, direction, peak_deviation)
+    """
+    max_gap_seconds = max_gap_seconds or config.CHAMBER_MAX_GAP_SECONDS
+    n = len(times_ns)
+    if n == 0:
+        return []
+
+    deviation = values - setpoints
+    excess = np.abs(deviation) - tolerances
+    status = np.where(excess > 0, np.sign(deviation), 0).astype(np.int8)
+    excess = np.clip(excess, 0, None)
+
+    # Prepend the carried-over last sample of the previous batch
+    carried = state.last_time is not None
+    if carried:
+        times_ns = np.r_[_to_ns(state.last_time), times_ns]
+        status = np.r_[np.int8(state.last_status), status]
+        excess = np.r_[state.open_peak, excess]
+
+    dt = np.diff(times_ns) / 1e9
+    gap = dt > max_gap_seconds
+    judged = ~gap
+    out = status[:-1] != 0
+
+    state.samples += n
+    state.evaluated_seconds += float(dt[judged].sum())
+    state.out_of_spec_seconds += float(dt[judged & out].sum())
+    state.gap_seconds += float(dt[gap].sum())
+    state.max_deviation = max(state.max_deviation, float(excess.max()))
+
+    # Run-length encode the status
+    starts = np.flatnonzero(np.r_[True, status[1:] != status[:-1]])
+    run_status = status[starts]
+    ends = np.r_[starts[1:], len(status)]  # Exclusive
+    run_peak = np.maximum.reduceat(excess, starts)
+
+    closed = []
+    for k in np.flatnonzero(run_status != 0):
+        start, end = starts[k], ends[k]
+        samples = end - start
+        start_ns = times_ns[start]
+        peak = float(run_peak[k])
+
+        if carried and start == 0 and state.open_start is not None:
+            # Continuation of the excursion open at the end of the last batch
+            start_ns = _to_ns(state.open_start)
+            samples += state.open_samples - 1
+            peak = max(peak, state.open_peak)
+
+        if end == len(status):
+            state.open_start = _from_ns(start_ns).isoformat()
+            state.open_peak = peak
+            state.open_samples = int(samples)
+            continue
+
+        duration = (times_ns[end] - start_ns) / 1e9
+        closed.append({
+            'start_time': _from_ns(start_ns),
+            'end_time': _from_ns(times_ns[end]),
+            'duration_seconds': float(duration),
+            'sample_count': int(samples),
+            'direction': 'high' if run_status[k] > 0 else 'low',
+            'peak_deviation': peak
+        })
+        state.excursion_count += 1
+        state.longest_excursion_seconds = max(state.longest_excursion_seconds, float(duration))
+
+    if status[-1] == 0:
+        state.open_start = None
+        state.open_peak = 0.0
+        state.open_samples = 0
+
+    state.last_time = _from_ns(times_ns[-1]).isoformat()
+    state.last_status = int(status[-1])
+
+    return closed
+
+
+def update_compliance(
+    test_execution_id: int,
+    measurement_types: Sequence[str] = None,
+    db=None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fold TestData rows appended since the last check into the compliance state
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_types: Series to check (defaults to every series with
+            setpoints)
+        db: Existing session to use (a new one is opened otherwise)
+
+    Returns:
+        Updated state per measurement type
+    """
+    if db is None:
+        with get_db() as session:
+            return update_compliance(test_execution_id, measurement_types, db=session)
+
+    test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+    if test is None:
+        return {}
+
+    if measurement_types is None:
+        measurement_types = [row[0] for row in db.query(TestData.measurement_type).filter(
+            TestData.test_execution_id == test_execution_id,
+            TestData.setpoint.isnot(None)
+        ).distinct().all()]
+
+    processed = dict(test.processed_data or {})
+    states = dict(processed.get('chamber_compliance', {}))
+    batch_size = config.CHAMBER_COMPLIANCE_BATCH_SIZE
+
+    for measurement_type in measurement_types:
+        state = ComplianceState.from_dict(states.get(measurement_type))
+
+        while True:
+            rows = db.query(
+                TestData.id, TestData.timestamp, TestData.value,
+                TestData.setpoint, TestData.tolerance
+            ).filter(
+                TestData.test_execution_id == test_execution_id,
+                TestData.measurement_type == measurement_type,
+                TestData.id > state.last_id,
+                TestData.is_valid == True
+            ).order_by(TestData.id).limit(batch_size).all()
+
+            if not rows:
+                break
+
+            ids, timestamps, values, setpoints, tolerances = zip(*rows)
+            state.last_id = int(ids[-1])
+
+            times_ns = pd.to_datetime(pd.Series(timestamps)).to_numpy('datetime64[ns]').astype(np.int64)
+            batch = np.column_stack([
+                np.asarray(values, dtype=np.float64),
+                np.asarray(setpoints, dtype=np.float64),
+                np.asarray(tolerances, dtype=np.float64)
+            ])
+
+            # Rows without a value or limits, or older than the state, are not judged
+            order = np.argsort(times_ns, kind='stable')
+            times_ns, batch = times_ns[order], batch[order]
+            keep = np.all(np.isfinite(batch), axis=1)
+            if state.last_time is not None:
+                keep &= times_ns > _to_ns(state.last_time)
+
+            excursions = fold_samples(state, times_ns[keep], *batch[keep].T)
+
+            if excursions:
+                db.execute(insert(ChamberExcursion), [
+                    dict(excursion, test_execution_id=test_execution_id,
+                         measurement_type=measurement_type)
+                    for excursion in excursions
+                ])
+
+            if len(rows) < batch_size:
+                break
+
+        states[measurement_type] = asdict(state)
+
+    processed['chamber_compliance'] = states
+    test.processed_data = processed
+    return states
+
+
+def reset_compliance(test_execution_id: int):
+    """Discard compliance state and excursions so the next update starts over"""
+    try:
+        with get_db() as db:
+            db.execute(delete(ChamberExcursion).where(
+                ChamberExcursion.test_execution_id == test_execution_id
+            ))
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            if test is not None and test.processed_data:
+                processed = dict(test.processed_data)
+                processed.pop('chamber_compliance', None)
+                test.processed_data = processed
+    except Exception as e:
+        print(f"Error resetting chamber compliance: {e}")
+
+
+def get_compliance_report(test_execution_id: int, update: bool = True) -> Dict[str, Any]:
+    """
+    Get the excursion report of an execution
+
+    Args:
+        test_execution_id: Test execution ID
+        update: Fold in newly appended data first
+
+    Returns:
+        Dictionary with 'series' (summary per measurement type), 'excursions'
+        (DataFrame of closed excursions) and 'passed'
+    """
+    report = {'series': {}, 'excursions': pd.DataFrame(), 'passed': True}
+    limit = config.CHAMBER_MAX_EXCURSION_SECONDS
+
+    try:
+        with get_db() as db:
+            if update:
+                states = update_compliance(test_execution_id, db=db)
+            else:
+                test = db.query(TestExecution.processed_data).filter(
+                    TestExecution.id == test_execution_id
+                ).first()
+                states = ((test and test[0]) or {}).get('chamber_compliance', {})
+
+            excursions = db.query(
+                ChamberExcursion.measurement_type, ChamberExcursion.start_time,
+                ChamberExcursion.end_time, ChamberExcursion.duration_seconds,
+                ChamberExcursion.sample_count, ChamberExcursion.direction,
+                ChamberExcursion.peak_deviation
+            ).filter(
+                ChamberExcursion.test_execution_id == test_execution_id
+            ).order_by(ChamberExcursion.start_time).all()
+
+        report['excursions'] = pd.DataFrame(excursions, columns=[
+            'measurement_type', 'start_time', 'end_time', 'duration_seconds',
+            'sample_count', 'direction', 'peak_deviation'
+        ])
+
+        for measurement_type, data in states.items():
+            state = ComplianceState.from_dict(data)
+
+            open_seconds = 0.0
+            if state.open_start is not None:
+                open_seconds = (
+                    pd.Timestamp(state.last_time) - pd.Timestamp(state.open_start)
+                ).total_seconds()
+
+            longest = max(state.longest_excursion_seconds, open_seconds)
+            evaluated = state.evaluated_seconds
+            passed = longest <= limit
+
+            report['series'][measurement_type] = {
+                'samples': state.samples,
+                'evaluated_hours': evaluated / 3600,
+                'out_of_spec_minutes': state.out_of_spec_seconds / 60,
+                'in_spec_pct': (1 - state.out_of_spec_seconds / evaluated) * 100 if evaluated else None,
+                'gap_minutes': state.gap_seconds / 60,
+                'excursion_count': state.excursion_count + (state.open_start is not None),
+                'longest_excursion_minutes': longest / 60,
+                'max_deviation': state.max_deviation,
+                'open_excursion_since': state.open_start,
+                'passed': passed
+            }
+            report['passed'] = report['passed'] and passed
+
+    except Exception as e:
+        print(f"Error building compliance report: {e}")
+
+    return report
@@ -0,0 +1,666 @@
+"""
+Crack Detection - Cell-level EL image analysis for CRACK-001
+============================================================
+Splits electroluminescence images of modules into cells along the dark
+inter-cell gaps and classifies every cell into the crack modes of
+IEC TS 60904-13: A (crack without isolated area), B (partly isolated,
+darker area) and C (electrically inactive area).
+
+Images are memory-mapped (see utils.images) and cells are processed in
+bands of cell rows by a process pool, so whole shipments can be analyzed
+in one batch. The classical classifier needs only NumPy; a small ONNX
+model can be used instead when onnxruntime is installed.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.database import get_db
+from config.settings import config
+from database.models import TestExecution
+from utils.images import array_path, box_filter, load_image
+
+
+# Crack modes by code stored in the defect maps
+CRACK_MODES = ('none', 'A', 'B', 'C')
+
+# Cells smaller than this many are classified in-process; pool startup costs more
+POOL_MIN_CELLS = 48
+
+# Fraction of each cell edge ignored (gap shadow and grid misalignment)
+CELL_MARGIN = 0.03
+
+# ONNX sessions of this process by model path
+_onnx_sessions: Dict[str, Any] = {}
+
+
+@dataclass
+class CellDefectMap:
+    """Per-cell crack classification of one EL image"""
+    image: str
+    row_edges: np.ndarray  # Pixel rows of the cell boundaries (rows + 1)
+    column_edges: np.ndarray  # Pixel columns of the cell boundaries (columns + 1)
+    modes: np.ndarray  # Crack mode code per cell (index into CRACK_MODES)
+    crack_fraction: np.ndarray  # Fraction of cell pixels on crack lines
+    inactive_fraction: np.ndarray  # Fraction of cell area below EL_INACTIVE_LEVEL
+    degraded_fraction: np.ndarray  # Fraction of cell area between the two levels
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.modes.shape
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the map in CRACK-001 result fields
+
+        power_loss is an area-based estimate: the inactive share of the
+        active cell area plus half of the partly isolated share.
+
+        Returns:
+            Dictionary with crack_count, crack_classification,
+            critical_cracks, inactive_area_pct and power_loss
+        """
+        counts = np.bincount(self.modes.ravel(), minlength=len(CRACK_MODES))
+        lost = self.inactive_fraction + 0.5 * self.degraded_fraction
+
+        return {
+            'cells': int(self.modes.size),
+            'crack_count': int(self.modes.size - counts[0]),
+            'crack_classification': {mode: int(counts[i]) for i, mode in enumerate(CRACK_MODES[1:], 1)},
+            'critical_cracks': int(counts[CRACK_MODES.index('C')]),
+            'inactive_area_pct': float(self.inactive_fraction.mean() * 100),
+            'power_loss': float(lost.mean() * 100)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Map as a JSON-serializable dictionary"""
+        return {
+            'image': self.image,
+            'row_edges': self.row_edges.tolist(),
+            'column_edges': self.column_edges.tolist(),
+            'modes': self.modes.tolist(),
+            'crack_fraction': np.round(self.crack_fraction, 4).tolist(),
+            'inactive_fraction': np.round(self.inactive_fraction, 4).tolist(),
+            'degraded_fraction': np.round(self.degraded_fraction, 4).tolist(),
+            'summary': self.summary()
+        }
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """One row per cell with its position, mode and area fractions"""
+        rows, columns = np.indices(self.shape)
+        return pd.DataFrame({
+            'row': rows.ravel() + 1,
+            'column': columns.ravel() + 1,
+            'mode': np.asarray(CRACK_MODES)[self.modes.ravel()],
+            'crack_fraction': self.crack_fraction.ravel(),
+            'inactive_fraction': self.inactive_fraction.ravel(),
+            'degraded_fraction': self.degraded_fraction.ravel()
+        })
+
+
+def _smooth_profile(profile: np.ndarray, count: int) -> np.ndarray:
+    """Box-smooth a brightness profile over a small fraction of a cell"""
+    width = max(1, len(profile) // (count * 50))
+    return np.convolve(profile, np.ones(width) / width, mode='same')
+
+
+def _snap_to_gaps(
+    smooth: np.ndarray,
+    nominal: np.ndarray,
+    window: int,
+    bright: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Snap boundaries to the centre of the dark gap run near each nominal position
+
+    The gap is the run of samples below half-way between the darkest
+    sample and the bright level; snapping to its centre rather than to the
+    darkest sample keeps flat gap plateaus from pulling the boundary to
+    one side. Without a dip below half the bright level the darkest sample
+    is used and no gap band is reported.
+
+    Args:
+        smooth: Smoothed brightness profile
+        nominal: Nominal boundary positions
+        window: Search half-width around each nominal position
+        bright: Bright (cell) level of the profile
+
+    Returns:
+        Tuple of (boundary positions, gap half-widths)
+    """
+    offsets = np.arange(-window, window + 1)
+    candidates = np.clip(nominal[:, None] + offsets, 0, len(smooth) - 1)
+    values = smooth[candidates]
+    darkest = np.argmin(values, axis=1)[:, None]
+    lowest = np.take_along_axis(values, darkest, axis=1)
+
+    below = values <= (lowest + bright) / 2
+    index = np.arange(len(offsets))[None, :]
+    first = np.where(~below & (index < darkest), index, -1).max(axis=1) + 1
+    last = np.where(~below & (index > darkest), index, len(offsets)).min(axis=1) - 1
+
+    is_gap = lowest[:, 0] < 0.5 * bright
+    rows = np.arange(len(nominal))
+    centres = np.where(
+        is_gap,
+        (candidates[rows, first] + candidates[rows, last]) / 2,
+        candidates[rows, darkest[:, 0]]
+    )
+    half_widths = np.where(is_gap, np.ceil((last - first + 1) / 2), 0)
+
+    return np.round(centres).astype(np.int64), half_widths.astype(np.int64)
+
+
+def _grid_edges(profile: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Locate count + 1 cell boundaries and their gap half-widths along a brightness profile"""
+    smooth = _smooth_profile(profile, count)
+
+    # Module extent: where the profile reaches a fraction of the bright level
+    bright = np.percentile(smooth, 95)
+    inside = np.flatnonzero(smooth > 0.3 * bright)
+    start, stop = int(inside[0]), int(inside[-1]) + 1
+    pitch = (stop - start) / count
+
+    window = max(1, int(pitch * 0.15))
+    nominal = np.round(start + pitch * np.arange(1, count)).astype(np.int64)
+    gaps, half_widths = _snap_to_gaps(smooth, nominal, window, bright)
+
+    return np.r_[start, gaps, stop].astype(np.int64), np.r_[0, half_widths, 0].astype(np.int64)
+
+
+def _detect_grid(image: np.ndarray, rows: int, columns: int) -> Tuple[Tuple[np.ndarray, np.ndarray], ...]:
+    """Cell boundaries and gap half-widths: ((row_edges, row_gaps), (column_edges, column_gaps))"""
+    step = max(1, min(image.shape) // 500)
+    column_profile = image[::step, :].mean(axis=0, dtype=np.float64)
+    row_profile = image[:, ::step].mean(axis=1, dtype=np.float64)
+    return _grid_edges(row_profile, rows), _grid_edges(column_profile, columns)
+
+
+def detect_cell_grid(
+    image: np.ndarray,
+    rows: int = None,
+    columns: int = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detect the cell grid of a module EL image
+
+    Cell counts are given (or come from config); the module extent and each
+    boundary (the centre of its dark gap) are located on the row and column
+    brightness profiles. The grid is axis-aligned: a tilted module is not
+    followed (see check_grid_tilt).
+
+    Args:
+        image: 2-D EL image
+        rows: Cell rows in the image
+        columns: Cell columns in the image
+
+    Returns:
+        Tuple of (row_edges, column_edges) pixel positions
+    """
+    (row_edges, _), (column_edges, _) = _detect_grid(
+        image, rows or config.EL_CELL_ROWS, columns or config.EL_CELL_COLUMNS
+    )
+    return row_edges, column_edges
+
+
+def check_grid_tilt(
+    image: np.ndarray,
+    row_edges: np.ndarray,
+    column_edges: np.ndarray
+) -> float:
+    """
+    Check that a module is straight enough for its axis-aligned cell grid
+
+    The column gaps are located again in the top and bottom thirds of the
+    module (and the row gaps in its left and right thirds); their drift
+    gives the tilt. A tilt is tolerated while the boundaries move by less
+    than half the cell margin (CELL_MARGIN) at the module ends; beyond
+    that the drifting gap shadow reads as partly isolated area.
+
+    Args:
+        image: 2-D EL image
+        row_edges: Cell row boundaries
+        column_edges: Cell column boundaries
+
+    Returns:
+        Estimated tilt in degrees
+
+    Raises:
+        ValueError: If the module is too tilted for the grid
+    """
+    step = max(1, min(image.shape) // 500)
+    tilts = []
+
+    for axis, (edges, across) in enumerate(((column_edges, row_edges), (row_edges, column_edges))):
+        count = len(edges) - 1
+        if count < 2:
+            continue
+
+        # Profiles along this axis in the first and last third of the module
+        pitch = (edges[-1] - edges[0]) / count
+        third = (across[-1] - across[0]) // 3
+        bands = [(across[0], across[0] + third), (across[-1] - third, across[-1])]
+        positions = []
+        for first, last in bands:
+            band = image[first:last:step, :] if axis == 0 else image[:, first:last:step].T
+            smooth = _smooth_profile(band.mean(axis=0, dtype=np.float64), count)
+            gap_positions, _ = _snap_to_gaps(
+                smooth, edges[1:-1], max(1, int(pitch * 0.15)), np.percentile(smooth, 95)
+            )
+            positions.append(gap_positions)
+
+        distance = (bands[1][0] + bands[1][1] - bands[0][0] - bands[0][1]) / 2
+        slope = float(np.median(positions[1] - positions[0])) / distance
+        tilts.append(np.degrees(np.arctan(slope)) * (-1 if axis == 1 else 1))
+
+        # Boundary offset at the module ends against the cell margin
+        offset = abs(slope) * (across[-1] - across[0]) / 2
+        allowed = 0.5 * CELL_MARGIN * pitch
+        if offset > allowed:
+            limit = np.degrees(np.arctan(allowed / ((across[-1] - across[0]) / 2)))
+            raise ValueError(
+                f"Module is tilted by about {abs(tilts[-1]):.2f}° (the axis-aligned cell grid "
+                f"tolerates {limit:.2f}° here); deskew the EL image first"
+            )
+
+    return float(np.mean(tilts)) if tilts else 0.0
+
+
+def cell_features(cell: np.ndarray, reference: float, parameters: Dict[str, float]) -> Tuple[float, float, float]:
+    """
+    Compute crack and inactive-area fractions of one cell
+
+    Busbars and fingers are removed as the median row and column profiles;
+    what remains darker than its surroundings by the crack contrast are
+    crack lines. Area levels are judged on a smoothed image relative to the
+    module reference brightness.
+
+    Args:
+        cell: Cell pixels (any numeric dtype)
+        reference: Module reference brightness (bright-cell level)
+        parameters: Classifier thresholds (see _classifier_parameters)
+
+    Returns:
+        Tuple of (crack_fraction, inactive_fraction, degraded_fraction)
+    """
+    height, width = cell.shape
+    margin_rows, margin_columns = int(height * CELL_MARGIN), int(width * CELL_MARGIN)
+    cell = cell[margin_rows:height - margin_rows, margin_columns:width - margin_columns]
+
+    norm = cell.astype(np.float32)
+    norm *= np.float32(1.0 / reference)
+    height, width = norm.shape
+
+    column_profile = np.median(norm[::4], axis=0)
+    row_profile = np.median(norm[:, ::4], axis=1)
+    flat = norm - (column_profile - np.median(column_profile))[None, :]
+    flat -= (row_profile - np.median(row_profile))[:, None]
+
+    # Smoothed brightness on a half-resolution grid, expanded back
+    def smoothed(image):
+        small = box_filter(image[::2, ::2], max(3, min(height, width) // 32))
+        return small.repeat(2, axis=0)[:height].repeat(2, axis=1)[:, :width]
+
+    local = smoothed(norm)
+    inactive = local < parameters['inactive_level']
+    degraded = ~inactive & (local < parameters['degraded_level'])
+
+    lines = box_filter(flat, 3)
+    lines -= smoothed(flat)
+    cracks = (lines < -parameters['crack_contrast']) & ~inactive
+
+    pixels = norm.size
+    return (
+        float(np.count_nonzero(cracks)) / pixels,
+        float(np.count_nonzero(inactive)) / pixels,
+        float(np.count_nonzero(degraded)) / pixels
+    )
+
+
+def classify_features(features: np.ndarray, parameters: Dict[str, float]) -> np.ndarray:
+    """
+    Assign crack modes from cell features
+
+    Args:
+        features: Array (..., 3) of crack, inactive and degraded fractions
+        parameters: Classifier thresholds
+
+    Returns:
+        Mode codes (index into CRACK_MODES)
+    """
+    crack, inactive, degraded = np.moveaxis(features, -1, 0)
+    area = parameters['mode_area_fraction']
+
+    return np.select(
+        [inactive > area, degraded > area, crack > parameters['crack_min_fraction']],
+        [3, 2, 1],
+        default=0
+    ).astype(np.int8)
+
+
+def _onnx_modes(cells: List[np.ndarray], reference: float, model_path: str) -> np.ndarray:
+    """Classify cells with an ONNX model taking (N, 1, H, W) and returning class scores"""
+    import onnxruntime
+
+    session = _onnx_sessions.get(model_path)
+    if session is None:
+        session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        _onnx_sessions[model_path] = session
+
+    model_input = session.get_inputs()[0]
+    height, width = model_input.shape[-2:]
+
+    batch = np.empty((len(cells), 1, height, width), dtype=np.float32)
+    for i, cell in enumerate(cells):
+        rows = (np.arange(height) + 0.5) * cell.shape[0] / height
+        columns = (np.arange(width) + 0.5) * cell.shape[1] / width
+        batch[i, 0] = cell[rows.astype(np.int64)[:, None], columns.astype(np.int64)[None, :]]
+    batch *= np.float32(1.0 / reference)
+
+    scores = session.run(None, {model_input.name: batch})[0]
+    return np.argmax(scores, axis=1).astype(np.int8)
+
+
+def _classify_band(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify the cells of a band of cell rows (runs in worker processes)"""
+    try:
+        image = np.load(task['array_path'], mmap_mode='r')
+    except FileNotFoundError:
+        # Evicted from the image store since the batch was planned
+        image = load_image(task['path'])
+    row_edges, column_edges = task['row_edges'], task['column_edges']
+    row_gaps, column_gaps = task['row_gaps'], task['column_gaps']
+    first_row, last_row = task['cell_rows']
+
+    # Cells without the dark gap band around them
+    cells = [
+        image[
+            row_edges[r] + row_gaps[r]:row_edges[r + 1] - row_gaps[r + 1],
+            column_edges[c] + column_gaps[c]:column_edges[c + 1] - column_gaps[c + 1]
+        ]
+        for r in range(first_row, last_row)
+        for c in range(len(column_edges) - 1)
+    ]
+    features = np.array([
+        cell_features(cell, task['reference'], task['parameters']) for cell in cells
+    ])
+
+    if task['classifier'] == 'onnx':
+        modes = _onnx_modes(cells, task['reference'], task['model_path'])
+    else:
+        modes = classify_features(features, task['parameters'])
+
+    return {'index': task['index'], 'cell_rows': task['cell_rows'], 'features': features, 'modes': modes}
+
+
+def _classifier_parameters() -> Dict[str, float]:
+    return {
+        'crack_contrast': config.EL_CRACK_CONTRAST,
+        'crack_min_fraction': config.EL_CRACK_MIN_FRACTION,
+        'inactive_level': config.EL_INACTIVE_LEVEL,
+        'degraded_level': config.EL_DEGRADED_LEVEL,
+        'mode_area_fraction': config.EL_MODE_AREA_FRACTION
+    }
+
+
+def analyze_el_images(
+    paths: Sequence[Path],
+    rows: int = None,
+    columns: int = None,
+    classifier: str = 'classical',
+    model_path: str = None,
+    max_workers: int = None
+) -> List[Union[CellDefectMap, Dict[str, Any]]]:
+    """
+    Classify the cells of many EL images in one process pool
+
+    An image too tilted for the axis-aligned cell grid does not stop the
+    batch; its entry is {'image', 'error': 'tilted', 'message'} instead of
+    a defect map.
+
+    Args:
+        paths: EL image files (.npy, TIFF, PNG, ...)
+        rows: Cell rows per image (defaults to config)
+        columns: Cell columns per image (defaults to config)
+        classifier: 'classical' or 'onnx'
+        model_path: ONNX model (defaults to config EL_CRACK_MODEL_PATH)
+        max_workers: Worker process count (defaults to CPU count)
+
+    Returns:
+        List of CellDefectMap or error entries in the same order as paths
+
+    Raises:
+        ValueError: If the classifier is unknown or has no model configured
+    """
+    if classifier not in ('classical', 'onnx'):
+        raise ValueError(f"Unknown crack classifier: {classifier}")
+
+    model_path = model_path or config.EL_CRACK_MODEL_PATH
+    if classifier == 'onnx' and not model_path:
+        raise ValueError("ONNX crack classifier selected but no model path configured")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    parameters = _classifier_parameters()
+    rows = rows or config.EL_CELL_ROWS
+    columns = columns or config.EL_CELL_COLUMNS
+
+    tasks, grids, failures = [], {}, {}
+    for index, path in enumerate(paths):
+        image = load_image(path)
+        (row_edges, row_gaps), (column_edges, column_gaps) = _detect_grid(image, rows, columns)
+        try:
+            check_grid_tilt(image, row_edges, column_edges)
+        except ValueError as e:
+            failures[index] = {'image': Path(path).name, 'error': 'tilted', 'message': str(e)}
+            continue
+        grids[index] = (row_edges, column_edges)
+
+        module = image[row_edges[0]:row_edges[-1]:4, column_edges[0]:column_edges[-1]:4]
+        reference = float(np.percentile(module, 90)) or 1.0
+
+        # Enough bands to keep every worker busy, at least one cell row each
+        cell_rows = len(row_edges) - 1
+        bands = np.linspace(0, cell_rows, min(cell_rows, max_workers) + 1).astype(int)
+        for first, last in zip(bands[:-1], bands[1:]):
+            tasks.append({
+                'index': index,
+                'path': str(path),
+                'array_path': str(array_path(path)),
+                'row_edges': row_edges,
+                'column_edges': column_edges,
+                'row_gaps': row_gaps,
+                'column_gaps': column_gaps,
+                'cell_rows': (int(first), int(last)),
+                'reference': reference,
+                'parameters': parameters,
+                'classifier': classifier,
+                'model_path': model_path
+            })
+
+    cell_count = sum((len(r) - 1) * (len(c) - 1) for r, c in grids.values())
+    if max_workers == 1 or cell_count < POOL_MIN_CELLS:
+        results = [_classify_band(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_classify_band, tasks))
+
+    maps = []
+    for index, path in enumerate(paths):
+        if index in failures:
+            maps.append(failures[index])
+            continue
+
+        row_edges, column_edges = grids[index]
+        shape = (len(row_edges) - 1, len(column_edges) - 1)
+        features = np.zeros(shape + (3,))
+        modes = np.zeros(shape, dtype=np.int8)
+
+        for result in results:
+            if result['index'] == index:
+                first, last = result['cell_rows']
+                features[first:last] = result['features'].reshape(last - first, shape[1], 3)
+                modes[first:last] = result['modes'].reshape(last - first, shape[1])
+
+        maps.append(CellDefectMap(
+            image=Path(path).name,
+            row_edges=row_edges,
+            column_edges=column_edges,
+            modes=modes,
+            crack_fraction=features[..., 0],
+            inactive_fraction=features[..., 1],
+            degraded_fraction=features[..., 2]
+        ))
+
+    return maps
+
+
+def analyze_el_image(path: Path, **kwargs) -> CellDefectMap:
+    """
+    Classify the cells of one EL image
+
+    Args:
+        path: EL image file
+        kwargs: Options of analyze_el_images
+
+    Returns:
+        CellDefectMap
+
+    Raises:
+        ValueError: If the image is too tilted for the axis-aligned cell grid
+    """
+    result = analyze_el_images([path], **kwargs)[0]
+    if isinstance(result, dict):
+        raise ValueError(f"{result['image']}: {result['message']}")
+    return result
+
+
+def analyze_execution_images(
+    test_execution_id: int,
+    paths: Sequence[Path] = None,
+    save: bool = True,
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """
+    Run crack detection on the EL images of a test execution
+
+    Images are taken from paths, else raw_data['el_images'] (file paths).
+    Maps are merged into processed_data['crack_detection']['images'] by
+    image name, so images can be added over several calls. Images that
+    could not be analyzed are stored as their error entries, listed in
+    'failed_images' and left out of the totals.
+
+    Args:
+        test_execution_id: Test execution ID
+        paths: EL image files
+        save: Store defect maps and totals in processed_data
+        kwargs: Options of analyze_el_images
+
+    Returns:
+        Dictionary with 'images' (name -> defect map dict) and the totals
+        of summary(), or None on error
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            if test is None:
+                return None
+            paths = paths or (test.raw_data or {}).get('el_images') or []
+            stored = dict(((test.processed_data or {}).get('crack_detection') or {}).get('images', {}))
+
+        if not paths:
+            return None
+
+        for defect_map in analyze_el_images(paths, **kwargs):
+            if isinstance(defect_map, dict):
+                stored[defect_map['image']] = defect_map
+            else:
+                stored[defect_map.image] = defect_map.to_dict()
+
+        summaries = [entry['summary'] for entry in stored.values() if 'summary' in entry]
+        cells = sum(s['cells'] for s in summaries)
+        result = {
+            'images': stored,
+            'failed_images': [name for name, entry in stored.items() if 'error' in entry],
+            'crack_count': sum(s['crack_count'] for s in summaries),
+            'crack_classification': {
+                mode: sum(s['crack_classification'][mode] for s in summaries)
+                for mode in CRACK_MODES[1:]
+            },
+            'critical_cracks': sum(s['critical_cracks'] for s in summaries),
+            # Both area shares are weighted by the cell count of each image
+            'inactive_area_pct': (
+                sum(s['inactive_area_pct'] * s['cells'] for s in summaries) / cells if cells else None
+            ),
+            'power_loss': sum(s['power_loss'] * s['cells'] for s in summaries) / cells if cells else None
+        }
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+                processed = dict(test.processed_data or {})
+                processed['crack_detection'] = result
+                test.processed_data = processed
+
+        return result
+
+    except Exception as e:
+        print(f"Error analyzing EL images: {e}")
+        return None
+
+
+def create_crack_map(defect_map: CellDefectMap, title: str = None) -> go.Figure:
+    """
+    Create a cell map of crack modes
+
+    Args:
+        defect_map: CellDefectMap
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    colors = ['#2ca02c', '#ffdd57', '#ff7f0e', '#d62728']
+    levels = len(CRACK_MODES)
+    colorscale = []
+    for code, color in enumerate(colors):
+        colorscale += [[code / levels, color], [(code + 1) / levels, color]]
+
+    hover = np.char.add(
+        np.asarray(CRACK_MODES)[defect_map.modes].astype(str),
+        np.char.mod(' | inactive %.1f%%', defect_map.inactive_fraction * 100)
+    )
+
+    fig = go.Figure(go.Heatmap(
+        z=defect_map.modes,
+        x=np.arange(1, defect_map.shape[1] + 1),
+        y=np.arange(1, defect_map.shape[0] + 1),
+        zmin=-0.5,
+        zmax=levels - 0.5,
+        colorscale=colorscale,
+        text=hover,
+        hovertemplate='Row %{y}, Cell %{x}<br>Mode %{text}<extra></extra>',
+        colorbar=dict(
+            title="Mode",
+            tickvals=list(range(levels)),
+            ticktext=list(CRACK_MODES)
+        ),
+        xgap=1,
+        ygap=1
+    ))
+
+    fig.update_layout(
+        title=title or f"Crack Map - {defect_map.image}",
+        xaxis_title="Cell column",
+        yaxis_title="Cell row",
+        yaxis=dict(autorange='reversed', scaleanchor='x'),
+        template='plotly_white'
+    )
+
+    return fig
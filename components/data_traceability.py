@@ -11,7 +11,7 @@ import streamlit as st
 from sqlalchemy import desc
 
 from config.database import get_db
-from database.models import AuditLog, User, TestExecution
+from database.models import AuditLog, FieldChange, User, TestExecution
 
 
 def log_action(
@@ -37,6 +37,7 @@ def log_action(
     """
     try:
         with get_db() as db:
+            created_at = datetime.utcnow()
             audit_log = AuditLog(
                 user_id=user_id,
                 action=action,
@@ -45,14 +46,81 @@ def log_action(
                 old_values=old_values,
                 new_values=new_values,
                 changes_summary=summary,
-                created_at=datetime.utcnow()
+                created_at=created_at
             )
             db.add(audit_log)
+
+            # Normalize updates into per-field rows in the same transaction
+            if action == 'update' and (old_values or new_values):
+                db.flush()
+                db.add_all(build_field_changes(
+                    audit_log_id=audit_log.id,
+                    entity_type=table_name,
+                    entity_id=record_id,
+                    old_values=old_values,
+                    new_values=new_values,
+                    user_id=user_id,
+                    changed_at=created_at
+                ))
+
             db.commit()
     except Exception as e:
         print(f"Error logging action: {e}")
 
 
+def build_field_changes(
+    audit_log_id: Optional[int],
+    entity_type: str,
+    entity_id: int,
+    old_values: Dict = None,
+    new_values: Dict = None,
+    user_id: int = None,
+    changed_at: datetime = None
+) -> List[FieldChange]:
+    """
+    Build field change rows for an audited update
+
+    Field history is keyed by entity, so updates logged without a table
+    name or record ID produce no rows (the audit log entry still holds
+    their values).
+
+    Args:
+        audit_log_id: ID of the source audit log entry
+        entity_type: Type of entity (table name)
+        entity_id: ID of entity
+        old_values: Previous values
+        new_values: New values
+        user_id: User making the change
+        changed_at: Time of the change
+
+    Returns:
+        List of unsaved FieldChange instances, one per modified field
+    """
+    if entity_id is None or not entity_type:
+        return []
+
+    old_values = old_values or {}
+    new_values = new_values or {}
+    changed_at = changed_at or datetime.utcnow()
+
+    # Preserve key order: old fields first, then fields only present in new
+    fields = list(old_values.keys()) + [k for k in new_values.keys() if k not in old_values]
+
+    return [
+        FieldChange(
+            audit_log_id=audit_log_id,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            field_name=field,
+            old_value=old_values.get(field),
+            new_value=new_values.get(field),
+            user_id=user_id,
+            changed_at=changed_at
+        )
+        for field in fields
+    ]
+
+
 def get_audit_trail(
     table_name: str = None,
     record_id: int = None,
@@ -350,6 +418,9 @@ def get_modification_history(
     """
     Get modification history for an entity/field
 
+    Reads the normalized field change table, so the lookup is served by the
+    (entity_type, entity_id, field_name) index and covers the full history.
+
     Args:
         entity_type: Type of entity
         entity_id: ID of entity
@@ -358,37 +429,82 @@ def get_modification_history(
     Returns:
         DataFrame with modification history
     """
-    logs = get_audit_trail(table_name=entity_type, record_id=entity_id)
-
-    modifications = []
+    columns = ['timestamp', 'field', 'old_value', 'new_value', 'user_id']
 
-    for log in logs:
-        if log['action'] == 'update':
-            old_vals = log['old_values'] or {}
-            new_vals = log['new_values'] or {}
+    try:
+        with get_db() as db:
+            query = db.query(
+                FieldChange.changed_at,
+                FieldChange.field_name,
+                FieldChange.old_value,
+                FieldChange.new_value,
+                FieldChange.user_id
+            ).filter(
+                FieldChange.entity_type == entity_type,
+                FieldChange.entity_id == entity_id
+            )
 
             if field_name:
-                if field_name in old_vals or field_name in new_vals:
-                    modifications.append({
-                        'timestamp': log['timestamp'],
-                        'field': field_name,
-                        'old_value': old_vals.get(field_name),
-                        'new_value': new_vals.get(field_name),
-                        'user_id': log['user_id']
-                    })
-            else:
-                # All fields
-                all_fields = set(list(old_vals.keys()) + list(new_vals.keys()))
-                for field in all_fields:
-                    modifications.append({
-                        'timestamp': log['timestamp'],
-                        'field': field,
-                        'old_value': old_vals.get(field),
-                        'new_value': new_vals.get(field),
-                        'user_id': log['user_id']
-                    })
-
-    return pd.DataFrame(modifications)
+                query = query.filter(FieldChange.field_name == field_name)
+
+            rows = query.order_by(
+                desc(FieldChange.changed_at),
+                desc(FieldChange.id)
+            ).all()
+
+            return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+    except Exception as e:
+        print(f"Error getting modification history: {e}")
+        return pd.DataFrame(columns=columns)
+
+
+def backfill_field_changes(batch_size: int = 1000) -> int:
+    """
+    Populate the field change table from existing audit log updates
+
+    Only audit entries without field change rows are processed, so the
+    backfill can be re-run safely.
+
+    Args:
+        batch_size: Number of audit entries processed per batch
+
+    Returns:
+        Number of field change rows created
+    """
+    created = 0
+
+    try:
+        with get_db() as db:
+            processed = db.query(FieldChange.audit_log_id).filter(
+                FieldChange.audit_log_id.isnot(None)
+            ).distinct()
+
+            query = db.query(AuditLog).filter(
+                AuditLog.action == 'update',
+                AuditLog.table_name.isnot(None),
+                AuditLog.record_id.isnot(None),
+                AuditLog.id.notin_(processed)
+            ).order_by(AuditLog.id)
+
+            for log in query.yield_per(batch_size):
+                rows = build_field_changes(
+                    audit_log_id=log.id,
+                    entity_type=log.table_name,
+                    entity_id=log.record_id,
+                    old_values=log.old_values,
+                    new_values=log.new_values,
+                    user_id=log.user_id,
+                    changed_at=log.created_at
+                )
+                db.add_all(rows)
+                created += len(rows)
+
+            db.commit()
+    except Exception as e:
+        print(f"Error backfilling field changes: {e}")
+        return 0
+
+    return created
 
 
 def verify_data_integrity(test_execution_id: int) -> Dict[str, Any]:
@@ -0,0 +1,370 @@
+"""
+Defect Segmentation - Photo-based defect area measurement
+=========================================================
+Shared segmentation and area quantification for the visual inspection
+protocols: delamination (DELAM-001), snail trails (SNAIL-001), EL
+sponge/dark spots (SPONGE-001) and backsheet chalking (CHALK-001).
+
+Photos are analyzed at a bounded resolution in a process pool. Each
+result is cached on disk under the photo's content hash and the
+segmentation profile, and a WebP thumbnail is produced from the same
+decoded image.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from components.thumbnails import (
+    get_thumbnail, get_thumbnail_store, open_photo, photo_hash, render_webp, thumbnail_key
+)
+from config.database import get_db
+from config.settings import config, DATA_DIR
+from database.models import IncomingInspection, TestExecution, TestProtocol
+from utils.cache import ContentAddressedStore, content_hash
+from utils.images import box_filter, label_components
+
+
+# Segmentation profile per protocol:
+#   method 'local' marks pixels brighter/darker than their surroundings by
+#   `contrast` (relative), with the background averaged over `background`
+#   of the shorter image side; method 'whiteness' marks near-white pixels.
+#   min_area is the smallest kept defect as a fraction of the image area.
+SEGMENTATION_PROFILES = {
+    'DELAM-001': {'method': 'local', 'polarity': 'bright', 'contrast': 0.15, 'background': 1 / 4, 'min_area': 2e-4},
+    'SNAIL-001': {'method': 'local', 'polarity': 'dark', 'contrast': 0.12, 'background': 1 / 32, 'min_area': 5e-5},
+    'SPONGE-001': {'method': 'local', 'polarity': 'dark', 'contrast': 0.25, 'background': 1 / 8, 'min_area': 1e-4},
+    'CHALK-001': {'method': 'whiteness', 'level': 0.8, 'min_area': 1e-4}
+}
+
+# Whitened fraction at which the chalking rating reaches 0 (10 = no chalking)
+CHALK_FULL_FRACTION = 0.5
+
+# Photos smaller than this many are analyzed in-process; pool startup costs more
+BATCH_POOL_MIN_SIZE = 4
+
+SEGMENTATION_DIR = DATA_DIR / "segmentation"
+
+_result_store = None
+
+
+def get_result_store() -> ContentAddressedStore:
+    """Get or create the global segmentation result store"""
+    global _result_store
+    if _result_store is None:
+        _result_store = ContentAddressedStore(
+            SEGMENTATION_DIR,
+            max_bytes=config.SEGMENTATION_CACHE_MAX_MB * 1024 * 1024,
+            suffix='.json'
+        )
+    return _result_store
+
+
+def segment(rgb: np.ndarray, profile: Dict[str, Any]) -> np.ndarray:
+    """
+    Segment defect pixels of a photo
+
+    Args:
+        rgb: float32 array (height, width, 3) scaled to 0-1
+        profile: Segmentation profile (see SEGMENTATION_PROFILES)
+
+    Returns:
+        Boolean defect mask
+    """
+    if profile['method'] == 'whiteness':
+        mask = rgb.min(axis=2) > profile['level']
+    elif profile['method'] == 'local':
+        gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        size = max(3, int(min(gray.shape) * profile['background']))
+        background = box_filter(gray, size)
+        difference = gray - background if profile['polarity'] == 'bright' else background - gray
+        mask = difference > profile['contrast'] * np.maximum(background, 0.05)
+    else:
+        raise ValueError(f"Unknown segmentation method: {profile['method']}")
+
+    # Majority filter removes isolated pixels
+    return box_filter(mask.astype(np.float32), 3) > 0.5
+
+
+def measure_defects(mask: np.ndarray, min_area: float, max_defects: int = None) -> Dict[str, Any]:
+    """
+    Measure connected defects of a mask
+
+    Args:
+        mask: Boolean defect mask
+        min_area: Smallest kept defect as a fraction of the mask area
+        max_defects: Largest defects listed individually
+
+    Returns:
+        Dictionary with affected_pct, defect_count and defects (area_pct and
+        normalized centroid x/y, largest first)
+    """
+    max_defects = max_defects or config.SEGMENTATION_MAX_DEFECTS
+    height, width = mask.shape
+    labels, count = label_components(mask)
+
+    flat = labels.ravel()
+    areas = np.bincount(flat, minlength=count + 1)[1:]
+    rows, cols = np.divmod(np.arange(flat.size), width)
+    row_sums = np.bincount(flat, weights=rows, minlength=count + 1)[1:]
+    col_sums = np.bincount(flat, weights=cols, minlength=count + 1)[1:]
+
+    kept = np.flatnonzero(areas >= max(1, min_area * mask.size))
+    kept = kept[np.argsort(areas[kept])[::-1]]
+
+    defects = [
+        {
+            'area_pct': round(float(areas[k]) / mask.size * 100, 4),
+            'x': round(float(col_sums[k] / areas[k] + 0.5) / width, 4),
+            'y': round(float(row_sums[k] / areas[k] + 0.5) / height, 4)
+        }
+        for k in kept[:max_defects]
+    ]
+
+    return {
+        'affected_pct': float(areas[kept].sum()) / mask.size * 100,
+        'defect_count': int(len(kept)),
+        'defects': defects
+    }
+
+
+def _segment_photo(task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Segment one photo and render its thumbnail (runs in worker processes)"""
+    side = task['analysis_side']
+
+    try:
+        with open_photo(task['path'], side) as img:
+            original_size = img.size
+            img.thumbnail((side, side))
+            rgb = np.asarray(img.convert('RGB'), dtype=np.float32) / 255
+            thumbnail = render_webp(img, task['thumbnail_side'])
+    except Exception as e:
+        print(f"Error segmenting photo: {e}")
+        return None
+
+    result = measure_defects(segment(rgb, task['profile']), task['profile']['min_area'])
+    result.update(image=Path(task['path']).name, width=original_size[0], height=original_size[1])
+    return {'key': task['key'], 'result': result, 'thumbnail': thumbnail}
+
+
+def segment_photos(
+    paths: Sequence[Path],
+    protocol_code: str,
+    max_workers: int = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Segment photos with a protocol's profile, using cached results
+
+    Args:
+        paths: Photo files
+        protocol_code: Protocol whose profile to use (e.g. 'DELAM-001')
+        max_workers: Worker process count (defaults to CPU count)
+
+    Returns:
+        Result per photo (image, width, height, affected_pct, defect_count,
+        defects, thumbnail), None for unreadable photos
+    """
+    if protocol_code not in SEGMENTATION_PROFILES:
+        raise ValueError(f"No segmentation profile for protocol {protocol_code}")
+
+    profile = SEGMENTATION_PROFILES[protocol_code]
+    max_workers = max_workers or os.cpu_count() or 1
+    store = get_result_store()
+    thumbnails = get_thumbnail_store()
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(paths)
+    hashes, tasks = {}, []
+
+    for i, path in enumerate(paths):
+        try:
+            hashes[i] = photo_hash(path)
+        except OSError as e:
+            print(f"Error reading photo: {e}")
+            continue
+
+        key = content_hash('segmentation', hashes[i], protocol_code, sorted(profile.items()),
+                           config.SEGMENTATION_MAX_SIDE)
+        cached = store.get(key)
+        if cached is not None:
+            results[i] = json.loads(cached)
+            thumbnail_path = get_thumbnail(path, source_hash=hashes[i])
+            results[i]['thumbnail'] = str(thumbnail_path) if thumbnail_path else None
+        else:
+            tasks.append({
+                'key': key,
+                'index': i,
+                'path': str(path),
+                'profile': profile,
+                'analysis_side': config.SEGMENTATION_MAX_SIDE,
+                'thumbnail_side': config.THUMBNAIL_SIZE
+            })
+
+    if max_workers == 1 or len(tasks) < BATCH_POOL_MIN_SIZE:
+        outputs = [_segment_photo(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outputs = list(executor.map(_segment_photo, tasks))
+
+    for task, output in zip(tasks, outputs):
+        if output is None:
+            continue
+        i = task['index']
+        store.put(output['key'], json.dumps(output['result']).encode('utf-8'))
+        thumbnail_path = thumbnails.put(thumbnail_key(hashes[i], task['thumbnail_side']), output['thumbnail'])
+        results[i] = dict(output['result'], thumbnail=str(thumbnail_path))
+
+    return results
+
+
+def _location(x: float, y: float) -> str:
+    """Describe a normalized position as e.g. 'top left' or 'center'"""
+    vertical = 'top' if y < 1 / 3 else 'bottom' if y > 2 / 3 else 'middle'
+    horizontal = 'left' if x < 1 / 3 else 'right' if x > 2 / 3 else 'center'
+    if vertical == 'middle':
+        return horizontal
+    return vertical if horizontal == 'center' else f"{vertical} {horizontal}"
+
+
+def summarize(
+    results: Sequence[Dict[str, Any]],
+    protocol_code: str,
+    module_area_cm2: float = None
+) -> Dict[str, Any]:
+    """
+    Combine per-photo results into the protocol's result fields
+
+    Photos are assumed to show the module cropped to its outline, so areas
+    in cm² are affected fractions of the module area.
+
+    Args:
+        results: Segmentation results of one sample's photos
+        protocol_code: Protocol code
+        module_area_cm2: Module area for absolute areas
+
+    Returns:
+        Dictionary of result fields (affected_area, defect_count and the
+        protocol-specific fields)
+    """
+    results = [r for r in results if r is not None]
+    if not results:
+        return {}
+
+    worst = max(results, key=lambda r: r['affected_pct'])
+    summary = {
+        'photos': len(results),
+        'affected_area': worst['affected_pct'],
+        'defect_count': max(r['defect_count'] for r in results)
+    }
+
+    if protocol_code == 'DELAM-001':
+        summary['delamination_area'] = (
+            worst['affected_pct'] / 100 * module_area_cm2 if module_area_cm2 else None
+        )
+        largest = worst['defects'][0] if worst['defects'] else None
+        summary['location'] = _location(largest['x'], largest['y']) if largest else None
+    elif protocol_code == 'SPONGE-001':
+        summary['defect_locations'] = [[d['x'], d['y']] for d in worst['defects']]
+        summary['severity_score'] = worst['affected_pct']
+    elif protocol_code == 'CHALK-001':
+        fraction = worst['affected_pct'] / 100
+        summary['chalking_rating'] = int(round(10 * (1 - min(1.0, fraction / CHALK_FULL_FRACTION))))
+
+    return summary
+
+
+def _module_area_cm2(db, sample_id: str) -> Optional[float]:
+    """Module area from the incoming inspection of a sample"""
+    inspection = db.query(IncomingInspection.length_mm, IncomingInspection.width_mm).filter(
+        IncomingInspection.sample_id == sample_id
+    ).first()
+    if inspection is None or not inspection[0] or not inspection[1]:
+        return None
+    return inspection[0] * inspection[1] / 100
+
+
+def analyze_execution_photos(
+    test_execution_id: int,
+    protocol_code: str = None,
+    save: bool = True,
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """
+    Segment the photos of a test execution
+
+    Args:
+        test_execution_id: Test execution ID
+        protocol_code: Profile to use (defaults to the execution's protocol)
+        save: Store results in processed_data['defect_segmentation']
+        kwargs: Options of segment_photos
+
+    Returns:
+        Dictionary with 'photos' (per-photo results) and 'summary', or None
+    """
+    try:
+        with get_db() as db:
+            row = db.query(TestExecution, TestProtocol.protocol_id).outerjoin(
+                TestProtocol, TestExecution.protocol_id == TestProtocol.id
+            ).filter(TestExecution.id == test_execution_id).first()
+            if row is None:
+                return None
+            test, code = row
+            protocol_code = protocol_code or code
+            photos = list(test.photos or [])
+            module_area = _module_area_cm2(db, test.sample_id) if test.sample_id else None
+
+        if not photos:
+            return None
+
+        results = segment_photos(photos, protocol_code, **kwargs)
+        analysis = {'photos': results, 'summary': summarize(results, protocol_code, module_area)}
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+                processed = dict(test.processed_data or {})
+                processed['defect_segmentation'] = analysis
+                test.processed_data = processed
+
+        return analysis
+
+    except Exception as e:
+        print(f"Error analyzing photos: {e}")
+        return None
+
+
+def analyze_inspection_photos(
+    inspection_id: int,
+    protocol_code: str = 'DELAM-001',
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """
+    Segment the photos of an incoming inspection (results are not stored)
+
+    Args:
+        inspection_id: Incoming inspection ID
+        protocol_code: Profile to use
+        kwargs: Options of segment_photos
+
+    Returns:
+        Dictionary with 'photos' and 'summary', or None
+    """
+    try:
+        with get_db() as db:
+            inspection = db.query(IncomingInspection).filter(
+                IncomingInspection.id == inspection_id
+            ).first()
+            if inspection is None or not inspection.photos:
+                return None
+            photos = list(inspection.photos)
+            module_area = _module_area_cm2(db, inspection.sample_id)
+
+        results = segment_photos(photos, protocol_code, **kwargs)
+        return {'photos': results, 'summary': summarize(results, protocol_code, module_area)}
+
+    except Exception as e:
+        print(f"Error analyzing inspection photos: {e}")
+        return None
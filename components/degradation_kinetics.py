@@ -0,0 +1,556 @@
+"""
+Degradation Kinetics - Fitting engine for DH, LID, LeTID, PID and AMMON series
+==============================================================================
+Fits kinetic models to normalized power-versus-exposure series of many
+samples at once, detects stabilization per IEC 61215-2 MQT 19, and fits
+Arrhenius/Peck acceleration models across the lab's test history.
+
+Kinetic models (y = P / P0, t = exposure hours):
+
+    exponential  y = a + b * (1 - exp(-t / tau))
+    power_law    y = a + b * t ** n
+
+Both are linear in (a, b) for a fixed shape parameter (tau or n), so each
+fit is a grouped linear regression over a grid of shape parameters, with
+all samples and candidates solved in one vectorized pass.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config.database import get_db
+from config.protocols_registry import get_template_parameter
+from config.settings import config
+from database.models import TestExecution, TestProtocol
+from utils.cache import LRUCache
+from utils.statistics import grouped_linear_regression
+
+
+BOLTZMANN_EV = 8.617333262e-5  # eV/K
+
+KINETIC_MODELS = ('exponential', 'power_law')
+ACCELERATION_MODELS = ('arrhenius', 'peck')
+
+# Protocols with power-versus-exposure series
+DEGRADATION_PROTOCOLS = ('DH-001', 'DH-002', 'LID-001', 'LETID-001', 'PID-001', 'AMMON-001')
+
+# Measurement keys per template, in order of preference
+TIME_KEYS = ('time', 'exposure_time', 'hours')
+POWER_KEYS = ('pmax', 'power', 'power_output')
+LOSS_KEYS = ('power_degradation', 'degradation')  # Percent power loss
+
+SHAPE_GRID_SIZE = 96
+
+_kinetics_cache = LRUCache(max_items=1024)
+
+
+def _shape_grid(model: str, t: np.ndarray) -> np.ndarray:
+    """Candidate shape parameters (tau in hours or exponent n)"""
+    if model == 'exponential':
+        positive = t[t > 0]
+        if len(positive) == 0:
+            return np.array([1.0])
+        return np.geomspace(positive.min() / 4, positive.max() * 10, SHAPE_GRID_SIZE)
+    if model == 'power_law':
+        return np.linspace(0.05, 2.0, SHAPE_GRID_SIZE)
+    raise ValueError(f"Unknown kinetic model: {model}")
+
+
+def _basis(model: str, t: np.ndarray, shape: np.ndarray) -> np.ndarray:
+    """Model basis f(t; shape) for every (shape, t) pair"""
+    if model == 'exponential':
+        return 1 - np.exp(-t[np.newaxis, :] / shape[:, np.newaxis])
+    return np.power(t[np.newaxis, :], shape[:, np.newaxis])
+
+
+def _basis_per_point(model: str, t: np.ndarray, shape: np.ndarray) -> np.ndarray:
+    """Model basis with a shape parameter per point"""
+    if model == 'exponential':
+        return 1 - np.exp(-t / shape)
+    return np.power(t, shape)
+
+
+def _refine_shape(
+    model: str,
+    shapes: np.ndarray,
+    sse: np.ndarray,
+    best: np.ndarray
+) -> np.ndarray:
+    """
+    Refine the best grid shape by a parabola through neighbouring SSEs
+
+    The parabola is fitted in grid-index space (log space for tau) and the
+    offset is limited to half a grid step.
+    """
+    if len(shapes) < 3:
+        return shapes[best]
+
+    columns = np.arange(sse.shape[1])
+    inner = np.clip(best, 1, len(shapes) - 2)
+
+    left = sse[inner - 1, columns]
+    centre = sse[inner, columns]
+    right = sse[inner + 1, columns]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curvature = left - 2 * centre + right
+        offset = np.where(curvature > 0, 0.5 * (left - right) / curvature, 0.0)
+    offset = np.where(np.isfinite(offset) & (inner == best), np.clip(offset, -0.5, 0.5), 0.0)
+
+    position = best + offset
+    grid = np.log(shapes) if model == 'exponential' else shapes
+    refined = np.interp(position, np.arange(len(shapes)), grid)
+    return np.exp(refined) if model == 'exponential' else refined
+
+
+def fit_kinetics(
+    time_hours: Sequence[float],
+    normalized_power: Sequence[float],
+    sample_ids: Sequence[Any] = None,
+    model: str = 'exponential'
+) -> pd.DataFrame:
+    """
+    Fit a kinetic model to the series of many samples at once
+
+    Args:
+        time_hours: Exposure time per point (h)
+        normalized_power: P / P0 per point
+        sample_ids: Sample identifier per point (one sample if None)
+        model: 'exponential' or 'power_law'
+
+    Returns:
+        DataFrame with one row per sample: sample, model, a, b, shape
+        (tau or n), rate (inverse characteristic time, 1/h), r_squared,
+        n_points, final_time, observed_final and fitted_final
+    """
+    t = np.asarray(time_hours, dtype=np.float64)
+    y = np.asarray(normalized_power, dtype=np.float64)
+
+    if sample_ids is None:
+        samples = np.array([0])
+        groups = np.zeros(len(t), dtype=np.intp)
+    else:
+        samples, groups = np.unique(np.asarray(sample_ids), return_inverse=True)
+
+    n_groups = len(samples)
+    shapes = _shape_grid(model, t)
+    n_shapes = len(shapes)
+
+    # One regression over (shape candidate, sample) pairs
+    fit = grouped_linear_regression(
+        _basis(model, t, shapes).ravel(),
+        np.tile(y, n_shapes),
+        (np.arange(n_shapes)[:, np.newaxis] * n_groups + groups[np.newaxis, :]).ravel(),
+        n_groups=n_shapes * n_groups
+    )
+
+    sse = (fit['residual_variance'] * (fit['n'] - 2)).reshape(n_shapes, n_groups)
+    sse = np.where(np.isfinite(sse), sse, np.inf)
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(n_groups)
+    fitted_ok = np.isfinite(sse[best, columns])
+
+    shape = _refine_shape(model, shapes, sse, best)
+
+    # Re-solve (a, b) at the refined shape of each sample
+    fit = grouped_linear_regression(
+        _basis_per_point(model, t, shape[groups]), y, groups, n_groups=n_groups
+    )
+    a = fit['intercept']
+    b = fit['slope']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if model == 'exponential':
+            rate = 1 / shape
+        else:
+            # y = a - (k t) ** n  =>  k = (-b) ** (1 / n)
+            rate = np.power(np.abs(b), 1 / shape)
+
+    order = np.lexsort((t, groups))
+    last = np.flatnonzero(np.r_[groups[order][1:] != groups[order][:-1], True])
+    final_time = np.full(n_groups, np.nan)
+    observed_final = np.full(n_groups, np.nan)
+    final_time[groups[order][last]] = t[order][last]
+    observed_final[groups[order][last]] = y[order][last]
+
+    result = pd.DataFrame({
+        'sample': samples,
+        'model': model,
+        'a': a,
+        'b': b,
+        'shape': shape,
+        'rate': rate,
+        'r_squared': fit['r_squared'],
+        'n_points': fit['n'],
+        'final_time': final_time,
+        'observed_final': observed_final,
+        'fitted_final': predict_normalized_power(model, a, b, shape, final_time)
+    })
+
+    unfitted = ['a', 'b', 'shape', 'rate', 'r_squared', 'fitted_final']
+    result.loc[~fitted_ok, unfitted] = np.nan
+    return result
+
+
+def predict_normalized_power(
+    model: str,
+    a: np.ndarray,
+    b: np.ndarray,
+    shape: np.ndarray,
+    time_hours: np.ndarray
+) -> np.ndarray:
+    """
+    Evaluate a fitted kinetic model
+
+    Args:
+        model: 'exponential' or 'power_law'
+        a: Intercepts
+        b: Amplitudes
+        shape: tau (exponential) or n (power_law)
+        time_hours: Exposure times
+
+    Returns:
+        Predicted P / P0
+    """
+    t = np.asarray(time_hours, dtype=np.float64)
+    if model == 'exponential':
+        return a + b * (1 - np.exp(-t / shape))
+    return a + b * np.power(t, shape)
+
+
+def detect_stabilization(
+    series: Sequence[Sequence[float]],
+    threshold: float = None,
+    window: int = None
+) -> np.ndarray:
+    """
+    Find where each Pmax series stabilizes (IEC 61215-2 MQT 19)
+
+    A series is stable at the first measurement where the last `window`
+    consecutive values satisfy (Pmax - Pmin) / Pmean < threshold.
+
+    Args:
+        series: Pmax values per sample (varying lengths)
+        threshold: Relative range limit (defaults to config)
+        window: Number of consecutive measurements (defaults to config)
+
+    Returns:
+        Index of the stabilizing measurement per sample, -1 if not stable
+    """
+    threshold = config.STABILIZATION_RELATIVE_CHANGE if threshold is None else threshold
+    window = window or config.STABILIZATION_WINDOW
+
+    n_points = max((len(s) for s in series), default=0)
+    if n_points < window:
+        return np.full(len(series), -1)
+
+    values = np.full((len(series), n_points), np.nan)
+    for row, s in enumerate(series):
+        values[row, :len(s)] = s
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+    with np.errstate(invalid='ignore'):
+        spread = (windows.max(axis=2) - windows.min(axis=2)) / windows.mean(axis=2)
+
+    stable = spread < threshold  # NaN padding compares False
+    first = np.argmax(stable, axis=1)
+    return np.where(stable.any(axis=1), first + window - 1, -1)
+
+
+def fit_acceleration_model(
+    rate: Sequence[float],
+    temperature: Sequence[float],
+    humidity: Sequence[float] = None,
+    model: str = 'arrhenius'
+) -> Dict[str, float]:
+    """
+    Fit an acceleration model to degradation rates across stress conditions
+
+    arrhenius: ln k = ln A - Ea / (kB T)
+    peck:      ln k = ln A + n ln RH - Ea / (kB T)
+
+    Args:
+        rate: Degradation rate per test (1/h)
+        temperature: Chamber temperature per test (°C)
+        humidity: Relative humidity per test (%), required for peck
+        model: 'arrhenius' or 'peck'
+
+    Returns:
+        Dictionary with 'model', 'ln_a', 'activation_energy' (eV),
+        'humidity_exponent' (peck only), 'r_squared' and 'n_tests'
+    """
+    if model not in ACCELERATION_MODELS:
+        raise ValueError(f"Unknown acceleration model: {model}")
+
+    k = np.asarray(rate, dtype=np.float64)
+    inverse_kt = 1 / (BOLTZMANN_EV * (np.asarray(temperature, dtype=np.float64) + 273.15))
+    columns = [np.ones_like(k), -inverse_kt]
+
+    if model == 'peck':
+        if humidity is None:
+            raise ValueError("Peck model requires humidity")
+        columns.append(np.log(np.asarray(humidity, dtype=np.float64)))
+
+    X = np.column_stack(columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ln_k = np.log(k)
+
+    valid = np.isfinite(ln_k) & np.all(np.isfinite(X), axis=1)
+    if valid.sum() < X.shape[1] + 1:
+        raise ValueError(
+            f"{model} fit needs at least {X.shape[1] + 1} tests with valid rates"
+        )
+
+    coefficients, _, rank, _ = np.linalg.lstsq(X[valid], ln_k[valid], rcond=None)
+    if rank < X.shape[1]:
+        raise ValueError(f"Stress conditions do not vary enough for a {model} fit")
+
+    residuals = ln_k[valid] - X[valid] @ coefficients
+    total = np.sum((ln_k[valid] - ln_k[valid].mean()) ** 2)
+
+    result = {
+        'model': model,
+        'ln_a': float(coefficients[0]),
+        'activation_energy': float(coefficients[1]),
+        'r_squared': float(1 - np.sum(residuals ** 2) / total) if total > 0 else float('nan'),
+        'n_tests': int(valid.sum())
+    }
+    if model == 'peck':
+        result['humidity_exponent'] = float(coefficients[2])
+    return result
+
+
+def predict_rate(
+    acceleration: Dict[str, float],
+    temperature: Sequence[float],
+    humidity: Sequence[float] = None
+) -> np.ndarray:
+    """
+    Degradation rate from a fitted acceleration model
+
+    Args:
+        acceleration: Result of fit_acceleration_model
+        temperature: Temperature (°C)
+        humidity: Relative humidity (%), used by peck
+
+    Returns:
+        Rate (1/h)
+    """
+    inverse_kt = 1 / (BOLTZMANN_EV * (np.asarray(temperature, dtype=np.float64) + 273.15))
+    ln_k = acceleration['ln_a'] - acceleration['activation_energy'] * inverse_kt
+
+    if acceleration['model'] == 'peck':
+        ln_k = ln_k + acceleration['humidity_exponent'] * np.log(np.asarray(humidity, dtype=np.float64))
+
+    return np.exp(ln_k)
+
+
+def series_from_measurements(measurements: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Extract a normalized power series from measurement dictionaries
+
+    Time comes from the first available time key (hours) or from
+    'timestamp'; power from the first power key, normalized to the first
+    point, or from a percent-loss key.
+
+    Raises:
+        ValueError: If time or power information is missing, including a
+            missing power value at the first (reference) time
+
+    Args:
+        measurements: Measurement dictionaries of a degradation test
+
+    Returns:
+        DataFrame with 'time_hours' and 'normalized_power', sorted by time
+    """
+    if not measurements:
+        return pd.DataFrame(columns=['time_hours', 'normalized_power'])
+
+    df = pd.DataFrame(measurements)
+
+    time_key = next((key for key in TIME_KEYS if key in df), None)
+    if time_key is not None:
+        hours = pd.to_numeric(df[time_key], errors='coerce')
+    elif 'timestamp' in df:
+        timestamps = pd.to_datetime(df['timestamp'])
+        hours = (timestamps - timestamps.min()).dt.total_seconds() / 3600
+    else:
+        raise ValueError("Measurements have no time information")
+
+    power_key = next((key for key in POWER_KEYS if key in df), None)
+    loss_key = next((key for key in LOSS_KEYS if key in df), None)
+
+    series = pd.DataFrame({'time_hours': hours})
+    if power_key is not None:
+        series['power'] = pd.to_numeric(df[power_key], errors='coerce')
+        series = series.dropna(subset=['time_hours']).sort_values('time_hours')
+        if series['power'].isna().all():
+            raise ValueError(f"Measurements have no valid '{power_key}' values")
+        if pd.isna(series['power'].iloc[0]):
+            raise ValueError(
+                f"Initial measurement at {series['time_hours'].iloc[0]:g} h has no "
+                f"'{power_key}' value to normalize to"
+            )
+        series = series.dropna()
+        series['normalized_power'] = series['power'] / series['power'].iloc[0]
+        series = series.drop(columns='power')
+    elif loss_key is not None:
+        series['normalized_power'] = 1 - pd.to_numeric(df[loss_key], errors='coerce') / 100
+        series = series.dropna().sort_values('time_hours')
+        if series.empty:
+            raise ValueError(f"Measurements have no valid '{loss_key}' values")
+    else:
+        raise ValueError("Measurements have no power information")
+
+    return series.reset_index(drop=True)
+
+
+def _stress_conditions(protocol_code: str, input_data: Dict[str, Any]) -> tuple:
+    """Chamber temperature and humidity from input data or template defaults"""
+    input_data = input_data or {}
+    temperature = input_data.get(
+        'temperature', get_template_parameter(protocol_code, 'temperature')
+    )
+    humidity = input_data.get(
+        'humidity', get_template_parameter(protocol_code, 'humidity')
+    )
+    return (
+        float(temperature) if temperature is not None else np.nan,
+        float(humidity) if humidity is not None else np.nan
+    )
+
+
+def fit_executions(
+    test_execution_ids: Sequence[int] = None,
+    protocol_codes: Sequence[str] = DEGRADATION_PROTOCOLS,
+    model: str = 'exponential'
+) -> pd.DataFrame:
+    """
+    Fit kinetics for many executions in one batch (cached per execution)
+
+    Args:
+        test_execution_ids: Executions to fit (defaults to all executions of
+            the given protocols)
+        protocol_codes: Protocol codes used when no IDs are given
+        model: 'exponential' or 'power_law'
+
+    Returns:
+        DataFrame of fit_kinetics results with 'sample' set to the execution
+        ID plus 'protocol', 'temperature', 'humidity' and 'stabilized_index'
+        (MQT 19 stabilization on the power series, -1 if not stable)
+    """
+    rows = []
+
+    try:
+        with get_db() as db:
+            query = db.query(
+                TestExecution.id, TestExecution.updated_at, TestExecution.raw_data,
+                TestExecution.input_data, TestProtocol.protocol_id
+            ).join(TestProtocol, TestExecution.protocol_id == TestProtocol.id)
+
+            if test_execution_ids is not None:
+                query = query.filter(TestExecution.id.in_(list(test_execution_ids)))
+            else:
+                query = query.filter(TestProtocol.protocol_id.in_(list(protocol_codes)))
+
+            rows = query.all()
+    except Exception as e:
+        print(f"Error loading degradation executions: {e}")
+        return pd.DataFrame()
+
+    cached, pending = [], []
+    for execution_id, updated_at, raw_data, input_data, protocol_code in rows:
+        key = (execution_id, str(updated_at), model)
+        fit = _kinetics_cache.get(key)
+        if fit is not None:
+            cached.append(fit)
+        elif raw_data and raw_data.get('measurements'):
+            pending.append((key, execution_id, raw_data, input_data, protocol_code))
+
+    if pending:
+        series, meta = [], []
+        for key, execution_id, raw_data, input_data, protocol_code in pending:
+            try:
+                s = series_from_measurements(raw_data['measurements'])
+            except ValueError as e:
+                print(f"Error reading series of execution {execution_id}: {e}")
+                continue
+            s['sample'] = execution_id
+            series.append(s)
+            meta.append((key, execution_id, protocol_code, *_stress_conditions(protocol_code, input_data), s))
+
+        if series:
+            points = pd.concat(series, ignore_index=True)
+            fits = fit_kinetics(
+                points['time_hours'], points['normalized_power'], points['sample'], model
+            ).set_index('sample')
+
+            stabilized = detect_stabilization([m[-1]['normalized_power'].to_numpy() for m in meta])
+
+            for (key, execution_id, protocol_code, temperature, humidity, _), index in zip(meta, stabilized):
+                fit = fits.loc[execution_id].to_dict()
+                fit.update({
+                    'sample': execution_id,
+                    'protocol': protocol_code,
+                    'temperature': temperature,
+                    'humidity': humidity,
+                    'stabilized_index': int(index)
+                })
+                _kinetics_cache.put(key, fit)
+                cached.append(fit)
+
+    return pd.DataFrame(cached)
+
+
+def compare_lab_history(
+    protocol_codes: Sequence[str] = DEGRADATION_PROTOCOLS,
+    kinetic_model: str = 'exponential',
+    acceleration_model: str = 'peck'
+) -> Dict[str, Any]:
+    """
+    Compare acceleration-model predictions with observed degradation
+
+    Kinetics are fitted per execution; the acceleration model is fitted to
+    the rates of all executions and used to predict each execution's final
+    normalized power from its own stress conditions and amplitude.
+
+    Args:
+        protocol_codes: Protocols to include
+        kinetic_model: 'exponential' or 'power_law'
+        acceleration_model: 'arrhenius' or 'peck'
+
+    Returns:
+        Dictionary with 'acceleration' (fit_acceleration_model result or
+        None) and 'comparison' (DataFrame with predicted_final,
+        observed_final and residual per execution)
+    """
+    fits = fit_executions(protocol_codes=protocol_codes, model=kinetic_model)
+    if fits.empty:
+        return {'acceleration': None, 'comparison': fits}
+
+    try:
+        acceleration = fit_acceleration_model(
+            fits['rate'], fits['temperature'], fits['humidity'], acceleration_model
+        )
+    except ValueError as e:
+        print(f"Error fitting acceleration model: {e}")
+        return {'acceleration': None, 'comparison': fits}
+
+    rate = predict_rate(acceleration, fits['temperature'], fits['humidity'])
+    if kinetic_model == 'exponential':
+        shape = 1 / rate
+        b = fits['b'].to_numpy()
+    else:
+        shape = fits['shape'].to_numpy()
+        b = -np.power(rate, shape)
+
+    comparison = fits.copy()
+    comparison['predicted_rate'] = rate
+    comparison['predicted_final'] = predict_normalized_power(
+        kinetic_model, fits['a'].to_numpy(), b, shape, fits['final_time'].to_numpy()
+    )
+    comparison['residual'] = comparison['observed_final'] - comparison['predicted_final']
+
+    return {'acceleration': acceleration, 'comparison': comparison}
@@ -0,0 +1,524 @@
+"""
+EL Registration - Before/after alignment and defect progression
+===============================================================
+Aligns EL images of the same sample taken at different stress intervals
+(TC-001, ML-002, HAIL-001, TWIST-001) and quantifies the cell area that
+became inactive between them.
+
+Every image is registered once to the sample's baseline image with an
+affine transform (coarse phase correlation, then per-tile phase
+correlation fitted by least squares) and kept as a pyramid in the
+baseline frame. The cell grid is periodic, so every correlation peak is
+searched within half a cell pitch of a prediction that cannot alias: the
+module outline for the global shift, the global transform for the tiles.
+Comparisons between any two intervals reuse the cached pyramids. The
+full-resolution pixels are memory-mapped and read once, into the
+half-resolution base level.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from components.crack_detection import detect_cell_grid
+from config.database import get_db
+from config.settings import config
+from database.models import TestExecution
+from utils.cache import LRUCache, content_hash
+from utils.images import box_filter, load_image
+
+
+# Pyramid levels are halved until the shorter side drops below this
+PYRAMID_MIN_SIZE = 128
+
+# Registration runs at this pyramid level (1 = quarter of full resolution)
+REGISTRATION_LEVEL = 1
+
+# Tile displacements further than this (level pixels) from the fit are dropped
+TILE_OUTLIER_PIXELS = 2.0
+
+_aligned_cache = None
+
+
+@dataclass
+class AlignedImage:
+    """An EL image resampled into its sample's baseline frame"""
+    image: str
+    pyramid: List[np.ndarray]  # Relative brightness, level 0 = half resolution
+    smoothed: np.ndarray  # Level-0 area brightness used for inactive-area masks
+    valid: np.ndarray  # Level-0 pixels covered by the moving image
+    transform: np.ndarray  # 2x3 affine: baseline level-0 (row, col, 1) -> image level-0 (row, col)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.pyramid) + self.smoothed.nbytes + self.valid.nbytes
+
+    def __len__(self) -> int:
+        # Sized in bytes for LRUCache
+        return self.nbytes
+
+    @property
+    def shift(self) -> Tuple[float, float]:
+        """Translation of the baseline origin in half-resolution pixels"""
+        return float(self.transform[0, 2]), float(self.transform[1, 2])
+
+    @property
+    def rotation_deg(self) -> float:
+        a = self.transform
+        return float(np.degrees(np.arctan2(a[1, 0] - a[0, 1], a[0, 0] + a[1, 1])))
+
+
+def _get_aligned_cache() -> LRUCache:
+    global _aligned_cache
+    if _aligned_cache is None:
+        _aligned_cache = LRUCache(
+            max_items=config.EL_PYRAMID_CACHE_ITEMS,
+            max_bytes=config.EL_PYRAMID_CACHE_MB * 1024 * 1024
+        )
+    return _aligned_cache
+
+
+def _image_key(path: Path) -> str:
+    """Cheap identity of an image file (path, size and mtime of the source)"""
+    path = Path(path)
+    stat = path.stat()
+    return content_hash(path.resolve(), stat.st_size, stat.st_mtime)
+
+
+def downsample(image: np.ndarray) -> np.ndarray:
+    """
+    Halve an image by 2x2 block means
+
+    Each source pixel is read once, so a memory-mapped 16-bit image is
+    never copied at full resolution.
+
+    Args:
+        image: 2-D array (any numeric dtype, may be a memmap)
+
+    Returns:
+        float32 array of half the size (odd edges are dropped)
+    """
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    result = image[0:height:2, 0:width:2].astype(np.float32)
+    result += image[1:height:2, 0:width:2]
+    result += image[0:height:2, 1:width:2]
+    result += image[1:height:2, 1:width:2]
+    result *= np.float32(0.25)
+    return result
+
+
+def build_pyramid(base: np.ndarray, min_size: int = PYRAMID_MIN_SIZE) -> List[np.ndarray]:
+    """Build a pyramid from a base level down to min_size"""
+    pyramid = [base]
+    while min(pyramid[-1].shape) // 2 >= min_size:
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def phase_correlation(
+    reference: np.ndarray,
+    moving: np.ndarray,
+    expected: Sequence[float] = (0.0, 0.0),
+    max_shift: Sequence[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimate translations between stacks of equally sized patches
+
+    Args:
+        reference: Array (..., h, w)
+        moving: Array (..., h, w)
+        expected: Predicted (row, col) shift the peak search is centred on,
+            (2,) or one per patch (..., 2)
+        max_shift: (row, col) search radius around expected in pixels
+            (defaults to the whole patch)
+
+    Returns:
+        Tuple of (shifts (..., 2) as (row, col) sub-pixel displacement of the
+        moving content, peak correlation strength (...))
+    """
+    height, width = reference.shape[-2:]
+    window = np.outer(np.hanning(height), np.hanning(width)).astype(np.float32)
+
+    def spectrum(patches):
+        patches = patches - patches.mean(axis=(-2, -1), keepdims=True)
+        return np.fft.rfft2(patches * window)
+
+    cross = spectrum(moving) * np.conj(spectrum(reference))
+    cross /= np.abs(cross) + 1e-12
+    surface = np.fft.irfft2(cross, s=(height, width))
+
+    flat = surface.reshape(surface.shape[:-2] + (-1,))
+    search = flat
+    if max_shift is not None:
+        # Signed (wrapped) shift of every surface position
+        row_offsets = (np.arange(height) + height // 2) % height - height // 2
+        col_offsets = (np.arange(width) + width // 2) % width - width // 2
+
+        def wrapped_distance(offsets, center, size):
+            return np.abs((offsets - center + size / 2) % size - size / 2)
+
+        expected = np.asarray(expected, dtype=np.float64)
+        inside = (
+            (wrapped_distance(row_offsets[:, None], expected[..., 0, None, None], height) <= max_shift[0]) &
+            (wrapped_distance(col_offsets[None, :], expected[..., 1, None, None], width) <= max_shift[1])
+        )
+        search = np.where(inside.reshape(inside.shape[:-2] + (-1,)), flat, -np.inf)
+
+    peak = np.argmax(search, axis=-1)
+    rows, cols = np.divmod(peak, width)
+    strength = np.take_along_axis(flat, peak[..., None], axis=-1)[..., 0]
+
+    def refine(center, size, neighbours):
+        # Parabolic interpolation of the peak and its wrapped neighbours
+        before, at, after = neighbours
+        denominator = before - 2 * at + after
+        offset = np.where(np.abs(denominator) > 1e-12, 0.5 * (before - after) / denominator, 0.0)
+        position = center + np.clip(offset, -0.5, 0.5)
+        return np.where(position >= size / 2, position - size, position)
+
+    def sample(r, c):
+        return np.take_along_axis(flat, ((r % height) * width + c % width)[..., None], axis=-1)[..., 0]
+
+    row_shift = refine(rows, height, (sample(rows - 1, cols), strength, sample(rows + 1, cols)))
+    col_shift = refine(cols, width, (sample(rows, cols - 1), strength, sample(rows, cols + 1)))
+
+    return np.stack([row_shift, col_shift], axis=-1), strength
+
+
+def _apply(transform: np.ndarray, points: np.ndarray) -> np.ndarray:
+    return points @ transform[:, :2].T + transform[:, 2]
+
+
+def _fit_affine(points: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Least-squares 2x3 affine mapping points (n, 2) to targets (n, 2)"""
+    design = np.column_stack([points, np.ones(len(points))])
+    solution, *_ = np.linalg.lstsq(design, targets, rcond=None)
+    return solution.T
+
+
+def estimate_transform(
+    reference: List[np.ndarray],
+    moving: List[np.ndarray],
+    rows: int = None,
+    columns: int = None
+) -> np.ndarray:
+    """
+    Estimate the affine transform from a reference pyramid to a moving one
+
+    The offset of the module outline between the coarsest levels predicts
+    the translation, which a global phase correlation refines within half a
+    cell pitch. Tiles at the registration level are then matched by phase
+    correlation within half a cell pitch of the current prediction and an
+    affine transform is fitted to the tile displacements (twice, dropping
+    tiles whose peak sits on the search border and outliers of the fit).
+    Without the pitch bound the periodic cell grid lets any
+    correlation lock onto a neighbouring cell.
+
+    Args:
+        reference: Reference pyramid (level 0 first)
+        moving: Moving pyramid
+        rows: Cell rows (defaults to config)
+        columns: Cell columns (defaults to config)
+
+    Returns:
+        2x3 affine transform in level-0 coordinates
+    """
+    top = min(len(reference), len(moving)) - 1
+    shape = np.minimum(reference[top].shape, moving[top].shape)
+
+    # Module outline offset and half cell pitch at the coarsest level
+    reference_grid = detect_cell_grid(reference[top], rows, columns)
+    moving_grid = detect_cell_grid(moving[top], rows, columns)
+    outline_shift = [
+        (moved[0] + moved[-1] - edges[0] - edges[-1]) / 2
+        for edges, moved in zip(reference_grid, moving_grid)
+    ]
+    half_pitch = np.array([(edges[-1] - edges[0]) / (len(edges) - 1) / 2 for edges in reference_grid])
+
+    shift, _ = phase_correlation(
+        reference[top][:shape[0], :shape[1]], moving[top][:shape[0], :shape[1]],
+        expected=outline_shift, max_shift=half_pitch
+    )
+    transform = np.array([[1.0, 0.0, shift[0]], [0.0, 1.0, shift[1]]]) * [1, 1, 2 ** top]
+
+    level = min(REGISTRATION_LEVEL, top)
+    scale = 2 ** level
+    ref, mov = reference[level], moving[level]
+    tile_half_pitch = half_pitch * 2 ** (top - level)
+    tiles = config.EL_REGISTRATION_TILES
+    tile_h, tile_w = ref.shape[0] // tiles, ref.shape[1] // tiles
+
+    origins = np.array([(i * tile_h, j * tile_w) for i in range(tiles) for j in range(tiles)])
+    centers = origins + [tile_h / 2, tile_w / 2]
+    ref_tiles = np.stack([ref[r:r + tile_h, c:c + tile_w] for r, c in origins])
+
+    for _ in range(2):
+        # Moving tiles cut around the predicted position of each reference tile
+        predicted = _apply(transform, centers * scale) / scale
+        starts = np.round(predicted - [tile_h / 2, tile_w / 2]).astype(np.int64)
+        starts = np.clip(starts, 0, np.array(mov.shape) - [tile_h, tile_w])
+        mov_tiles = np.stack([mov[r:r + tile_h, c:c + tile_w] for r, c in starts])
+
+        expected = predicted - starts - [tile_h / 2, tile_w / 2]
+        shifts, strength = phase_correlation(ref_tiles, mov_tiles, expected, tile_half_pitch)
+        matched = origins + shifts + (starts - origins) + [tile_h / 2, tile_w / 2]
+
+        # A peak on the search border means the match lies outside it
+        keep = (strength > 0) & np.all(np.abs(shifts - expected) < tile_half_pitch - 1, axis=1)
+        if keep.sum() < 3:
+            break
+
+        fitted = _fit_affine(centers[keep] * scale, matched[keep] * scale)
+        residual = np.hypot(*((_apply(fitted, centers * scale) - matched * scale).T)) / scale
+        keep &= residual <= max(TILE_OUTLIER_PIXELS, np.median(residual[keep]) * 3)
+        if keep.sum() >= 3:
+            fitted = _fit_affine(centers[keep] * scale, matched[keep] * scale)
+        transform = fitted
+
+    return transform
+
+
+def warp(image: np.ndarray, transform: np.ndarray, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resample an image into the reference frame (bilinear)
+
+    Args:
+        image: Moving image (level 0)
+        transform: 2x3 affine reference (row, col, 1) -> moving (row, col)
+        shape: Reference level-0 shape
+
+    Returns:
+        Tuple of (warped float32 image, valid mask)
+    """
+    rows = np.arange(shape[0], dtype=np.float32)[:, None]
+    cols = np.arange(shape[1], dtype=np.float32)[None, :]
+    source_rows = transform[0, 0] * rows + transform[0, 1] * cols + np.float32(transform[0, 2])
+    source_cols = transform[1, 0] * rows + transform[1, 1] * cols + np.float32(transform[1, 2])
+
+    height, width = image.shape
+    valid = (source_rows >= 0) & (source_rows <= height - 1) & (source_cols >= 0) & (source_cols <= width - 1)
+
+    r0 = np.clip(np.floor(source_rows), 0, height - 2).astype(np.int64)
+    c0 = np.clip(np.floor(source_cols), 0, width - 2).astype(np.int64)
+    fr = np.clip(source_rows - r0, 0, 1).astype(np.float32)
+    fc = np.clip(source_cols - c0, 0, 1).astype(np.float32)
+
+    flat = image.ravel()
+    index = r0 * width + c0
+    top = flat[index] * (1 - fc) + flat[index + 1] * fc
+    bottom = flat[index + width] * (1 - fc) + flat[index + width + 1] * fc
+    warped = top * (1 - fr) + bottom * fr
+    warped[~valid] = 0
+
+    return warped.astype(np.float32), valid
+
+
+def _normalized_base(path: Path) -> np.ndarray:
+    """Half-resolution image scaled to the module bright level"""
+    base = downsample(load_image(path))
+    base *= np.float32(1.0 / (float(np.percentile(base[::4, ::4], 90)) or 1.0))
+    return base
+
+
+def _aligned_image(path: Path, base: np.ndarray, valid: np.ndarray, transform: np.ndarray) -> AlignedImage:
+    """Wrap a baseline-frame image with its pyramid and area brightness"""
+    smoothed = box_filter(base, max(3, min(base.shape) // 100))
+    smoothed[~valid] = 0
+    return AlignedImage(
+        image=Path(path).name,
+        pyramid=build_pyramid(base),
+        smoothed=smoothed,
+        valid=valid,
+        transform=transform
+    )
+
+
+def get_aligned(
+    sample_id: str,
+    reference_path: Path,
+    path: Path,
+    rows: int = None,
+    columns: int = None
+) -> AlignedImage:
+    """
+    Get an image aligned to its sample's baseline, registering it if needed
+
+    Args:
+        sample_id: Sample the images belong to
+        reference_path: Baseline EL image of the sample
+        path: EL image to align
+        rows: Cell rows (defaults to config)
+        columns: Cell columns (defaults to config)
+
+    Returns:
+        AlignedImage in the baseline frame
+    """
+    cache = _get_aligned_cache()
+    reference_key = _image_key(reference_path)
+    key = content_hash('el-aligned', sample_id, reference_key, _image_key(path))
+
+    aligned = cache.get(key)
+    if aligned is not None:
+        return aligned
+
+    if key == content_hash('el-aligned', sample_id, reference_key, reference_key):
+        base = _normalized_base(reference_path)
+        aligned = _aligned_image(
+            path, base, np.ones(base.shape, dtype=bool), np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+        )
+    else:
+        reference = get_aligned(sample_id, reference_path, reference_path)
+        base = _normalized_base(path)
+        transform = estimate_transform(reference.pyramid, build_pyramid(base), rows, columns)
+        warped, valid = warp(base, transform, reference.pyramid[0].shape)
+        aligned = _aligned_image(path, warped, valid, transform)
+
+    cache.put(key, aligned)
+    return aligned
+
+
+def compare_aligned(
+    before: AlignedImage,
+    after: AlignedImage,
+    row_edges: np.ndarray,
+    column_edges: np.ndarray
+) -> Dict[str, Any]:
+    """
+    Quantify new inactive area between two aligned images
+
+    Args:
+        before: Earlier image
+        after: Later image
+        row_edges: Cell row boundaries in level-0 pixels
+        column_edges: Cell column boundaries in level-0 pixels
+
+    Returns:
+        Dictionary with new_inactive_area_pct, new_inactive_cells,
+        brightness_change_pct, cell_new_inactive (per-cell fraction) and
+        cell_brightness_change (per-cell relative change)
+    """
+    level = config.EL_INACTIVE_LEVEL
+
+    top, bottom = row_edges[0], row_edges[-1]
+    left, right = column_edges[0], column_edges[-1]
+    window = (slice(top, bottom), slice(left, right))
+
+    smooth_before = before.smoothed[window]
+    smooth_after = after.smoothed[window]
+    valid = (before.valid & after.valid)[window]
+
+    new_inactive = (smooth_after < level) & (smooth_before >= level) & valid
+
+    def per_cell(values):
+        sums = np.add.reduceat(values, row_edges[:-1] - top, axis=0)
+        return np.add.reduceat(sums, column_edges[:-1] - left, axis=1)
+
+    counts = per_cell(valid.astype(np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cell_new = per_cell(new_inactive.astype(np.float64)) / counts
+        cell_change = (
+            per_cell(np.where(valid, smooth_after, 0.0)) / per_cell(np.where(valid, smooth_before, 0.0)) - 1
+        )
+
+    return {
+        'before': before.image,
+        'after': after.image,
+        'new_inactive_area_pct': float(new_inactive.sum() / max(valid.sum(), 1) * 100),
+        'new_inactive_cells': int(np.sum(cell_new > config.EL_MODE_AREA_FRACTION)),
+        'brightness_change_pct': float(np.nanmean(cell_change) * 100),
+        'cell_new_inactive': np.round(np.nan_to_num(cell_new), 4).tolist(),
+        'cell_brightness_change': np.round(np.nan_to_num(cell_change), 4).tolist(),
+        'shift_px': list(after.shift),
+        'rotation_deg': after.rotation_deg
+    }
+
+
+def compare_images(
+    sample_id: str,
+    paths: Sequence[Path],
+    rows: int = None,
+    columns: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Compare consecutive EL images of a sample
+
+    The first image is the baseline frame. Each comparison reports the new
+    inactive area since the previous image and since the baseline.
+
+    Args:
+        sample_id: Sample the images belong to
+        paths: EL images in acquisition order
+        rows: Cell rows (defaults to config)
+        columns: Cell columns (defaults to config)
+
+    Returns:
+        One comparison dictionary per image after the first
+    """
+    aligned = [get_aligned(sample_id, paths[0], path, rows, columns) for path in paths]
+    row_edges, column_edges = detect_cell_grid(aligned[0].pyramid[0], rows, columns)
+
+    comparisons = []
+    for previous, current in zip(aligned[:-1], aligned[1:]):
+        comparison = compare_aligned(previous, current, row_edges, column_edges)
+        if previous is not aligned[0]:
+            cumulative = compare_aligned(aligned[0], current, row_edges, column_edges)
+            comparison['cumulative_new_inactive_area_pct'] = cumulative['new_inactive_area_pct']
+        else:
+            comparison['cumulative_new_inactive_area_pct'] = comparison['new_inactive_area_pct']
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+def analyze_progression(
+    test_execution_id: int,
+    paths: Sequence[Path] = None,
+    save: bool = True,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Run defect progression analysis on the EL images of a test execution
+
+    Images are taken from paths, else raw_data['el_images'] (file paths in
+    acquisition order, or a dict of interval label -> path).
+
+    Args:
+        test_execution_id: Test execution ID
+        paths: EL images in acquisition order
+        save: Store comparisons in processed_data['defect_progression']
+        kwargs: Options of compare_images
+
+    Returns:
+        List of comparisons (empty on error or with fewer than two images)
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            if test is None:
+                return []
+            sample_id = test.sample_id or test.execution_number
+            images = paths or (test.raw_data or {}).get('el_images') or []
+
+        labels = list(images.keys()) if isinstance(images, dict) else [Path(p).name for p in images]
+        images = list(images.values()) if isinstance(images, dict) else list(images)
+        if len(images) < 2:
+            return []
+
+        comparisons = compare_images(sample_id, images, **kwargs)
+        for comparison, before, after in zip(comparisons, labels[:-1], labels[1:]):
+            comparison['interval'] = f"{before} -> {after}"
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+                processed = dict(test.processed_data or {})
+                processed['defect_progression'] = {'baseline': labels[0], 'comparisons': comparisons}
+                test.processed_data = processed
+
+        return comparisons
+
+    except Exception as e:
+        print(f"Error analyzing defect progression: {e}")
+        return []
@@ -0,0 +1,430 @@
+"""
+Energy Rating Engine - IEC 61853-3 climate specific energy rating
+=================================================================
+Computes annual energy yield and the Climate Specific Energy Rating (CSER)
+of modules from their irradiance x temperature power matrix, evaluated
+hour by hour over reference climate profiles.
+
+Climate profiles are read from CLIMATE_PROFILES_DIR, one CSV file per
+climate named after it (e.g. ``subtropical_arid.csv``), with 8760 hourly
+rows and the columns:
+
+    poa_irradiance       In-plane irradiance (W/m²)
+    ambient_temperature  Ambient air temperature (°C)
+    wind_speed           Wind speed (m/s)
+
+Spectral and angle-of-incidence corrections are not applied; the in-plane
+irradiance is assumed to be effective irradiance.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from components.performance_matrix import PerformanceMatrix, get_execution_matrix
+from config.database import get_db
+from config.settings import config, CLIMATE_PROFILES_DIR
+from database.models import TestExecution
+from utils.cache import LRUCache, content_hash
+
+
+# Reference climates of IEC 61853-4
+REFERENCE_CLIMATES = (
+    'tropical_humid',
+    'subtropical_arid',
+    'subtropical_coastal',
+    'temperate_coastal',
+    'high_elevation',
+    'temperate_continental'
+)
+
+CLIMATE_COLUMNS = ('poa_irradiance', 'ambient_temperature', 'wind_speed')
+HOURS_PER_YEAR = 8760
+
+# First hour of each month in a non-leap year
+MONTH_START_HOURS = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30]) * 24
+
+STC_IRRADIANCE = 1000.0  # W/m²
+STC_TEMPERATURE = 25.0  # °C
+
+# Modules evaluated together per gather (bounds the (modules x hours) arrays)
+MODULE_CHUNK_SIZE = 256
+
+# Columns of the rating table
+RATING_COLUMNS = [
+    'module', 'climate', 'annual_energy_kwh', 'specific_yield', 'cser',
+    'thermal_loss_pct', 'monthly_energy_kwh'
+]
+
+_interpolant_cache = LRUCache(max_items=1024)
+_climate_cache = LRUCache(max_items=16)
+
+
+@dataclass
+class ClimateProfile:
+    """Hourly reference climate for one year"""
+    name: str
+    irradiance: np.ndarray  # W/m²
+    ambient_temperature: np.ndarray  # °C
+    wind_speed: np.ndarray  # m/s
+
+    @property
+    def annual_irradiation(self) -> float:
+        """In-plane irradiation over the year (kWh/m²)"""
+        return float(np.sum(np.clip(self.irradiance, 0, None))) / 1000
+
+
+def available_climates() -> List[str]:
+    """
+    List climate profiles present in CLIMATE_PROFILES_DIR
+
+    Returns:
+        Sorted climate names
+    """
+    if not CLIMATE_PROFILES_DIR.exists():
+        return []
+    return sorted(path.stem for path in CLIMATE_PROFILES_DIR.glob('*.csv'))
+
+
+def load_climate_profile(name: str) -> ClimateProfile:
+    """
+    Load a climate profile (cached until the file changes)
+
+    Args:
+        name: Climate name (file stem in CLIMATE_PROFILES_DIR)
+
+    Returns:
+        ClimateProfile
+
+    Raises:
+        FileNotFoundError: If the profile file does not exist
+        ValueError: If the file does not hold 8760 hourly rows
+    """
+    path = CLIMATE_PROFILES_DIR / f"{name}.csv"
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Climate profile '{name}' not found at {path}; expected a CSV with "
+            f"{HOURS_PER_YEAR} hourly rows and columns {', '.join(CLIMATE_COLUMNS)}"
+        )
+
+    key = f"{path}:{path.stat().st_mtime_ns}"
+    profile = _climate_cache.get(key)
+    if profile is not None:
+        return profile
+
+    df = pd.read_csv(path, usecols=list(CLIMATE_COLUMNS), dtype=np.float64)
+    if len(df) != HOURS_PER_YEAR:
+        raise ValueError(
+            f"Climate profile '{name}' has {len(df)} rows, expected {HOURS_PER_YEAR}"
+        )
+
+    profile = ClimateProfile(
+        name=name,
+        irradiance=df['poa_irradiance'].to_numpy(),
+        ambient_temperature=df['ambient_temperature'].to_numpy(),
+        wind_speed=df['wind_speed'].to_numpy()
+    )
+    _climate_cache.put(key, profile)
+    return profile
+
+
+def module_temperature(
+    irradiance: np.ndarray,
+    ambient_temperature: np.ndarray,
+    wind_speed: np.ndarray,
+    u0: float = None,
+    u1: float = None
+) -> np.ndarray:
+    """
+    Module temperature from the IEC 61853-3 (Faiman) model
+
+    Args:
+        irradiance: In-plane irradiance (W/m²)
+        ambient_temperature: Ambient temperature (°C)
+        wind_speed: Wind speed (m/s)
+        u0: Constant heat transfer coefficient (W/(m²·K))
+        u1: Wind heat transfer coefficient (W·s/(m³·K))
+
+    Returns:
+        Module temperature (°C)
+    """
+    u0 = config.ENERGY_RATING_U0 if u0 is None else u0
+    u1 = config.ENERGY_RATING_U1 if u1 is None else u1
+    return ambient_temperature + np.clip(irradiance, 0, None) / (u0 + u1 * wind_speed)
+
+
+def _bracket(levels: np.ndarray, x: np.ndarray, clamp_low: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lower grid index and interpolation weight for each value
+
+    Weights outside [0, 1] extrapolate linearly from the edge interval.
+
+    Args:
+        levels: Ascending grid levels
+        x: Values to locate
+        clamp_low: Hold the first level's value below the grid
+
+    Returns:
+        Tuple of (index, weight)
+    """
+    if len(levels) == 1:
+        return np.zeros(len(x), dtype=np.intp), np.zeros(len(x))
+
+    index = np.clip(np.searchsorted(levels, x) - 1, 0, len(levels) - 2)
+    weight = (x - levels[index]) / (levels[index + 1] - levels[index])
+
+    if clamp_low:
+        weight = np.where(x < levels[0], 0.0, weight)
+
+    return index, weight
+
+
+def _grid_power(
+    efficiency: np.ndarray,
+    irradiance_levels: np.ndarray,
+    temperature_levels: np.ndarray,
+    irradiance: np.ndarray,
+    temperature: np.ndarray
+) -> np.ndarray:
+    """
+    Bilinear power for a stack of modules sharing one grid
+
+    Args:
+        efficiency: Power per irradiance (m, n_temperature, n_irradiance)
+        irradiance_levels: Grid irradiance levels
+        temperature_levels: Grid temperature levels
+        irradiance: Operating irradiance per hour (W/m²)
+        temperature: Module temperature per hour (°C)
+
+    Returns:
+        Power in W, shape (m, n_hours)
+    """
+    n_irr = len(irradiance_levels)
+    gi, wg = _bracket(irradiance_levels, irradiance, clamp_low=True)
+    ti, wt = _bracket(temperature_levels, temperature)
+    gj = np.minimum(gi + 1, n_irr - 1)
+    tj = np.minimum(ti + 1, len(temperature_levels) - 1)
+
+    flat = efficiency.reshape(efficiency.shape[0], -1)
+    low = flat[:, ti * n_irr + gi] * (1 - wg) + flat[:, ti * n_irr + gj] * wg
+    high = flat[:, tj * n_irr + gi] * (1 - wg) + flat[:, tj * n_irr + gj] * wg
+
+    power = (low * (1 - wt) + high * wt) * irradiance
+    return np.clip(power, 0, None)
+
+
+class MatrixInterpolant:
+    """
+    Bilinear interpolant of a module power matrix
+
+    Power per unit irradiance is interpolated rather than power itself, so
+    power goes to zero with irradiance and is linear between grid levels at
+    constant efficiency. Below the lowest irradiance level the efficiency
+    of that level is held.
+    """
+
+    def __init__(self, irradiance: Sequence[float], temperature: Sequence[float], power: np.ndarray):
+        self.irradiance = np.asarray(irradiance, dtype=np.float64)
+        self.temperature = np.asarray(temperature, dtype=np.float64)
+        power = np.asarray(power, dtype=np.float64)
+
+        if power.shape != (len(self.temperature), len(self.irradiance)):
+            raise ValueError("Power matrix shape does not match the grid levels")
+        if not np.all(np.isfinite(power)):
+            raise ValueError("Power matrix has unfilled cells")
+        if np.any(self.irradiance <= 0):
+            raise ValueError("Irradiance levels must be positive")
+
+        self.efficiency = power / self.irradiance[np.newaxis, :]
+        self.grid_key = content_hash(self.irradiance.tobytes(), self.temperature.tobytes())
+        self.stc_power = float(self.power(STC_IRRADIANCE, STC_TEMPERATURE))
+
+    def power(self, irradiance, temperature) -> np.ndarray:
+        """
+        Interpolated power
+
+        Args:
+            irradiance: Irradiance (W/m²), scalar or array
+            temperature: Module temperature (°C), scalar or array
+
+        Returns:
+            Power in W (same shape as the broadcast inputs)
+        """
+        g, t = np.broadcast_arrays(
+            np.asarray(irradiance, dtype=np.float64),
+            np.asarray(temperature, dtype=np.float64)
+        )
+        power = _grid_power(
+            self.efficiency[np.newaxis], self.irradiance, self.temperature,
+            g.ravel(), t.ravel()
+        )
+        return power[0].reshape(g.shape)
+
+
+def get_interpolant(
+    matrix: Union[PerformanceMatrix, MatrixInterpolant]
+) -> MatrixInterpolant:
+    """
+    Get the (cached) interpolant of a power matrix
+
+    Args:
+        matrix: PerformanceMatrix of power, or an existing interpolant
+
+    Returns:
+        MatrixInterpolant
+    """
+    if isinstance(matrix, MatrixInterpolant):
+        return matrix
+
+    irradiance = np.asarray(matrix.irradiance, dtype=np.float64)
+    temperature = np.asarray(matrix.temperature, dtype=np.float64)
+    values = np.asarray(matrix.values, dtype=np.float64)
+
+    key = content_hash(irradiance.tobytes(), temperature.tobytes(), values.tobytes())
+    interpolant = _interpolant_cache.get(key)
+    if interpolant is None:
+        interpolant = MatrixInterpolant(irradiance, temperature, values)
+        _interpolant_cache.put(key, interpolant)
+
+    return interpolant
+
+
+def rate_modules(
+    matrices: Sequence[Union[PerformanceMatrix, MatrixInterpolant]],
+    climates: Sequence[str] = None,
+    module_ids: Sequence[Any] = None,
+    u0: float = None,
+    u1: float = None
+) -> pd.DataFrame:
+    """
+    Compute energy yield and CSER for many modules over reference climates
+
+    Modules sharing a grid are evaluated together: grid weights are computed
+    once per climate and the four matrix corners are gathered for all
+    modules and daylight hours in one operation.
+
+    Args:
+        matrices: Power matrices (PerformanceMatrix of 'pmax' or interpolants)
+        climates: Climate names (defaults to all available profiles)
+        module_ids: Identifier per module (defaults to the position)
+        u0: Temperature model constant coefficient
+        u1: Temperature model wind coefficient
+
+    Returns:
+        DataFrame with one row per module and climate: module, climate,
+        annual_energy_kwh, specific_yield (kWh/kWp), cser, thermal_loss_pct,
+        monthly_energy_kwh (list of 12)
+
+    Raises:
+        FileNotFoundError: If climates is not given and no climate profile
+            is available
+    """
+    interpolants = [get_interpolant(m) for m in matrices]
+    module_ids = list(module_ids) if module_ids is not None else list(range(len(interpolants)))
+    if climates is None:
+        climates = available_climates()
+        if not climates:
+            raise FileNotFoundError(
+                f"No climate profiles found in {CLIMATE_PROFILES_DIR}; add IEC 61853-4 "
+                f"reference climate CSV files to compute an energy rating"
+            )
+    climates = list(climates)
+
+    stc_kw = np.array([interp.stc_power for interp in interpolants]) / 1000
+
+    groups: Dict[str, List[int]] = {}
+    for position, interp in enumerate(interpolants):
+        groups.setdefault(interp.grid_key, []).append(position)
+
+    records = []
+    for climate in climates:
+        profile = load_climate_profile(climate)
+        t_module = module_temperature(
+            profile.irradiance, profile.ambient_temperature, profile.wind_speed, u0, u1
+        )
+
+        daylight = np.flatnonzero(profile.irradiance > 0)
+        g = profile.irradiance[daylight]
+        t = t_module[daylight]
+        t_stc = np.full(len(daylight), STC_TEMPERATURE)
+        month_offsets = np.searchsorted(daylight, MONTH_START_HOURS)
+
+        energy = np.zeros(len(interpolants))
+        energy_25c = np.zeros(len(interpolants))
+        monthly = np.zeros((len(interpolants), 12))
+
+        for positions in groups.values():
+            first = interpolants[positions[0]]
+
+            for start in range(0, len(positions), MODULE_CHUNK_SIZE):
+                chunk = positions[start:start + MODULE_CHUNK_SIZE]
+                stack = np.stack([interpolants[i].efficiency for i in chunk])
+
+                power = _grid_power(stack, first.irradiance, first.temperature, g, t)
+                power_25c = _grid_power(stack, first.irradiance, first.temperature, g, t_stc)
+
+                # Hourly values in W are Wh; pad so empty months reduce to zero
+                padded = np.concatenate([power, np.zeros((len(chunk), 1))], axis=1)
+                monthly[chunk] = np.add.reduceat(padded, month_offsets, axis=1) / 1000
+                monthly[chunk] *= np.diff(np.append(month_offsets, len(daylight))) > 0
+                energy[chunk] = power.sum(axis=1) / 1000
+                energy_25c[chunk] = power_25c.sum(axis=1) / 1000
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            specific_yield = energy / stc_kw
+            cser = specific_yield / profile.annual_irradiation
+            thermal_loss = (1 - energy / energy_25c) * 100
+
+        for i, module_id in enumerate(module_ids):
+            records.append({
+                'module': module_id,
+                'climate': climate,
+                'annual_energy_kwh': float(energy[i]),
+                'specific_yield': float(specific_yield[i]),
+                'cser': float(cser[i]),
+                'thermal_loss_pct': float(thermal_loss[i]),
+                'monthly_energy_kwh': monthly[i].round(4).tolist()
+            })
+
+    return pd.DataFrame(records, columns=RATING_COLUMNS)
+
+
+def rate_execution(
+    test_execution_id: int,
+    climates: Sequence[str] = None,
+    save: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Energy-rate the module of a PERF-001 execution
+
+    Args:
+        test_execution_id: Test execution with a power matrix
+        climates: Climate names (defaults to all available profiles)
+        save: Store the results in processed_data['energy_rating']
+
+    Returns:
+        DataFrame as returned by rate_modules, or None on error
+    """
+    matrix = get_execution_matrix(test_execution_id, quantity='pmax')
+    if matrix is None:
+        return None
+
+    try:
+        rating = rate_modules([matrix], climates, module_ids=[test_execution_id])
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(
+                    TestExecution.id == test_execution_id
+                ).first()
+                processed = dict(test.processed_data or {})
+                processed['energy_rating'] = rating.drop(columns='module').to_dict('records')
+                test.processed_data = processed
+
+        return rating
+
+    except Exception as e:
+        print(f"Error calculating energy rating: {e}")
+        return None
@@ -0,0 +1,156 @@
+"""
+Figure Cache - Reuse Plotly figures across Streamlit reruns and sessions
+========================================================================
+Figures are stored as serialized JSON keyed by a fingerprint of the builder
+name and its input data, so unchanged charts are not rebuilt on rerun.
+"""
+
+import functools
+import hashlib
+import json
+from datetime import date
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.settings import config
+from utils.cache import LRUCache
+
+
+# Process-wide cache shared by all Streamlit sessions
+_figure_cache = LRUCache(
+    max_items=config.FIGURE_CACHE_MAX_ITEMS,
+    max_bytes=config.FIGURE_CACHE_MAX_MB * 1024 * 1024
+)
+
+
+def _update_fingerprint(digest, value: Any):
+    """Feed a builder argument into the fingerprint digest"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(b'df')
+        digest.update(repr((list(value.columns), list(value.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, (pd.Series, pd.Index)):
+        digest.update(b'series')
+        digest.update(repr((value.name, str(value.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        _update_array(digest, value)
+    elif isinstance(value, (list, tuple)):
+        timestamps = _as_datetime_index(value)
+        array = _as_plain_array(value) if timestamps is None else None
+        if timestamps is not None:
+            # Hashed as int64 nanoseconds instead of a repr per datetime object
+            digest.update(repr((type(value[0]).__name__, str(timestamps.tz))).encode())
+            _update_array(digest, timestamps.asi8)
+        elif array is not None:
+            _update_array(digest, array)
+        else:
+            digest.update(b'[')
+            for item in value:
+                _update_fingerprint(digest, item)
+            digest.update(b']')
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            _update_fingerprint(digest, value[key])
+        digest.update(b'}')
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b'\x1f')
+
+
+def _update_array(digest, array: np.ndarray):
+    """Hash an array by dtype, shape and raw contents"""
+    digest.update(repr((array.dtype.str, array.shape)).encode())
+    if array.dtype.hasobject:
+        digest.update(repr(array.tolist()).encode())
+    else:
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+
+def _as_plain_array(values) -> Any:
+    """Convert a list of numbers/datetimes to an array, or None if mixed"""
+    if not values:
+        return None
+    try:
+        array = np.asarray(values)
+    except (ValueError, TypeError):
+        return None
+    if array.dtype.kind in 'biufcmM':
+        return array
+    return None
+
+
+def _as_datetime_index(values) -> Any:
+    """Convert a list of datetime objects of one type to a DatetimeIndex, or None"""
+    if not values or not isinstance(values[0], (date, np.datetime64)):
+        return None
+    if len({type(value) for value in values}) != 1:
+        return None
+    try:
+        return pd.DatetimeIndex(list(values))
+    except (ValueError, TypeError):
+        return None
+
+
+def figure_fingerprint(builder_name: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """
+    Compute the cache key for a figure builder call
+
+    Args:
+        builder_name: Qualified name of the builder function
+        args: Positional arguments
+        kwargs: Keyword arguments
+
+    Returns:
+        Hexadecimal fingerprint
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(builder_name.encode())
+    _update_fingerprint(digest, args)
+    _update_fingerprint(digest, kwargs)
+    return digest.hexdigest()
+
+
+def cached_figure(builder: Callable[..., go.Figure]) -> Callable[..., go.Figure]:
+    """
+    Decorator caching a figure builder's output by input fingerprint
+
+    Each call returns a new Figure, so callers may modify it freely.
+    """
+    builder_name = f"{builder.__module__}.{builder.__qualname__}"
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs) -> go.Figure:
+        key = figure_fingerprint(builder_name, args, kwargs)
+
+        fig_json = _figure_cache.get(key)
+        if fig_json is None:
+            fig = builder(*args, **kwargs)
+            # Stored as UTF-8 bytes so the cache's len() sizing counts bytes
+            _figure_cache.put(key, fig.to_json().encode())
+            return fig
+
+        # The JSON came from a validated figure, so skip re-validation
+        return go.Figure(json.loads(fig_json), _validate=False)
+
+    return wrapper
+
+
+def get_figure_cache_stats() -> Dict[str, Any]:
+    """
+    Get figure cache statistics
+
+    Returns:
+        Dictionary with item count, bytes, hits, misses and hit rate
+    """
+    return _figure_cache.stats()
+
+
+def clear_figure_cache():
+    """Remove all cached figures"""
+    _figure_cache.clear()
@@ -0,0 +1,587 @@
+"""
+IAM Analysis - IAM-001 incidence angle modifier fitting and angular losses
+==========================================================================
+Fits the ASHRAE, Martin-Ruiz and physical (Fresnel with glass absorption)
+incidence angle modifier models to angle-resolved short-circuit current
+measurements of IEC 61853-2, and computes annual angular losses at
+reference sites.
+
+Fitting is batched: curves measured at the same angles are fitted
+together, ASHRAE in closed form and the one-parameter Martin-Ruiz and
+physical models by evaluating a table of candidate curves and refining the
+best candidate with a parabola, where the squared errors of every curve
+against every candidate are matrix products.
+
+Sun position tables are read from SUN_POSITION_DIR, one CSV file per site
+(e.g. ``golden_co.csv``) with hourly rows and the columns:
+
+    solar_zenith   Solar zenith angle (°)
+    solar_azimuth  Solar azimuth (°, clockwise from north)
+    dni            Direct normal irradiance (W/m²)
+    dhi            Diffuse horizontal irradiance (W/m²)
+    ghi            Global horizontal irradiance (W/m², optional)
+
+For each site and module orientation the table is reduced once to an
+irradiance-weighted histogram of the angle of incidence, so the annual
+angular loss of any number of modules is a single matrix product.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.database import get_db
+from config.settings import config, SUN_POSITION_DIR
+from database.models import TestExecution
+from utils.cache import LRUCache
+
+
+IAM_MODELS = ('ashrae', 'martin_ruiz', 'physical')
+
+# Fitted parameter of each model
+MODEL_PARAMETERS = {
+    'ashrae': 'b0',
+    'martin_ruiz': 'a_r',
+    'physical': 'n'
+}
+
+# Candidate parameter values searched by the table fit
+MARTIN_RUIZ_CANDIDATES = np.linspace(0.05, 1.0, 381)
+PHYSICAL_CANDIDATES = np.linspace(1.05, 2.5, 291)
+
+SUN_POSITION_COLUMNS = ('solar_zenith', 'solar_azimuth', 'dni', 'dhi')
+
+# Columns of the angular loss table
+LOSS_COLUMNS = ['device', 'site', 'beam_loss_pct', 'total_loss_pct']
+
+_sun_cache = LRUCache(max_items=16)
+_weights_cache = LRUCache(max_items=128)
+
+
+def iam_ashrae(theta: np.ndarray, b0) -> np.ndarray:
+    """
+    ASHRAE model: IAM = 1 - b0 (1/cos θ - 1), clipped to [0, 1]
+
+    Args:
+        theta: Angle of incidence (°)
+        b0: Model parameter (broadcast against theta)
+
+    Returns:
+        IAM
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        secant = 1 / np.cos(np.radians(np.minimum(theta, 90)))
+    iam = 1 - np.asarray(b0) * (secant - 1)
+    return np.where(theta < 90, np.clip(iam, 0, 1), 0.0)
+
+
+def iam_martin_ruiz(theta: np.ndarray, a_r) -> np.ndarray:
+    """
+    Martin-Ruiz model: IAM = (1 - exp(-cos θ / a_r)) / (1 - exp(-1 / a_r))
+
+    Args:
+        theta: Angle of incidence (°)
+        a_r: Angular losses coefficient (broadcast against theta)
+
+    Returns:
+        IAM
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    a_r = np.asarray(a_r, dtype=np.float64)
+    cos_theta = np.cos(np.radians(np.minimum(theta, 90)))
+    iam = -np.expm1(-cos_theta / a_r) / -np.expm1(-1 / a_r)
+    return np.where(theta < 90, iam, 0.0)
+
+
+def _fresnel_transmittance(theta: np.ndarray, n, extinction: float) -> np.ndarray:
+    """Transmittance of a glass cover with absorption at incidence theta (radians)"""
+    theta = np.maximum(theta, 1e-6)
+    refracted = np.arcsin(np.sin(theta) / n)
+    s_polarized = np.sin(refracted - theta) ** 2 / np.sin(refracted + theta) ** 2
+    p_polarized = np.tan(refracted - theta) ** 2 / np.tan(refracted + theta) ** 2
+    return np.exp(-extinction / np.cos(refracted)) * (1 - (s_polarized + p_polarized) / 2)
+
+
+def iam_physical(theta: np.ndarray, n, extinction: float = None) -> np.ndarray:
+    """
+    Physical model: Fresnel reflection and absorption in the front glass
+
+    Args:
+        theta: Angle of incidence (°)
+        n: Refractive index (broadcast against theta)
+        extinction: Glass extinction K·L (defaults to IAM_GLASS_EXTINCTION)
+
+    Returns:
+        IAM
+    """
+    extinction = config.IAM_GLASS_EXTINCTION if extinction is None else extinction
+    theta = np.asarray(theta, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+
+    normal = np.exp(-extinction) * (1 - ((n - 1) / (n + 1)) ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iam = _fresnel_transmittance(np.radians(np.minimum(theta, 89.999)), n, extinction) / normal
+    return np.where(theta < 90, np.nan_to_num(iam), 0.0)
+
+
+MODEL_FUNCTIONS = {
+    'ashrae': iam_ashrae,
+    'martin_ruiz': iam_martin_ruiz,
+    'physical': iam_physical
+}
+
+
+def cosine_correction(angle: np.ndarray, isc: np.ndarray, isc_normal: float = None) -> np.ndarray:
+    """
+    IAM from short-circuit current measured at constant normal irradiance
+
+    The current is divided by its normal-incidence value and by cos θ, the
+    share of the beam intercepted by the tilted module.
+
+    Args:
+        angle: Angle of incidence (°)
+        isc: Short-circuit current (any unit, or already normalized)
+        isc_normal: Current at normal incidence (defaults to the value at
+            the angle closest to 0°, so -80…+80° sweeps work)
+
+    Returns:
+        IAM per angle (NaN at or beyond ±90°)
+    """
+    angle = np.abs(np.asarray(angle, dtype=np.float64))
+    isc = np.asarray(isc, dtype=np.float64)
+    if isc_normal is None:
+        isc_normal = isc[np.nanargmin(angle)]
+
+    cos_theta = np.cos(np.radians(angle))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(angle < 90, isc / (isc_normal * cos_theta), np.nan)
+
+
+def _table_fit(
+    measured: np.ndarray,
+    table: np.ndarray,
+    candidates: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares fit of many curves against a table of candidate curves
+
+    Args:
+        measured: Measured IAM (n_curves, n_angles)
+        table: Model IAM per candidate (n_candidates, n_angles)
+        candidates: Evenly spaced candidate parameter values
+
+    Returns:
+        Tuple of (parameter, sum of squared errors) per curve
+    """
+    sse = (
+        np.sum(measured ** 2, axis=1)[:, np.newaxis]
+        - 2 * measured @ table.T
+        + np.sum(table ** 2, axis=1)[np.newaxis, :]
+    )
+    rows = np.arange(len(measured))
+    best = np.clip(sse.argmin(axis=1), 1, len(candidates) - 2)
+
+    # Parabola through the best candidate and its neighbours
+    low, mid, high = sse[rows, best - 1], sse[rows, best], sse[rows, best + 1]
+    curvature = low - 2 * mid + high
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(curvature > 0, 0.5 * (low - high) / curvature, 0.0)
+    offset = np.clip(offset, -1, 1)
+
+    step = candidates[1] - candidates[0]
+    parameter = candidates[best] + offset * step
+    sse_min = mid - 0.25 * (low - high) * offset
+    return parameter, np.maximum(sse_min, 0)
+
+
+def fit_iam(
+    curves: Sequence[Tuple[Sequence[float], Sequence[float]]],
+    models: Sequence[str] = IAM_MODELS
+) -> pd.DataFrame:
+    """
+    Fit IAM models to many measured curves
+
+    Angles may be signed (e.g. a -80…+80° sweep): curves are fitted on
+    |θ|, with the readings at +θ and -θ averaged.
+
+    Args:
+        curves: (angle in °, IAM) pairs, one per device
+        models: Models to fit
+
+    Returns:
+        DataFrame with one row per curve: n_points, iam_60deg (measured,
+        interpolated), and per model its parameter (b0, a_r, n) and
+        rmse_<model>
+    """
+    columns = {
+        'n_points': np.zeros(len(curves), dtype=int),
+        'iam_60deg': np.full(len(curves), np.nan)
+    }
+    for model in models:
+        columns[MODEL_PARAMETERS[model]] = np.full(len(curves), np.nan)
+        columns[f"rmse_{model}"] = np.full(len(curves), np.nan)
+
+    groups: Dict[Tuple[float, ...], List[int]] = {}
+    cleaned = {}
+    for position, (angle, iam) in enumerate(curves):
+        angle = np.abs(np.asarray(angle, dtype=np.float64))
+        iam = np.asarray(iam, dtype=np.float64)
+        valid = np.isfinite(angle) & np.isfinite(iam) & (angle < 90)
+
+        # Average the readings at each |θ| (sorted by np.unique)
+        angle, inverse = np.unique(np.round(angle[valid], 6), return_inverse=True)
+        iam = np.bincount(inverse, weights=iam[valid]) / np.bincount(inverse)
+
+        columns['n_points'][position] = len(angle)
+        if len(angle) >= 2:
+            if angle[0] <= 60 <= angle[-1]:
+                columns['iam_60deg'][position] = np.interp(60, angle, iam)
+            cleaned[position] = iam
+            groups.setdefault(tuple(angle), []).append(position)
+
+    for angles, positions in groups.items():
+        theta = np.array(angles)
+        measured = np.stack([cleaned[i] for i in positions])
+
+        for model in models:
+            if model == 'ashrae':
+                secant = 1 / np.cos(np.radians(theta)) - 1
+                denominator = secant @ secant
+                parameter = -((measured - 1) @ secant) / denominator if denominator > 0 else np.zeros(len(positions))
+                fitted = iam_ashrae(theta[np.newaxis, :], parameter[:, np.newaxis])
+                sse = np.sum((measured - fitted) ** 2, axis=1)
+            else:
+                candidates = MARTIN_RUIZ_CANDIDATES if model == 'martin_ruiz' else PHYSICAL_CANDIDATES
+                table = MODEL_FUNCTIONS[model](theta[np.newaxis, :], candidates[:, np.newaxis])
+                parameter, sse = _table_fit(measured, table, candidates)
+
+            columns[MODEL_PARAMETERS[model]][positions] = parameter
+            columns[f"rmse_{model}"][positions] = np.sqrt(sse / len(theta))
+
+    return pd.DataFrame(columns)
+
+
+def evaluate_iam(fits: pd.DataFrame, theta: np.ndarray, model: str = None) -> np.ndarray:
+    """
+    Fitted IAM of many devices at many angles
+
+    Args:
+        fits: DataFrame as returned by fit_iam
+        theta: Angles of incidence (°)
+        model: Model to evaluate (defaults to IAM_LOSS_MODEL)
+
+    Returns:
+        IAM array (n_devices, n_angles)
+    """
+    model = model or config.IAM_LOSS_MODEL
+    parameter = fits[MODEL_PARAMETERS[model]].to_numpy(dtype=np.float64)
+    return MODEL_FUNCTIONS[model](
+        np.asarray(theta, dtype=np.float64)[np.newaxis, :], parameter[:, np.newaxis]
+    )
+
+
+@dataclass
+class AngleWeights:
+    """Annual in-plane irradiation of a site and orientation by angle of incidence"""
+    angles: np.ndarray  # Bin centres (°), then the sky and ground diffuse angles
+    weights: np.ndarray  # Irradiation per angle (kWh/m²)
+    beam_bins: int  # Leading entries that hold beam irradiation
+
+    @property
+    def total(self) -> float:
+        return float(self.weights.sum())
+
+    @property
+    def beam(self) -> float:
+        return float(self.weights[:self.beam_bins].sum())
+
+    def __len__(self):
+        return len(self.weights)
+
+
+def available_sites() -> List[str]:
+    """
+    List sun position tables present in SUN_POSITION_DIR
+
+    Returns:
+        Sorted site names
+    """
+    if not SUN_POSITION_DIR.exists():
+        return []
+    return sorted(path.stem for path in SUN_POSITION_DIR.glob('*.csv'))
+
+
+def load_sun_positions(site: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Load the sun position table of a site (cached until the file changes)
+
+    Args:
+        site: Site name (file stem in SUN_POSITION_DIR)
+
+    Returns:
+        Tuple of (table, cache key of the file version)
+
+    Raises:
+        FileNotFoundError: If the table does not exist
+    """
+    path = SUN_POSITION_DIR / f"{site}.csv"
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Sun position table '{site}' not found at {path}; expected a CSV with "
+            f"hourly rows and columns {', '.join(SUN_POSITION_COLUMNS)} (ghi optional)"
+        )
+
+    key = f"{path}:{path.stat().st_mtime_ns}"
+    table = _sun_cache.get(key)
+    if table is None:
+        table = pd.read_csv(path, dtype=np.float64)
+        missing = [column for column in SUN_POSITION_COLUMNS if column not in table.columns]
+        if missing:
+            raise ValueError(f"Sun position table '{site}' lacks columns {', '.join(missing)}")
+        _sun_cache.put(key, table)
+    return table, key
+
+
+def angle_weights(
+    site: str,
+    tilt: float = None,
+    azimuth: float = None,
+    albedo: float = None
+) -> AngleWeights:
+    """
+    Irradiance-weighted angle-of-incidence histogram of a site (cached)
+
+    Beam irradiance is binned by angle of incidence; isotropic sky and
+    ground diffuse irradiance are placed at the Brandemuehl-Beckman
+    effective angles of the tilt.
+
+    Args:
+        site: Site name
+        tilt: Module tilt (°, defaults to IAM_MODULE_TILT)
+        azimuth: Module azimuth (°, defaults to IAM_MODULE_AZIMUTH)
+        albedo: Ground reflectance (defaults to IAM_ALBEDO)
+
+    Returns:
+        AngleWeights
+    """
+    tilt = config.IAM_MODULE_TILT if tilt is None else tilt
+    azimuth = config.IAM_MODULE_AZIMUTH if azimuth is None else azimuth
+    albedo = config.IAM_ALBEDO if albedo is None else albedo
+
+    table, table_key = load_sun_positions(site)
+    key = f"{table_key}:{tilt}:{azimuth}:{albedo}:{config.IAM_ANGLE_BIN}"
+    weights = _weights_cache.get(key)
+    if weights is not None:
+        return weights
+
+    zenith = np.radians(table['solar_zenith'].to_numpy())
+    sun_azimuth = np.radians(table['solar_azimuth'].to_numpy())
+    dni = np.clip(np.nan_to_num(table['dni'].to_numpy()), 0, None)
+    dhi = np.clip(np.nan_to_num(table['dhi'].to_numpy()), 0, None)
+    if 'ghi' in table.columns:
+        ghi = np.clip(np.nan_to_num(table['ghi'].to_numpy()), 0, None)
+    else:
+        ghi = dni * np.clip(np.cos(zenith), 0, None) + dhi
+
+    beta = np.radians(tilt)
+    cos_aoi = (
+        np.cos(zenith) * np.cos(beta)
+        + np.sin(zenith) * np.sin(beta) * np.cos(sun_azimuth - np.radians(azimuth))
+    )
+    beam = dni * np.clip(cos_aoi, 0, None) * (zenith < np.pi / 2)
+    aoi = np.degrees(np.arccos(np.clip(cos_aoi, -1, 1)))
+
+    edges = np.arange(0, 90 + config.IAM_ANGLE_BIN, config.IAM_ANGLE_BIN)
+    beam_bins, _ = np.histogram(aoi, bins=edges, weights=beam)
+    centres = (edges[:-1] + edges[1:]) / 2
+
+    sky = dhi.sum() * (1 + np.cos(beta)) / 2
+    ground = ghi.sum() * albedo * (1 - np.cos(beta)) / 2
+    sky_angle = 59.7 - 0.1388 * tilt + 0.001497 * tilt ** 2
+    ground_angle = 90 - 0.5788 * tilt + 0.002693 * tilt ** 2
+
+    weights = AngleWeights(
+        angles=np.append(centres, [sky_angle, ground_angle]),
+        weights=np.append(beam_bins, [sky, ground]) / 1000,
+        beam_bins=len(centres)
+    )
+    _weights_cache.put(key, weights)
+    return weights
+
+
+def angular_losses(
+    fits: pd.DataFrame,
+    sites: Sequence[str] = None,
+    model: str = None,
+    tilt: float = None,
+    azimuth: float = None
+) -> pd.DataFrame:
+    """
+    Annual angular losses of many devices at reference sites
+
+    Args:
+        fits: DataFrame as returned by fit_iam
+        sites: Site names (defaults to all available sun position tables)
+        model: Fitted model to use (defaults to IAM_LOSS_MODEL)
+        tilt: Module tilt (°)
+        azimuth: Module azimuth (°)
+
+    Returns:
+        DataFrame with one row per device and site: device (fits index),
+        site, beam_loss_pct, total_loss_pct (no rows without sites)
+    """
+    sites = list(sites) if sites is not None else available_sites()
+
+    records = []
+    for site in sites:
+        weights = angle_weights(site, tilt, azimuth)
+        iam = evaluate_iam(fits, weights.angles, model)
+
+        effective = iam @ weights.weights
+        beam_effective = iam[:, :weights.beam_bins] @ weights.weights[:weights.beam_bins]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total_loss = (1 - effective / weights.total) * 100
+            beam_loss = (1 - beam_effective / weights.beam) * 100
+
+        for i, device in enumerate(fits.index):
+            records.append({
+                'device': device,
+                'site': site,
+                'beam_loss_pct': float(beam_loss[i]),
+                'total_loss_pct': float(total_loss[i])
+            })
+
+    return pd.DataFrame(records, columns=LOSS_COLUMNS)
+
+
+def curve_from_raw(raw_data: Dict[str, Any]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Cosine-corrected IAM curve of an IAM-001 execution
+
+    Uses raw_data['isc'], or raw_data['isc_normalized'] (Isc over Isc at
+    normal incidence), against raw_data['angle'] (°).
+
+    Args:
+        raw_data: Execution raw data
+
+    Returns:
+        Tuple of (angle, IAM), or None if the execution has no IAM data
+    """
+    if not raw_data or not raw_data.get('angle'):
+        return None
+
+    isc = raw_data.get('isc') or raw_data.get('isc_normalized')
+    if not isc:
+        return None
+
+    angle = np.asarray(raw_data['angle'], dtype=np.float64)
+    return angle, cosine_correction(angle, isc)
+
+
+def analyze_executions(
+    test_execution_ids: Sequence[int],
+    sites: Sequence[str] = None,
+    save: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Fit IAM models and compute angular losses of IAM-001 executions in one batch
+
+    Results are stored in processed_data['iam'].
+
+    Args:
+        test_execution_ids: Executions to analyze
+        sites: Sites for angular losses (defaults to all available sun position tables)
+        save: Write the results back to the executions
+
+    Returns:
+        DataFrame of fits indexed by execution ID, or None on error
+    """
+    try:
+        with get_db() as db:
+            tests = db.query(TestExecution).filter(
+                TestExecution.id.in_(list(test_execution_ids))
+            ).order_by(TestExecution.id).all()
+
+            curves = {test.id: curve_from_raw(test.raw_data) for test in tests}
+            tests = [test for test in tests if curves[test.id] is not None]
+            if not tests:
+                return None
+
+            fits = fit_iam([curves[test.id] for test in tests])
+            fits.index = [test.id for test in tests]
+
+            sites = list(sites) if sites is not None else available_sites()
+            if not sites:
+                print(f"Angular losses skipped: no sun position tables in {SUN_POSITION_DIR}")
+            try:
+                losses = angular_losses(fits, sites)
+            except FileNotFoundError as e:
+                print(f"Angular losses skipped: {e}")
+                losses = pd.DataFrame(columns=LOSS_COLUMNS)
+
+            if save:
+                for test in tests:
+                    fit = fits.loc[test.id].replace({np.nan: None}).to_dict()
+                    site_losses = losses[losses['device'] == test.id]
+                    processed = dict(test.processed_data or {})
+                    processed['iam'] = {
+                        **fit,
+                        'n_points': int(fit['n_points']),
+                        'loss_model': config.IAM_LOSS_MODEL,
+                        'angular_losses': site_losses.drop(columns='device').to_dict('records')
+                    }
+                    test.processed_data = processed
+
+        return fits
+
+    except Exception as e:
+        print(f"Error analyzing IAM: {e}")
+        return None
+
+
+def create_iam_chart(
+    angle: Sequence[float],
+    iam: Sequence[float],
+    fit: Dict[str, float],
+    title: str = "Incidence Angle Modifier"
+) -> go.Figure:
+    """
+    Create the measured IAM with its fitted model curves
+
+    Args:
+        angle: Measured angles of incidence (°)
+        iam: Measured IAM
+        fit: One row of fit_iam (or processed_data['iam'])
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=angle, y=iam, mode='markers', name='Measured'))
+
+    theta = np.linspace(0, 90, 181)
+    for model in IAM_MODELS:
+        parameter = fit.get(MODEL_PARAMETERS[model])
+        if parameter is None or not np.isfinite(parameter):
+            continue
+        fig.add_trace(go.Scatter(
+            x=theta,
+            y=MODEL_FUNCTIONS[model](theta, parameter),
+            mode='lines',
+            name=f"{model} ({MODEL_PARAMETERS[model]}={parameter:.3f})"
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Angle of Incidence (°)",
+        yaxis_title="IAM",
+        hovermode='x unified',
+        template='plotly_white'
+    )
+
+    return fig
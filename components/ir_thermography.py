@@ -0,0 +1,405 @@
+"""
+IR Thermography - Streaming hot-spot and thermal runaway analysis
+=================================================================
+Reads radiometric IR frame sequences (HOT-001 hot-spot endurance,
+BYPASS-001 diode thermal runaway) chunk by chunk from memory-mapped files
+and tracks the maximum and mean temperature of each region of interest.
+
+Only per-frame region statistics are kept while streaming; frames are
+never copied into the database. Runaway is flagged when the trailing
+least-squares heating rate of a region exceeds IR_RUNAWAY_RATE. Results
+are compact summaries with decimated temperature profiles.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.database import get_db
+from config.settings import config
+from database.models import TestExecution
+from utils.downsampling import downsample_indices
+from utils.statistics import rolling_slope
+
+
+@dataclass
+class FrameSequence:
+    """Radiometric IR frames with their times"""
+    frames: np.ndarray  # (n_frames, height, width), usually a read-only memmap
+    time: np.ndarray  # Seconds from the first frame
+    scale: float = 1.0  # °C per count (frame value * scale + offset)
+    offset: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+
+def load_frame_sequence(path: Path, frame_rate: float = None) -> FrameSequence:
+    """
+    Memory-map an IR frame sequence
+
+    The sequence is a 3-D .npy array. Frame times come from a
+    '<stem>_time.npy' sidecar when present, else from the frame rate.
+    Float frames are taken as °C; integer frames as radiometric counts
+    converted with IR_COUNTS_SCALE and IR_COUNTS_OFFSET.
+
+    Args:
+        path: Frame sequence file
+        frame_rate: Frames per second without a time sidecar
+
+    Returns:
+        FrameSequence
+    """
+    path = Path(path)
+    frames = np.load(path, mmap_mode='r')
+    if frames.ndim != 3:
+        raise ValueError(f"IR sequence {path.name} must be 3-D (frames, height, width)")
+
+    time_path = path.with_name(f"{path.stem}_time.npy")
+    if time_path.exists():
+        time = np.asarray(np.load(time_path), dtype=np.float64)
+        time = time - time[0]
+    else:
+        time = np.arange(len(frames)) / (frame_rate or config.IR_FRAME_RATE)
+
+    if np.issubdtype(frames.dtype, np.floating):
+        return FrameSequence(frames=frames, time=time)
+
+    return FrameSequence(
+        frames=frames,
+        time=time,
+        scale=config.IR_COUNTS_SCALE,
+        offset=config.IR_COUNTS_OFFSET
+    )
+
+
+@dataclass
+class RegionTrack:
+    """Running statistics of one region of interest"""
+    name: str
+    bounds: Tuple[int, int, int, int]  # row_start, row_stop, col_start, col_stop
+    max_temperature: float = -np.inf
+    max_time: Optional[float] = None
+    max_location: Optional[Tuple[int, int]] = None  # Frame pixel (row, col)
+    max_rate: float = -np.inf  # Highest trailing heating rate (°C/min)
+    runaway_time: Optional[float] = None
+    time: List[np.ndarray] = field(default_factory=list)
+    maximum: List[np.ndarray] = field(default_factory=list)
+    mean: List[np.ndarray] = field(default_factory=list)
+
+
+class HotSpotAnalyzer:
+    """
+    Incremental per-region temperature tracker
+
+    Feed frame chunks with process(); the same instance works for files
+    (analyze_frame_sequence) and live acquisition. Only the samples of the
+    last runaway window are carried between chunks for the rate estimate.
+    """
+
+    def __init__(
+        self,
+        frame_shape: Tuple[int, int],
+        regions: Dict[str, Sequence[int]] = None,
+        scale: float = 1.0,
+        offset: float = 0.0,
+        window_seconds: float = None,
+        runaway_rate: float = None
+    ):
+        """
+        Args:
+            frame_shape: (height, width) of the frames
+            regions: Name -> [row_start, row_stop, col_start, col_stop]
+                (defaults to the whole frame as 'module')
+            scale: °C per frame count
+            offset: °C at zero counts
+            window_seconds: Trailing window of the heating rate
+            runaway_rate: Heating rate (°C/min) that flags runaway
+        """
+        regions = regions or {'module': (0, frame_shape[0], 0, frame_shape[1])}
+        self.regions = [RegionTrack(name, tuple(int(v) for v in bounds)) for name, bounds in regions.items()]
+        self.scale = scale
+        self.offset = offset
+        self.window = window_seconds or config.IR_RUNAWAY_WINDOW_SECONDS
+        self.runaway_rate = runaway_rate or config.IR_RUNAWAY_RATE
+        self.frames = 0
+
+        # Samples of the last window, carried into the next rate estimate
+        self._tail_time = np.zeros(0)
+        self._tail_max = np.zeros((0, len(self.regions)))
+
+    def process(self, frames: np.ndarray, time: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Fold a chunk of frames into the region statistics
+
+        Args:
+            frames: Frames (n, height, width) in counts or °C
+            time: Frame times in seconds (ascending)
+
+        Returns:
+            Runaway events first detected in this chunk (region, time,
+            rate_c_per_min, temperature)
+        """
+        if len(frames) == 0:
+            return []
+
+        chunk = np.asarray(frames)
+        time = np.asarray(time, dtype=np.float64)
+        maxima = np.empty((len(chunk), len(self.regions)))
+
+        for k, region in enumerate(self.regions):
+            r0, r1, c0, c1 = region.bounds
+            view = chunk[:, r0:r1, c0:c1]
+
+            if np.issubdtype(view.dtype, np.floating):
+                # Dead pixels (NaN) are ignored; an all-NaN frame gives NaN
+                valid = ~np.isnan(view)
+                raw_max = np.fmax.reduce(view, axis=(1, 2))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    raw_mean = (
+                        np.sum(np.where(valid, view, 0), axis=(1, 2), dtype=np.float64)
+                        / np.sum(valid, axis=(1, 2))
+                    )
+            else:
+                raw_max = view.max(axis=(1, 2))
+                raw_mean = view.mean(axis=(1, 2), dtype=np.float64)
+
+            maxima[:, k] = raw_max * self.scale + self.offset
+            mean = raw_mean * self.scale + self.offset
+
+            region.time.append(time)
+            region.maximum.append(maxima[:, k])
+            region.mean.append(mean)
+
+            ranked = np.where(np.isnan(maxima[:, k]), -np.inf, maxima[:, k])
+            hottest = int(np.argmax(ranked))
+            if ranked[hottest] > region.max_temperature:
+                frame = np.asarray(view[hottest], dtype=np.float64)
+                row, col = np.unravel_index(
+                    np.argmax(np.where(np.isnan(frame), -np.inf, frame)), frame.shape
+                )
+                region.max_temperature = float(maxima[hottest, k])
+                region.max_time = float(time[hottest])
+                region.max_location = (int(row) + r0, int(col) + c0)
+
+        events = self._update_rates(time, maxima)
+        self.frames += len(chunk)
+        return events
+
+    def _update_rates(self, time: np.ndarray, maxima: np.ndarray) -> List[Dict[str, Any]]:
+        """Trailing heating rates over the carried tail plus the new chunk"""
+        all_time = np.concatenate([self._tail_time, time])
+        all_max = np.concatenate([self._tail_max, maxima])
+        new = len(self._tail_time)
+
+        # Fit each region on its frames with a finite maximum
+        rate = np.full(maxima.shape, np.nan)
+        for k in range(len(self.regions)):
+            finite = np.flatnonzero(np.isfinite(all_max[:, k]))
+            fit = rolling_slope(all_time[finite], all_max[finite, k], self.window)
+            full = fit['span'] >= self.window * 0.9
+            in_chunk = finite >= new
+            rate[finite[in_chunk] - new, k] = np.where(full, fit['slope'] * 60, np.nan)[in_chunk]
+
+        events = []
+        for k, region in enumerate(self.regions):
+            if np.any(np.isfinite(rate[:, k])):
+                region.max_rate = max(region.max_rate, float(np.nanmax(rate[:, k])))
+
+            if region.runaway_time is None:
+                exceeded = np.flatnonzero(rate[:, k] > self.runaway_rate)
+                if len(exceeded):
+                    i = exceeded[0]
+                    region.runaway_time = float(time[i])
+                    events.append({
+                        'region': region.name,
+                        'time': region.runaway_time,
+                        'rate_c_per_min': float(rate[i, k]),
+                        'temperature': float(maxima[i, k])
+                    })
+
+        keep = all_time > all_time[-1] - self.window
+        self._tail_time, self._tail_max = all_time[keep], all_max[keep]
+        return events
+
+    def summary(self, profile_points: int = None) -> Dict[str, Any]:
+        """
+        Compact summary of all regions
+
+        Args:
+            profile_points: Stored points per region profile
+
+        Returns:
+            Dictionary with frames, max_temperature, hot_spot_temperature,
+            runaway and per-region statistics with decimated profiles
+        """
+        profile_points = profile_points or config.IR_PROFILE_POINTS
+        regions = {}
+
+        for region in self.regions:
+            if not region.time:
+                continue
+            time = np.concatenate(region.time)
+            maximum = np.concatenate(region.maximum)
+            mean = np.concatenate(region.mean)
+            keep = downsample_indices(time, maximum, profile_points, method='minmax')
+
+            finite = np.isfinite(maximum) & np.isfinite(mean)
+
+            regions[region.name] = {
+                'bounds': list(region.bounds),
+                'max_temperature': region.max_temperature if region.max_location is not None else None,
+                'max_time_s': region.max_time,
+                'max_location': list(region.max_location) if region.max_location is not None else None,
+                'final_temperature': float(maximum[finite][-1]) if finite.any() else None,
+                'mean_temperature': float(mean[finite].mean()) if finite.any() else None,
+                'max_delta_t': float(np.max((maximum - mean)[finite])) if finite.any() else None,
+                'max_heating_rate': region.max_rate if np.isfinite(region.max_rate) else None,
+                'runaway_time_s': region.runaway_time,
+                'profile': {
+                    'time_s': np.round(time[keep], 3).tolist(),
+                    'max': np.round(maximum[keep], 2).tolist(),
+                    'mean': np.round(mean[keep], 2).tolist()
+                }
+            }
+
+        hottest = max(
+            (r for r in regions.values() if r['max_temperature'] is not None),
+            key=lambda r: r['max_temperature'],
+            default=None
+        )
+        return {
+            'frames': self.frames,
+            'max_temperature': hottest['max_temperature'] if hottest else None,
+            'hot_spot_temperature': hottest['max_temperature'] if hottest else None,
+            'runaway': any(r['runaway_time_s'] is not None for r in regions.values()),
+            'regions': regions
+        }
+
+
+def analyze_frame_sequence(
+    sequence: FrameSequence,
+    regions: Dict[str, Sequence[int]] = None,
+    chunk_frames: int = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Stream a frame sequence through a HotSpotAnalyzer
+
+    Args:
+        sequence: FrameSequence (typically memory-mapped)
+        regions: Regions of interest (see HotSpotAnalyzer)
+        chunk_frames: Frames read per step
+        kwargs: Options of HotSpotAnalyzer
+
+    Returns:
+        Summary dictionary with 'events' (runaway detections)
+    """
+    chunk_frames = chunk_frames or config.IR_CHUNK_FRAMES
+    analyzer = HotSpotAnalyzer(
+        sequence.frames.shape[1:], regions,
+        scale=sequence.scale, offset=sequence.offset, **kwargs
+    )
+
+    events = []
+    for start in range(0, len(sequence), chunk_frames):
+        stop = start + chunk_frames
+        events += analyzer.process(sequence.frames[start:stop], sequence.time[start:stop])
+
+    summary = analyzer.summary()
+    summary['events'] = events
+    return summary
+
+
+def analyze_execution_frames(
+    test_execution_id: int,
+    path: Path = None,
+    save: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyze the IR frame sequence of a HOT-001 or BYPASS-001 execution
+
+    The sequence is taken from path, else raw_data['ir_frames'] (a file
+    path). Regions come from input_data['ir_regions'] and the frame rate
+    from input_data['ir_frame_rate'] when set.
+
+    Args:
+        test_execution_id: Test execution ID
+        path: Explicit frame sequence file
+        save: Store the summary in processed_data['ir_thermography']
+
+    Returns:
+        Summary dictionary, or None on error
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            if test is None:
+                return None
+            inputs = test.input_data or {}
+            path = path or (test.raw_data or {}).get('ir_frames')
+
+        if path is None:
+            return None
+
+        sequence = load_frame_sequence(path, inputs.get('ir_frame_rate'))
+        summary = analyze_frame_sequence(sequence, inputs.get('ir_regions'))
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+                processed = dict(test.processed_data or {})
+                processed['ir_thermography'] = summary
+                test.processed_data = processed
+
+        return summary
+
+    except Exception as e:
+        print(f"Error analyzing IR frames: {e}")
+        return None
+
+
+def create_ir_profile_chart(summary: Dict[str, Any], title: str = "Region Temperature Profile") -> go.Figure:
+    """
+    Create the max/mean temperature profile of every region
+
+    Args:
+        summary: Result of analyze_frame_sequence
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    fig = go.Figure()
+
+    for name, region in summary.get('regions', {}).items():
+        profile = region['profile']
+        minutes = pd.Series(profile['time_s']) / 60
+
+        fig.add_trace(go.Scatter(x=minutes, y=profile['max'], mode='lines', name=f"{name} max"))
+        fig.add_trace(go.Scatter(
+            x=minutes, y=profile['mean'], mode='lines', name=f"{name} mean",
+            line=dict(dash='dot')
+        ))
+
+        if region['runaway_time_s'] is not None:
+            fig.add_vline(
+                x=region['runaway_time_s'] / 60,
+                line_dash='dash',
+                line_color='red',
+                annotation_text=f"{name} runaway"
+            )
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time (min)",
+        yaxis_title="Temperature (°C)",
+        hovermode='x unified',
+        template='plotly_white'
+    )
+
+    return fig
@@ -0,0 +1,271 @@
+"""
+Irradiance Linearity - LIC-001 multi-irradiance linearity analysis
+==================================================================
+Checks the linearity of a device with irradiance per IEC 60904-10: Isc is
+fitted as a straight line of irradiance and Voc as a straight line of
+log irradiance, and the largest deviation of any irradiance level from its
+fit is compared with LIC_MAX_DEVIATION. The relative efficiency at each
+level is reported against the level closest to 1000 W/m².
+
+Curves are grouped into irradiance bins of LIC_BIN_WIDTH and only the
+per-bin sums are kept, in processed_data['irradiance_linearity']['state'],
+together with the number of measurements folded in. Adding a level only
+extracts the new curves; the fits are then re-run on the bin means, for
+every execution at once.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from components.iv_analysis import measurement_parameters
+from config.database import get_db
+from config.settings import config
+from database.models import TestExecution
+from utils.statistics import grouped_linear_regression
+
+
+REFERENCE_IRRADIANCE = 1000.0  # W/m²
+
+# Per-bin sums kept in the state, in this order
+BIN_SUMS = ('n', 'irradiance', 'isc', 'voc', 'pmax')
+
+
+@dataclass
+class LinearityState:
+    """Per-bin sums of the measurements folded in so far"""
+    measurement_count: int = 0  # Measurements of raw_data folded in
+    skipped: int = 0  # Measurements without irradiance or I-V parameters
+    bins: Dict[str, List[float]] = field(default_factory=dict)  # Bin level -> BIN_SUMS
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LinearityState':
+        return cls(**data) if data else cls()
+
+
+def irradiance_bin(irradiance: np.ndarray, width: float = None) -> np.ndarray:
+    """
+    Irradiance bin level of each measurement
+
+    Args:
+        irradiance: Irradiance (W/m²)
+        width: Bin width (defaults to LIC_BIN_WIDTH)
+
+    Returns:
+        Bin centre levels (W/m²)
+    """
+    width = width or config.LIC_BIN_WIDTH
+    return np.round(np.asarray(irradiance, dtype=np.float64) / width) * width
+
+
+def fold_measurements(
+    states: Sequence[LinearityState],
+    measurements: List[Dict[str, Any]],
+    groups: Sequence[int]
+):
+    """
+    Fold new measurements of many executions into their states
+
+    The curves of all executions are extracted in one batch.
+
+    Args:
+        states: State per execution (updated in place)
+        measurements: New measurement dictionaries of all executions
+        groups: Index into states of each measurement
+    """
+    groups = np.asarray(groups, dtype=np.intp)
+    columns = measurement_parameters(measurements, ('irradiance',))
+
+    values = np.column_stack([columns[name] for name in BIN_SUMS[1:]])
+    usable = np.all(np.isfinite(values), axis=1) & (columns['irradiance'] > 0) & (columns['voc'] > 0)
+
+    skipped = np.bincount(groups[~usable], minlength=len(states))
+    for position, state in enumerate(states):
+        state.skipped += int(skipped[position])
+
+    df = pd.DataFrame(values[usable], columns=list(BIN_SUMS[1:]))
+    df['n'] = 1
+    df['group'] = groups[usable]
+    df['level'] = irradiance_bin(columns['irradiance'][usable])
+
+    sums = df.groupby(['group', 'level'])[list(BIN_SUMS)].sum()
+    for (group, level), row in zip(sums.index, sums.to_numpy()):
+        bins = states[group].bins
+        key = f"{level:g}"
+        bins[key] = (np.asarray(bins.get(key, np.zeros(len(BIN_SUMS)))) + row).tolist()
+
+
+def evaluate_linearity(states: Sequence[LinearityState]) -> Dict[str, pd.DataFrame]:
+    """
+    Linearity fits and deviations of many executions
+
+    Args:
+        states: State per execution
+
+    Returns:
+        Dictionary with 'summary' (one row per state: n_levels, isc_slope,
+        isc_intercept, isc_max_deviation_pct, voc_slope, voc_intercept,
+        voc_max_deviation_pct, isc_linear, voc_linear, linear,
+        efficiency_ratio_min, efficiency_ratio_max) and 'levels' (one row
+        per state and bin: group, irradiance, n, isc, voc, pmax,
+        isc_deviation_pct, voc_deviation_pct, efficiency_ratio)
+    """
+    records = [
+        [group, *sums] for group, state in enumerate(states) for sums in state.bins.values()
+    ]
+    levels = pd.DataFrame(records, columns=['group', *BIN_SUMS])
+    levels = levels.sort_values(['group', 'irradiance'], ignore_index=True)
+    for name in BIN_SUMS[1:]:
+        levels[name] = levels[name] / levels['n']
+
+    groups = levels['group'].to_numpy(dtype=np.intp)
+    irradiance = levels['irradiance'].to_numpy()
+    n_groups = len(states)
+
+    isc_fit = grouped_linear_regression(irradiance, levels['isc'], groups, n_groups)
+    voc_fit = grouped_linear_regression(np.log(irradiance), levels['voc'], groups, n_groups)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        isc_line = isc_fit['intercept'][groups] + isc_fit['slope'][groups] * irradiance
+        voc_line = voc_fit['intercept'][groups] + voc_fit['slope'][groups] * np.log(irradiance)
+        levels['isc_deviation_pct'] = (levels['isc'] / isc_line - 1) * 100
+        levels['voc_deviation_pct'] = (levels['voc'] / voc_line - 1) * 100
+
+        # Efficiency relative to the level closest to 1000 W/m²
+        efficiency = levels['pmax'] / levels['irradiance']
+        reference = (levels['irradiance'] - REFERENCE_IRRADIANCE).abs().groupby(levels['group']).idxmin()
+        reference_efficiency = pd.Series(efficiency[reference].to_numpy(), index=reference.index)
+        levels['efficiency_ratio'] = efficiency / levels['group'].map(reference_efficiency)
+
+    by_group = levels.groupby('group')
+    summary = pd.DataFrame(index=pd.RangeIndex(n_groups))
+    summary['n_levels'] = by_group.size().reindex(summary.index, fill_value=0)
+    summary['isc_slope'] = isc_fit['slope']
+    summary['isc_intercept'] = isc_fit['intercept']
+    summary['isc_max_deviation_pct'] = by_group['isc_deviation_pct'].apply(
+        lambda values: values.abs().max()
+    ).reindex(summary.index)
+    summary['voc_slope'] = voc_fit['slope']
+    summary['voc_intercept'] = voc_fit['intercept']
+    summary['voc_max_deviation_pct'] = by_group['voc_deviation_pct'].apply(
+        lambda values: values.abs().max()
+    ).reindex(summary.index)
+
+    limit = config.LIC_MAX_DEVIATION
+    summary['isc_linear'] = summary['isc_max_deviation_pct'] <= limit
+    summary['voc_linear'] = summary['voc_max_deviation_pct'] <= limit
+    summary['linear'] = summary['isc_linear'] & summary['voc_linear'] & (summary['n_levels'] >= 3)
+    summary['efficiency_ratio_min'] = by_group['efficiency_ratio'].min().reindex(summary.index)
+    summary['efficiency_ratio_max'] = by_group['efficiency_ratio'].max().reindex(summary.index)
+
+    return {'summary': summary, 'levels': levels}
+
+
+def update_linearity(test_execution_ids: Sequence[int], db=None) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Fold measurements added since the last check and re-evaluate linearity
+
+    A state is rebuilt from scratch when the execution holds fewer
+    measurements than were folded in (measurements were removed).
+
+    Args:
+        test_execution_ids: LIC-001 executions to update
+        db: Existing session to use (a new one is opened otherwise)
+
+    Returns:
+        Result of evaluate_linearity with a test_execution_id column added
+        to both tables, or None if no execution has measurements
+    """
+    if db is None:
+        with get_db() as session:
+            return update_linearity(test_execution_ids, db=session)
+
+    tests = db.query(TestExecution).filter(
+        TestExecution.id.in_(list(test_execution_ids))
+    ).order_by(TestExecution.id).all()
+    tests = [test for test in tests if test.raw_data and test.raw_data.get('measurements')]
+    if not tests:
+        return None
+
+    states, new_measurements, groups = [], [], []
+    for position, test in enumerate(tests):
+        measurements = test.raw_data['measurements']
+        state = LinearityState.from_dict(
+            (test.processed_data or {}).get('irradiance_linearity', {}).get('state')
+        )
+        if len(measurements) < state.measurement_count:
+            state = LinearityState()
+
+        new = measurements[state.measurement_count:]
+        new_measurements.extend(new)
+        groups.extend([position] * len(new))
+        state.measurement_count = len(measurements)
+        states.append(state)
+
+    if new_measurements:
+        fold_measurements(states, new_measurements, groups)
+
+    result = evaluate_linearity(states)
+    ids = np.array([test.id for test in tests])
+    result['summary'].insert(0, 'test_execution_id', ids)
+    result['levels'].insert(0, 'test_execution_id', ids[result['levels']['group'].to_numpy(dtype=np.intp)])
+
+    for position, test in enumerate(tests):
+        summary = result['summary'].iloc[position].drop('test_execution_id')
+        levels = result['levels'][result['levels']['group'] == position]
+
+        processed = dict(test.processed_data or {})
+        processed['irradiance_linearity'] = {
+            **{key: None if pd.isna(value) else value.item() if hasattr(value, 'item') else value
+               for key, value in summary.items()},
+            'levels': levels.drop(columns=['test_execution_id', 'group'])
+                            .replace({np.nan: None}).to_dict('records'),
+            'state': asdict(states[position])
+        }
+        test.processed_data = processed
+
+    return result
+
+
+def reset_linearity(test_execution_id: int):
+    """
+    Discard the folded state so the next update re-reads every measurement
+
+    Args:
+        test_execution_id: Test execution ID
+    """
+    with get_db() as db:
+        test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+        if test is None:
+            return
+
+        processed = dict(test.processed_data or {})
+        processed.pop('irradiance_linearity', None)
+        test.processed_data = processed
+
+
+def analyze_execution(test_execution_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get the irradiance linearity of a LIC-001 execution, folding new curves first
+
+    Args:
+        test_execution_id: Test execution ID
+
+    Returns:
+        processed_data['irradiance_linearity'] (without the state), or None on error
+    """
+    try:
+        with get_db() as db:
+            if update_linearity([test_execution_id], db=db) is None:
+                return None
+
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            report = dict(test.processed_data['irradiance_linearity'])
+            report.pop('state', None)
+            return report
+
+    except Exception as e:
+        print(f"Error analyzing irradiance linearity: {e}")
+        return None
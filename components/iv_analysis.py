@@ -0,0 +1,196 @@
+"""
+I-V Analysis - Batched extraction of I-V curve parameters
+=========================================================
+Extracts Isc, Voc, Pmax, Vmp, Imp and fill factor from many I-V curves at
+once by packing them into padded 2D arrays.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+IV_PARAMETERS = ('isc', 'voc', 'pmax', 'vmp', 'imp', 'ff')
+
+
+def pack_curves(
+    voltages: Sequence[Sequence[float]],
+    currents: Sequence[Sequence[float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack curves of varying length into NaN-padded 2D arrays sorted by voltage
+
+    Args:
+        voltages: Voltage arrays, one per curve
+        currents: Current arrays, one per curve
+
+    Returns:
+        Tuple of (V, I) arrays of shape (n_curves, max_points)
+    """
+    if isinstance(voltages, np.ndarray) and voltages.ndim == 2:
+        V = voltages.astype(np.float64, copy=True)
+        I = np.asarray(currents, dtype=np.float64).copy()
+    else:
+        n_points = max((len(v) for v in voltages), default=0)
+        V = np.full((len(voltages), n_points), np.nan)
+        I = np.full((len(voltages), n_points), np.nan)
+        for row, (v, i) in enumerate(zip(voltages, currents)):
+            V[row, :len(v)] = v
+            I[row, :len(i)] = i
+
+    # Sort each curve by voltage; NaN padding sorts to the end
+    order = np.argsort(V, axis=1)
+    V = np.take_along_axis(V, order, axis=1)
+    I = np.take_along_axis(I, order, axis=1)
+    I[np.isnan(V)] = np.nan
+
+    return V, I
+
+
+def _interp_crossing(
+    x: np.ndarray,
+    y: np.ndarray,
+    crossed: np.ndarray,
+    n_valid: np.ndarray
+) -> np.ndarray:
+    """
+    Linearly interpolate x where y crosses zero, per row
+
+    The crossed points must form a prefix of each (voltage-sorted) row.
+
+    Args:
+        x: Abscissa values (n_curves, n_points)
+        y: Ordinate values (n_curves, n_points)
+        crossed: Boolean mask of points on the near side of the crossing
+        n_valid: Number of valid points per row
+
+    Returns:
+        Interpolated x at y == 0 for each row (extrapolated at the ends)
+    """
+    rows = np.arange(x.shape[0])
+    k = np.sum(crossed, axis=1) - 1
+    k = np.clip(k, 0, np.maximum(n_valid - 2, 0))
+
+    x0, x1 = x[rows, k], x[rows, np.minimum(k + 1, x.shape[1] - 1)]
+    y0, y1 = y[rows, k], y[rows, np.minimum(k + 1, x.shape[1] - 1)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x0 - y0 * (x1 - x0) / (y1 - y0)
+
+
+def extract_iv_parameters(
+    voltages: Sequence[Sequence[float]],
+    currents: Sequence[Sequence[float]]
+) -> Dict[str, np.ndarray]:
+    """
+    Extract I-V parameters for a batch of curves
+
+    Isc and Voc are interpolated linearly at V = 0 and I = 0; the maximum
+    power point is the measured point with the largest V * I.
+
+    Args:
+        voltages: Voltage arrays, one per curve (or a 2D array)
+        currents: Current arrays, one per curve (or a 2D array)
+
+    Returns:
+        Dictionary of arrays 'isc', 'voc', 'pmax', 'vmp', 'imp' and 'ff'
+    """
+    V, I = pack_curves(voltages, currents)
+    n_curves = V.shape[0]
+
+    if V.size == 0:
+        empty = np.full(n_curves, np.nan)
+        return {key: empty.copy() for key in IV_PARAMETERS}
+
+    valid = np.isfinite(V) & np.isfinite(I)
+    n_valid = np.sum(valid, axis=1)
+    rows = np.arange(n_curves)
+
+    # Current at V = 0
+    isc = _interp_crossing(I, V, valid & (V <= 0), n_valid)
+
+    # Voltage at I = 0 (current decreases with voltage)
+    voc = _interp_crossing(V, I, valid & (I >= 0), n_valid)
+
+    P = np.where(valid, V * I, -np.inf)
+    mpp = np.argmax(P, axis=1)
+    pmax = P[rows, mpp]
+    vmp = V[rows, mpp]
+    imp = I[rows, mpp]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ff = pmax / (isc * voc)
+
+    no_data = n_valid < 2
+    for values in (isc, voc, pmax, vmp, imp, ff):
+        values[no_data] = np.nan
+
+    return {'isc': isc, 'voc': voc, 'pmax': pmax, 'vmp': vmp, 'imp': imp, 'ff': ff}
+
+
+def extract_from_measurements(
+    measurements: List[Dict],
+    voltage_key: str = 'voltage',
+    current_key: str = 'current'
+) -> Dict[str, np.ndarray]:
+    """
+    Extract I-V parameters from a list of measurement dictionaries
+
+    Args:
+        measurements: Dictionaries holding voltage and current arrays
+        voltage_key: Key of the voltage array
+        current_key: Key of the current array
+
+    Returns:
+        Dictionary of parameter arrays (see extract_iv_parameters)
+    """
+    voltages = [m.get(voltage_key) for m in measurements]
+    currents = [m.get(current_key) for m in measurements]
+
+    return extract_iv_parameters(
+        [v if v is not None else [] for v in voltages],
+        [i if i is not None else [] for i in currents]
+    )
+
+
+def measurement_parameters(
+    measurements: List[Dict],
+    fields: Sequence[str] = (),
+    voltage_key: str = 'voltage',
+    current_key: str = 'current'
+) -> Dict[str, np.ndarray]:
+    """
+    I-V parameters and scalar fields of measurements in one pass
+
+    Parameters already stored on a measurement are used as-is; those missing
+    are extracted in a single batch from the I-V curves of the measurements
+    that need them.
+
+    Args:
+        measurements: Dictionaries holding parameters and/or I-V arrays
+        fields: Further scalar keys to collect (e.g. 'irradiance'), NaN if absent
+        voltage_key: Key of the voltage array
+        current_key: Key of the current array
+
+    Returns:
+        Dictionary of arrays for every I-V parameter and requested field
+    """
+    columns = {}
+    for key in IV_PARAMETERS + tuple(fields):
+        columns[key] = np.array(
+            [np.nan if m.get(key) is None else m[key] for m in measurements],
+            dtype=np.float64
+        )
+
+    needs_curve = ~np.all([np.isfinite(columns[key]) for key in IV_PARAMETERS], axis=0)
+    if needs_curve.any():
+        extracted = extract_from_measurements(
+            [m for m, needed in zip(measurements, needs_curve) if needed],
+            voltage_key,
+            current_key
+        )
+        for key in IV_PARAMETERS:
+            stored = columns[key][needs_curve]
+            columns[key][needs_curve] = np.where(np.isfinite(stored), stored, extracted[key])
+
+    return columns
@@ -0,0 +1,356 @@
+"""
+Performance Matrix Engine - IEC 61853-1 irradiance x temperature matrices
+=========================================================================
+Bins PERF-001 measurements into the irradiance/temperature grid, fills
+unmeasured cells by interpolation and prepares heatmap and surface plots.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from components.iv_analysis import extract_from_measurements
+from components.visualizations import create_heatmap, create_3d_surface_plot
+from config.database import get_db
+from config.protocols_registry import get_template_parameter
+from database.models import TestExecution
+from utils.cache import LRUCache
+
+
+PROTOCOL_ID = "PERF-001"
+
+# Quantities that can be binned from I-V curves
+IV_QUANTITIES = ('pmax', 'isc', 'voc', 'vmp', 'imp', 'ff')
+
+# Per-execution matrix cache, keyed by execution, last update and options
+_matrix_cache = LRUCache(max_items=128)
+
+
+@dataclass
+class PerformanceMatrix:
+    """Grid of a quantity over irradiance (columns) and temperature (rows)"""
+    irradiance: np.ndarray  # W/m², ascending
+    temperature: np.ndarray  # °C, ascending
+    values: np.ndarray  # shape (n_temperature, n_irradiance), interpolated where unmeasured
+    counts: np.ndarray  # measurements binned into each cell
+    quantity: str = "pmax"
+    method: str = "linear"
+
+    @property
+    def measured(self) -> np.ndarray:
+        """Boolean mask of cells with at least one measurement"""
+        return self.counts > 0
+
+    @property
+    def completeness(self) -> float:
+        """Fraction of grid cells that were measured"""
+        return float(np.mean(self.measured)) if self.counts.size else 0.0
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Matrix as a DataFrame (index: temperature, columns: irradiance)"""
+        return pd.DataFrame(self.values, index=self.temperature, columns=self.irradiance)
+
+
+def _nearest_level(
+    x: np.ndarray,
+    levels: np.ndarray,
+    tolerance: np.ndarray
+) -> np.ndarray:
+    """Index of the nearest level for each value, -1 when outside tolerance"""
+    midpoints = (levels[1:] + levels[:-1]) / 2
+    index = np.searchsorted(midpoints, x)
+    ok = np.abs(x - levels[index]) <= tolerance[index]
+    return np.where(ok, index, -1)
+
+
+def bin_measurements(
+    irradiance: Sequence[float],
+    temperature: Sequence[float],
+    values: Sequence[float],
+    irradiance_levels: Sequence[float],
+    temperature_levels: Sequence[float],
+    irradiance_tolerance: float = 0.05,
+    temperature_tolerance: float = 2.0
+) -> tuple:
+    """
+    Average measurements into the irradiance x temperature grid
+
+    Args:
+        irradiance: Measured irradiance per point (W/m²)
+        temperature: Measured module temperature per point (°C)
+        values: Quantity per point
+        irradiance_levels: Grid irradiance levels (W/m²)
+        temperature_levels: Grid temperature levels (°C)
+        irradiance_tolerance: Relative irradiance deviation accepted per level
+        temperature_tolerance: Absolute temperature deviation accepted (°C)
+
+    Returns:
+        Tuple of (mean grid with NaN for empty cells, count grid)
+    """
+    g_levels = np.sort(np.asarray(irradiance_levels, dtype=np.float64))
+    t_levels = np.sort(np.asarray(temperature_levels, dtype=np.float64))
+
+    g = np.asarray(irradiance, dtype=np.float64)
+    t = np.asarray(temperature, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64)
+
+    gi = _nearest_level(g, g_levels, g_levels * irradiance_tolerance)
+    ti = _nearest_level(t, t_levels, np.full(len(t_levels), temperature_tolerance))
+
+    ok = (gi >= 0) & (ti >= 0) & np.isfinite(v)
+    cells = ti[ok] * len(g_levels) + gi[ok]
+    n_cells = len(t_levels) * len(g_levels)
+
+    sums = np.bincount(cells, weights=v[ok], minlength=n_cells)
+    counts = np.bincount(cells, minlength=n_cells)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+
+    shape = (len(t_levels), len(g_levels))
+    return means.reshape(shape), counts.reshape(shape)
+
+
+def _natural_cubic(xk: np.ndarray, yk: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Evaluate a natural cubic spline through (xk, yk), linear outside the knots"""
+    n = len(xk)
+    h = np.diff(xk)
+
+    A = np.zeros((n, n))
+    rhs = np.zeros(n)
+    A[0, 0] = A[-1, -1] = 1.0
+    for i in range(1, n - 1):
+        A[i, i - 1] = h[i - 1]
+        A[i, i] = 2 * (h[i - 1] + h[i])
+        A[i, i + 1] = h[i]
+        rhs[i] = 3 * ((yk[i + 1] - yk[i]) / h[i] - (yk[i] - yk[i - 1]) / h[i - 1])
+
+    c = np.linalg.solve(A, rhs)
+    b = (yk[1:] - yk[:-1]) / h - h * (2 * c[:-1] + c[1:]) / 3
+    d = (c[1:] - c[:-1]) / (3 * h)
+
+    segment = np.clip(np.searchsorted(xk, x) - 1, 0, n - 2)
+    dx = x - xk[segment]
+    y = yk[segment] + b[segment] * dx + c[segment] * dx ** 2 + d[segment] * dx ** 3
+
+    outside = (x < xk[0]) | (x > xk[-1])
+    y[outside] = _linear(xk, yk, x[outside])
+    return y
+
+
+def _linear(xk: np.ndarray, yk: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Piecewise-linear interpolation with linear extrapolation at both ends"""
+    y = np.interp(x, xk, yk)
+
+    low, high = x < xk[0], x > xk[-1]
+    y[low] = yk[0] + (x[low] - xk[0]) * (yk[1] - yk[0]) / (xk[1] - xk[0])
+    y[high] = yk[-1] + (x[high] - xk[-1]) * (yk[-1] - yk[-2]) / (xk[-1] - xk[-2])
+    return y
+
+
+def _interpolate_rows(grid: np.ndarray, coords: np.ndarray, method: str) -> np.ndarray:
+    """Interpolate missing cells along each row from that row's known cells"""
+    result = np.full_like(grid, np.nan)
+
+    for row in range(grid.shape[0]):
+        known = np.isfinite(grid[row])
+        if known.sum() < 2:
+            continue
+
+        xk, yk = coords[known], grid[row, known]
+        if method == "spline" and known.sum() >= 3:
+            result[row] = _natural_cubic(xk, yk, coords.astype(np.float64))
+        else:
+            result[row] = _linear(xk, yk, coords.astype(np.float64))
+
+    return result
+
+
+def fill_missing_cells(
+    grid: np.ndarray,
+    irradiance: np.ndarray,
+    temperature: np.ndarray,
+    method: str = "linear"
+) -> np.ndarray:
+    """
+    Fill NaN cells from measured neighbours
+
+    Each missing cell is interpolated along the irradiance axis and along
+    the temperature axis, and the available estimates are averaged. On a
+    surface that is linear in each axis this equals bilinear interpolation.
+
+    Args:
+        grid: Matrix with NaN for unmeasured cells (temperature x irradiance)
+        irradiance: Column coordinates
+        temperature: Row coordinates
+        method: "linear" (bilinear) or "spline" (natural cubic per axis)
+
+    Returns:
+        Filled matrix (cells without any usable neighbours remain NaN)
+    """
+    if method not in ("linear", "spline"):
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    missing = ~np.isfinite(grid)
+    if not missing.any():
+        return grid.copy()
+
+    along_irradiance = _interpolate_rows(grid, np.asarray(irradiance), method)
+    along_temperature = _interpolate_rows(grid.T, np.asarray(temperature), method).T
+
+    estimates = np.stack([along_irradiance, along_temperature])
+    with np.errstate(invalid='ignore'):
+        counts = np.sum(np.isfinite(estimates), axis=0)
+        combined = np.where(counts > 0, np.nansum(estimates, axis=0) / np.maximum(counts, 1), np.nan)
+
+    return np.where(missing, combined, grid)
+
+
+def build_performance_matrix(
+    measurements: List[Dict[str, Any]],
+    irradiance_levels: Sequence[float] = None,
+    temperature_levels: Sequence[float] = None,
+    quantity: str = "pmax",
+    method: str = "linear"
+) -> PerformanceMatrix:
+    """
+    Build a filled performance matrix from PERF-001 measurements
+
+    Args:
+        measurements: Dictionaries with 'irradiance', 'temperature' and either
+            the quantity itself or 'voltage'/'current' arrays
+        irradiance_levels: Grid irradiance levels (defaults to template)
+        temperature_levels: Grid temperature levels (defaults to template)
+        quantity: Quantity to grid (pmax, isc, voc, vmp, imp, ff, ...)
+        method: "linear" or "spline" fill of unmeasured cells
+
+    Returns:
+        PerformanceMatrix
+    """
+    if irradiance_levels is None or len(irradiance_levels) == 0:
+        irradiance_levels = get_template_parameter(PROTOCOL_ID, 'irradiance_matrix', [])
+    if temperature_levels is None or len(temperature_levels) == 0:
+        temperature_levels = get_template_parameter(PROTOCOL_ID, 'temperature_matrix', [])
+
+    irradiance_levels = np.sort(np.asarray(irradiance_levels, dtype=np.float64))
+    temperature_levels = np.sort(np.asarray(temperature_levels, dtype=np.float64))
+
+    values = np.array([m.get(quantity, np.nan) for m in measurements], dtype=np.float64)
+
+    # Derive missing values from the I-V curves in one batch
+    needs_curve = ~np.isfinite(values)
+    if quantity in IV_QUANTITIES and needs_curve.any():
+        subset = [m for m, needed in zip(measurements, needs_curve) if needed]
+        values[needs_curve] = extract_from_measurements(subset)[quantity]
+
+    grid, counts = bin_measurements(
+        [m.get('irradiance', np.nan) for m in measurements],
+        [m.get('temperature', np.nan) for m in measurements],
+        values,
+        irradiance_levels,
+        temperature_levels
+    )
+
+    return PerformanceMatrix(
+        irradiance=irradiance_levels,
+        temperature=temperature_levels,
+        values=fill_missing_cells(grid, irradiance_levels, temperature_levels, method),
+        counts=counts,
+        quantity=quantity,
+        method=method
+    )
+
+
+def get_execution_matrix(
+    test_execution_id: int,
+    quantity: str = "pmax",
+    method: str = "linear"
+) -> Optional[PerformanceMatrix]:
+    """
+    Get the performance matrix of a PERF-001 execution (cached)
+
+    Measurements are read from raw_data['measurements'] and grid levels from
+    input_data (falling back to the template defaults). The cache entry is
+    keyed on the execution's updated_at, so edits invalidate it.
+
+    Args:
+        test_execution_id: Test execution ID
+        quantity: Quantity to grid
+        method: "linear" or "spline"
+
+    Returns:
+        PerformanceMatrix or None if the execution has no measurements
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(
+                TestExecution.id == test_execution_id
+            ).first()
+
+            if not test or not test.raw_data:
+                return None
+
+            key = (test_execution_id, str(test.updated_at), quantity, method)
+            matrix = _matrix_cache.get(key)
+            if matrix is not None:
+                return matrix
+
+            inputs = test.input_data or {}
+            matrix = build_performance_matrix(
+                test.raw_data.get('measurements', []),
+                irradiance_levels=inputs.get('irradiance_matrix'),
+                temperature_levels=inputs.get('temperature_matrix'),
+                quantity=quantity,
+                method=method
+            )
+
+        _matrix_cache.put(key, matrix)
+        return matrix
+
+    except Exception as e:
+        print(f"Error building performance matrix: {e}")
+        return None
+
+
+def create_matrix_heatmap(matrix: PerformanceMatrix, title: str = None) -> go.Figure:
+    """
+    Create heatmap of a performance matrix
+
+    Args:
+        matrix: PerformanceMatrix
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    return create_heatmap(
+        matrix.to_dataframe(),
+        title=title or f"{matrix.quantity.upper()} Matrix",
+        x_label="Irradiance (W/m²)",
+        y_label="Temperature (°C)"
+    )
+
+
+def create_matrix_surface(matrix: PerformanceMatrix, title: str = None) -> go.Figure:
+    """
+    Create 3D performance surface of a matrix
+
+    Args:
+        matrix: PerformanceMatrix
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    return create_3d_surface_plot(
+        x=matrix.irradiance,
+        y=matrix.temperature,
+        z=matrix.values,
+        title=title or f"{matrix.quantity.upper()} Performance Surface",
+        x_label="Irradiance (W/m²)",
+        y_label="Temperature (°C)",
+        z_label=matrix.quantity.upper()
+    )
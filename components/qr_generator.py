@@ -5,16 +5,370 @@ QR Code Generator - Generate and manage QR codes for samples and equipment
 
 import qrcode
 import io
+import os
+import time
 import base64
+import atexit
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Iterable
 from datetime import datetime
-import json
 import streamlit as st
+from sqlalchemy import bindparam, func, insert
 
 from config.settings import config, STATIC_DIR
 from config.database import get_db
-from database.models import QRCode
+from database.models import QRCode, QRScanEvent
+from utils.cache import LRUCache, ContentAddressedStore, content_hash
+
+
+# Batches smaller than this are rendered in-process; pool startup costs more
+BATCH_POOL_MIN_SIZE = 16
+
+_BASE32_ALPHABET = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567")
+
+
+def make_short_code(entity_type: str, entity_key: str) -> str:
+    """
+    Make the compact identifier encoded in an entity's QR code
+
+    The code is the base32 form of an 80-bit hash of the entity, so it is
+    stable across regenerations and uses only QR alphanumeric characters.
+
+    Args:
+        entity_type: Type of entity (sample, equipment, etc.)
+        entity_key: Natural key of the entity (sample ID, equipment code)
+
+    Returns:
+        16-character uppercase base32 code
+    """
+    digest = hashlib.sha256(f"{entity_type}:{entity_key}".encode('utf-8')).digest()
+    return base64.b32encode(digest[:10]).decode('ascii')
+
+
+def format_qr_content(short_code: str) -> str:
+    """Get the string encoded in the QR image for a short code"""
+    return f"{config.QR_CODE_PREFIX}{short_code}"
+
+
+def parse_qr_content(qr_code_string: str) -> str:
+    """
+    Normalize scanned QR content to the stored qr_code value
+
+    Compact codes are accepted with or without the prefix and in any case.
+    Anything else (e.g. legacy JSON payloads) is returned unchanged.
+
+    Args:
+        qr_code_string: Scanned or typed QR content
+
+    Returns:
+        Value to match against QRCode.qr_code
+    """
+    content = qr_code_string.strip()
+    candidate = content
+
+    if candidate.upper().startswith(config.QR_CODE_PREFIX.upper()):
+        candidate = candidate[len(config.QR_CODE_PREFIX):]
+
+    candidate = candidate.upper()
+    if len(candidate) == 16 and all(c in _BASE32_ALPHABET for c in candidate):
+        return format_qr_content(candidate)
+
+    return content
+
+
+def render_qr_png(
+    data: str,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_L,
+    box_size: int = 10,
+    border: int = 4
+) -> bytes:
+    """
+    Render QR code data to PNG bytes
+
+    Module-level so it can be dispatched to worker processes.
+
+    Args:
+        data: Data to encode in QR code
+        error_correction: qrcode error correction level
+        box_size: Pixel size of each QR module
+        border: Quiet zone width in modules
+
+    Returns:
+        PNG image bytes
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=error_correction,
+        box_size=box_size,
+        border=border,
+    )
+
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+
+def render_qr_pngs(
+    payloads: List[str],
+    max_workers: int = None
+) -> List[bytes]:
+    """
+    Render many QR codes, using a process pool for large batches
+
+    Args:
+        payloads: Data strings to encode
+        max_workers: Worker process count (defaults to CPU count)
+
+    Returns:
+        List of PNG image bytes in the same order as payloads
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1 or len(payloads) < BATCH_POOL_MIN_SIZE:
+        return [render_qr_png(payload) for payload in payloads]
+
+    chunksize = max(1, len(payloads) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render_qr_png, payloads, chunksize=chunksize))
+
+
+def create_label_sheet_pdf(
+    labels: List[Dict[str, Any]],
+    columns: int = 3,
+    rows: int = 8,
+    page_size: tuple = None,
+    margin_mm: float = 10.0,
+    box_size: int = 10
+) -> bytes:
+    """
+    Create a print-ready multi-up PDF label sheet
+
+    Each QR image is embedded at one pixel per module and scaled by the PDF,
+    which keeps edges sharp at any print resolution and the file small.
+
+    Args:
+        labels: List of dictionaries with 'image' (PNG bytes) and 'caption'
+        columns: Labels per row
+        rows: Label rows per page
+        page_size: ReportLab page size (defaults to A4)
+        margin_mm: Page margin in millimetres
+        box_size: Pixel size of each QR module in the source images
+
+    Returns:
+        PDF bytes
+    """
+    from PIL import Image
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    page_size = page_size or A4
+    page_width, page_height = page_size
+    margin = margin_mm * mm
+
+    cell_width = (page_width - 2 * margin) / columns
+    cell_height = (page_height - 2 * margin) / rows
+    caption_height = 10
+    image_size = min(cell_width, cell_height - caption_height) * 0.9
+
+    pdf_buffer = io.BytesIO()
+    pdf = canvas.Canvas(pdf_buffer, pagesize=page_size)
+    per_page = columns * rows
+
+    for index, label in enumerate(labels):
+        if index and index % per_page == 0:
+            pdf.showPage()
+
+        slot = index % per_page
+        col, row = slot % columns, slot // columns
+
+        cell_x = margin + col * cell_width
+        cell_top = page_height - margin - row * cell_height
+
+        image_x = cell_x + (cell_width - image_size) / 2
+        image_y = cell_top - image_size - (cell_height - caption_height - image_size) / 2
+
+        img = Image.open(io.BytesIO(label['image']))
+        img = img.resize((img.width // box_size, img.height // box_size), Image.NEAREST).convert('L')
+
+        pdf.drawImage(
+            ImageReader(img),
+            image_x, image_y,
+            width=image_size, height=image_size
+        )
+
+        caption = label.get('caption')
+        if caption:
+            pdf.setFont("Helvetica", 7)
+            pdf.drawCentredString(cell_x + cell_width / 2, image_y - 8, str(caption)[:48])
+
+    pdf.save()
+    return pdf_buffer.getvalue()
+
+
+class ScanEventBuffer:
+    """
+    In-memory buffer of QR scan events folded into the database in batches
+
+    Scans are appended without touching the database. A background thread
+    periodically inserts the buffered events into qr_scan_events and applies
+    the per-code counter increments in a single executemany UPDATE. Events
+    of a code whose flushes fail max_attempts times in a row are moved to
+    dead_letters instead of being retried forever.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        flush_size: int = 500,
+        on_flush: Callable[[Iterable[str]], None] = None,
+        max_attempts: int = 5
+    ):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.on_flush = on_flush
+        self.max_attempts = max_attempts
+        self.dead_letters: List[tuple] = []  # Events given up on, same layout as _events
+
+        self._events: List[tuple] = []  # (qr_code_id, qr_code, scanned_at, user_id)
+        self._pending: Counter = Counter()
+        self._inflight: Counter = Counter()
+        self._failures: Counter = Counter()  # qr_code_id -> consecutive failed flushes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, qr_code_id: int, qr_code: str, user_id: int = None):
+        """
+        Buffer a scan event
+
+        Args:
+            qr_code_id: ID of the scanned QRCode row
+            qr_code: Stored qr_code value (used to invalidate lookup caches)
+            user_id: User who scanned the code
+        """
+        with self._lock:
+            self._events.append((qr_code_id, qr_code, datetime.utcnow(), user_id))
+            self._pending[qr_code_id] += 1
+            pending = len(self._events)
+
+        self._ensure_flusher()
+        if pending >= self.flush_size:
+            self._wake.set()
+
+    def pending_count(self, qr_code_id: int) -> int:
+        """Get the number of scans not yet reflected in the database"""
+        with self._lock:
+            return self._pending[qr_code_id] + self._inflight[qr_code_id]
+
+    def flush(self) -> int:
+        """
+        Write buffered events and fold them into QRCode counters
+
+        Returns:
+            Number of events written
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                self._inflight, self._pending = self._pending, Counter()
+
+            if not events:
+                return 0
+
+            totals: Dict[int, Dict[str, Any]] = {}
+            for qr_code_id, _, scanned_at, _ in events:
+                entry = totals.setdefault(qr_code_id, {
+                    'qr_id': qr_code_id, 'scans': 0, 'first': scanned_at, 'last': scanned_at
+                })
+                entry['scans'] += 1
+                entry['first'] = min(entry['first'], scanned_at)
+                entry['last'] = max(entry['last'], scanned_at)
+
+            qr_table = QRCode.__table__
+            counter_update = qr_table.update().where(
+                qr_table.c.id == bindparam('qr_id')
+            ).values(
+                scan_count=func.coalesce(qr_table.c.scan_count, 0) + bindparam('scans'),
+                first_scanned_at=func.coalesce(qr_table.c.first_scanned_at, bindparam('first')),
+                last_scanned_at=bindparam('last')
+            )
+
+            try:
+                with get_db() as db:
+                    db.execute(insert(QRScanEvent), [
+                        {'qr_code_id': qr_code_id, 'scanned_at': scanned_at, 'scanned_by_id': user_id}
+                        for qr_code_id, _, scanned_at, user_id in events
+                    ])
+                    db.execute(counter_update, list(totals.values()))
+                    db.commit()
+            except Exception as e:
+                print(f"Error flushing QR scan events: {e}")
+                # Requeue so the scans are retried on the next flush, unless
+                # their code has failed too often
+                with self._lock:
+                    self._failures.update(totals.keys())
+                    dropped = {
+                        qr_code_id for qr_code_id in totals
+                        if self._failures[qr_code_id] >= self.max_attempts
+                    }
+                    for qr_code_id in dropped:
+                        del self._failures[qr_code_id]
+                        del self._inflight[qr_code_id]
+
+                    self._events[:0] = [event for event in events if event[0] not in dropped]
+                    dead = [event for event in events if event[0] in dropped]
+                    self.dead_letters.extend(dead)
+                    self._pending.update(self._inflight)
+                    self._inflight = Counter()
+
+                if dead:
+                    print(
+                        f"Error: dropped {len(dead)} QR scan events of QR code IDs "
+                        f"{sorted(dropped)} after {self.max_attempts} failed flushes"
+                    )
+                return 0
+
+            if self.on_flush:
+                self.on_flush({qr_code for _, qr_code, _, _ in events})
+
+            with self._lock:
+                self._inflight = Counter()
+                for qr_code_id in totals:
+                    self._failures.pop(qr_code_id, None)
+
+            return len(events)
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use"""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="qr-scan-flush", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        """Flush periodically, or early when the buffer fills up"""
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
 
 
 class QRCodeGenerator:
@@ -24,6 +378,106 @@ class QRCodeGenerator:
         self.qr_storage_path = STATIC_DIR / "qrcodes"
         self.qr_storage_path.mkdir(parents=True, exist_ok=True)
 
+        # Images are content-addressed by payload and render parameters
+        self.image_cache = LRUCache(max_items=config.QR_MEMORY_CACHE_ITEMS)
+        self.image_store = ContentAddressedStore(
+            self.qr_storage_path,
+            max_bytes=config.QR_DISK_CACHE_MAX_MB * 1024 * 1024,
+            suffix='.png'
+        )
+
+        # Scan resolution cache: qr_code -> record dictionary. Entries expire
+        # so records deactivated by other processes stop resolving
+        self.lookup_cache = LRUCache(
+            max_items=config.QR_LOOKUP_CACHE_ITEMS,
+            ttl=config.QR_LOOKUP_CACHE_SECONDS
+        )
+
+        # Scan tracking is buffered and folded into counters in batches
+        self.scan_buffer = ScanEventBuffer(
+            flush_interval=config.QR_SCAN_FLUSH_SECONDS,
+            flush_size=config.QR_SCAN_FLUSH_SIZE,
+            on_flush=self._invalidate_lookups,
+            max_attempts=config.QR_SCAN_MAX_ATTEMPTS
+        )
+
+    def _invalidate_lookups(self, codes: Iterable[str]):
+        """Drop cached records so the next resolve reads fresh counters"""
+        for code in codes:
+            self.lookup_cache.pop(code)
+
+    @staticmethod
+    def image_key(
+        data: str,
+        error_correction: int = qrcode.constants.ERROR_CORRECT_L,
+        box_size: int = 10,
+        border: int = 4
+    ) -> str:
+        """Get the content key for a QR payload and its render parameters"""
+        return content_hash('qr-png-v1', data, error_correction, box_size, border)
+
+    def get_qr_image(self, data: str) -> tuple[bytes, Path]:
+        """
+        Get QR code image for a payload, rendering only on a cache miss
+
+        Args:
+            data: Data encoded in the QR code
+
+        Returns:
+            Tuple of (image_bytes, image_path); the path is in the evicting
+            image store, so use it right away and do not persist it
+        """
+        key = self.image_key(data)
+
+        img_bytes = self.image_cache.get(key)
+        if img_bytes is None:
+            img_bytes = self.image_store.get(key)
+            if img_bytes is None:
+                img_bytes = render_qr_png(data)
+            self.image_cache.put(key, img_bytes)
+
+        return img_bytes, self.image_store.put(key, img_bytes)
+
+    def get_qr_images(
+        self,
+        payloads: List[str],
+        max_workers: int = None
+    ) -> List[tuple[bytes, Path]]:
+        """
+        Get QR code images for many payloads, rendering distinct misses in a pool
+
+        Args:
+            payloads: Data strings encoded in the QR codes
+            max_workers: Worker process count (defaults to CPU count)
+
+        Returns:
+            List of (image_bytes, image_path) in the same order as payloads
+        """
+        keys = [self.image_key(payload) for payload in payloads]
+        found: Dict[str, bytes] = {}
+        missing: Dict[str, str] = {}
+
+        for key, payload in zip(keys, payloads):
+            if key in found or key in missing:
+                continue
+            img_bytes = self.image_cache.get(key)
+            if img_bytes is None:
+                img_bytes = self.image_store.get(key)
+            if img_bytes is None:
+                missing[key] = payload
+            else:
+                found[key] = img_bytes
+
+        rendered = render_qr_pngs(list(missing.values()), max_workers=max_workers)
+        found.update(zip(missing.keys(), rendered))
+
+        paths = {}
+        for key, img_bytes in found.items():
+            self.image_cache.put(key, img_bytes)
+            paths[key] = self.image_store.put(key, img_bytes)
+
+        return [(found[key], paths[key]) for key in keys]
+
     def generate_qr_code(
         self,
         data: str,
@@ -45,74 +499,159 @@ class QRCodeGenerator:
         Returns:
             Tuple of (qr_code_string, image_bytes)
         """
-        # Create QR code instance
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-
-        # Add data
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Convert to bytes
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_bytes = img_buffer.getvalue()
-
-        # Save to file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{entity_type}_{entity_id}_{timestamp}.png"
-        file_path = self.qr_storage_path / filename
-
-        with open(file_path, 'wb') as f:
-            f.write(img_bytes)
+        img_bytes, _ = self.get_qr_image(data)
 
         # Save to database
         if save_to_db:
             try:
                 with get_db() as db:
-                    qr_record = QRCode(
-                        qr_code=data,
-                        entity_type=entity_type,
-                        entity_id=entity_id,
-                        data=additional_data,
-                        qr_image_path=str(file_path),
-                        is_active=True,
-                        generated_at=datetime.utcnow()
-                    )
-                    db.add(qr_record)
+                    self._upsert_records(db, [{
+                        'data': data,
+                        'entity_type': entity_type,
+                        'entity_id': entity_id,
+                        'additional_data': additional_data
+                    }])
                     db.commit()
             except Exception as e:
                 print(f"Error saving QR code to database: {e}")
 
         return data, img_bytes
 
-    def generate_sample_qr_code(
+    def _upsert_records(self, db, items: List[Dict[str, Any]]):
+        """
+        Insert QRCode rows, re-issuing existing codes in place
+
+        No image path is stored: files in the image store are evicted, and
+        the image of any issued code is re-derived from its payload with
+        get_qr_image(record.qr_code).
+
+        Args:
+            db: Database session
+            items: Dictionaries with 'data', 'entity_type', 'entity_id' and
+                'additional_data'
+        """
+        by_code = {item['data']: item for item in items}
+        existing = {
+            record.qr_code: record
+            for record in db.query(QRCode).filter(QRCode.qr_code.in_(list(by_code)))
+        }
+        generated_at = datetime.utcnow()
+
+        for code, item in by_code.items():
+            record = existing.get(code)
+            if record is None:
+                record = QRCode(qr_code=code)
+                db.add(record)
+
+            record.entity_type = item['entity_type']
+            record.entity_id = item['entity_id']
+            record.data = item.get('additional_data')
+            record.qr_image_path = None
+            record.is_active = True
+            record.generated_at = generated_at
+
+            self.lookup_cache.pop(code)
+
+    def generate_qr_codes_batch(
         self,
-        sample_id: str,
+        items: List[Dict[str, Any]],
+        save_to_db: bool = True,
+        max_workers: int = None,
+        label_sheet: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Generate many QR codes at once
+
+        Distinct uncached images are rendered across a process pool and all
+        QRCode rows are inserted in a single transaction.
+
+        Args:
+            items: List of dictionaries with 'data', 'entity_type', 'entity_id'
+                and optional 'additional_data' and 'caption'
+            save_to_db: Whether to save to database
+            max_workers: Worker process count (defaults to CPU count)
+            label_sheet: Whether to build a PDF label sheet
+
+        Returns:
+            Dictionary with 'codes' (list of (qr_code_string, image_bytes)),
+            'label_sheet' (PDF bytes or None), 'count', 'elapsed_seconds'
+            and 'codes_per_second'
+        """
+        start = time.perf_counter()
+
+        results = self.get_qr_images([item['data'] for item in items], max_workers=max_workers)
+        images = [img_bytes for img_bytes, _ in results]
+
+        if save_to_db and items:
+            try:
+                with get_db() as db:
+                    self._upsert_records(db, items)
+                    db.commit()
+            except Exception as e:
+                print(f"Error saving QR code batch to database: {e}")
+
+        sheet = None
+        if label_sheet and items:
+            sheet = create_label_sheet_pdf([
+                {
+                    'image': img_bytes,
+                    'caption': item.get('caption') or f"{item['entity_type']} {item['entity_id']}"
+                }
+                for item, img_bytes in zip(items, images)
+            ])
+
+        elapsed = time.perf_counter() - start
+
+        return {
+            'codes': [(item['data'], img_bytes) for item, img_bytes in zip(items, images)],
+            'label_sheet': sheet,
+            'count': len(items),
+            'elapsed_seconds': elapsed,
+            'codes_per_second': len(items) / elapsed if elapsed > 0 else 0.0
+        }
+
+    def generate_sample_qr_codes_batch(
+        self,
+        sample_ids: List[str],
         service_request_number: str,
-        additional_info: Dict[str, Any] = None
-    ) -> tuple[str, bytes]:
+        additional_info: Dict[str, Any] = None,
+        max_workers: int = None
+    ) -> Dict[str, Any]:
         """
-        Generate QR code for a sample
+        Generate QR codes for a whole shipment of samples
 
         Args:
-            sample_id: Sample identifier
+            sample_ids: Sample identifiers
             service_request_number: Service request number
-            additional_info: Additional sample information
+            additional_info: Additional information applied to every sample
+            max_workers: Worker process count (defaults to CPU count)
 
         Returns:
-            Tuple of (qr_code_string, image_bytes)
+            Batch result dictionary (see generate_qr_codes_batch)
         """
-        # Construct QR code data
+        items = []
+        for sample_id in sample_ids:
+            qr_data = self._build_sample_qr_data(sample_id, service_request_number, additional_info)
+            items.append({
+                'data': format_qr_content(qr_data['short_code']),
+                'entity_type': 'sample',
+                'entity_id': hash(sample_id),
+                'additional_data': qr_data,
+                'caption': sample_id
+            })
+
+        return self.generate_qr_codes_batch(items, max_workers=max_workers)
+
+    def _build_sample_qr_data(
+        self,
+        sample_id: str,
+        service_request_number: str,
+        additional_info: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Construct the QR payload for a sample"""
         qr_data = {
             'type': 'sample',
+            'short_code': make_short_code('sample', sample_id),
             'sample_id': sample_id,
             'service_request': service_request_number,
             'generated_at': datetime.now().isoformat(),
@@ -122,11 +661,30 @@ class QRCodeGenerator:
         if additional_info:
             qr_data.update(additional_info)
 
-        # Convert to JSON string
-        qr_string = json.dumps(qr_data)
+        return qr_data
+
+    def generate_sample_qr_code(
+        self,
+        sample_id: str,
+        service_request_number: str,
+        additional_info: Dict[str, Any] = None
+    ) -> tuple[str, bytes]:
+        """
+        Generate QR code for a sample
+
+        Args:
+            sample_id: Sample identifier
+            service_request_number: Service request number
+            additional_info: Additional sample information
+
+        Returns:
+            Tuple of (qr_code_string, image_bytes)
+        """
+        # Construct QR code data; only the compact code is encoded in the image
+        qr_data = self._build_sample_qr_data(sample_id, service_request_number, additional_info)
 
         return self.generate_qr_code(
-            data=qr_string,
+            data=format_qr_content(qr_data['short_code']),
             entity_type='sample',
             entity_id=hash(sample_id),  # Use hash as entity_id
             additional_data=qr_data
@@ -151,6 +709,7 @@ class QRCodeGenerator:
         """
         qr_data = {
             'type': 'equipment',
+            'short_code': make_short_code('equipment', equipment_code),
             'equipment_code': equipment_code,
             'equipment_name': equipment_name,
             'generated_at': datetime.now().isoformat(),
@@ -160,10 +719,8 @@ class QRCodeGenerator:
         if additional_info:
             qr_data.update(additional_info)
 
-        qr_string = json.dumps(qr_data)
-
         return self.generate_qr_code(
-            data=qr_string,
+            data=format_qr_content(qr_data['short_code']),
             entity_type='equipment',
             entity_id=hash(equipment_code),
             additional_data=qr_data
@@ -181,47 +738,156 @@ class QRCodeGenerator:
         """
         return base64.b64encode(img_bytes).decode()
 
-    def lookup_qr_code(self, qr_code_string: str) -> Optional[Dict[str, Any]]:
+    def resolve_qr_code(self, qr_code_string: str) -> Optional[Dict[str, Any]]:
         """
-        Look up QR code in database
+        Resolve scanned QR content to its record without side effects
+
+        Compact codes are matched through the unique qr_code index and
+        cached in-process, so repeat scans do not touch the database.
 
         Args:
-            qr_code_string: QR code data string
+            qr_code_string: Scanned QR content (compact code or legacy payload)
 
         Returns:
-            QR code information dictionary or None
+            QR code record dictionary or None
         """
+        code = parse_qr_content(qr_code_string)
+
+        cached = self.lookup_cache.get(code)
+        if cached is not None:
+            return cached
+
         try:
             with get_db() as db:
                 qr_record = db.query(QRCode).filter(
-                    QRCode.qr_code == qr_code_string,
+                    QRCode.qr_code == code,
                     QRCode.is_active == True
                 ).first()
 
                 if qr_record:
-                    # Update scan tracking
-                    qr_record.last_scanned_at = datetime.utcnow()
-                    qr_record.scan_count = (qr_record.scan_count or 0) + 1
-
-                    if not qr_record.first_scanned_at:
-                        qr_record.first_scanned_at = datetime.utcnow()
-
-                    db.commit()
-
-                    return {
+                    record = {
                         'id': qr_record.id,
+                        'qr_code': qr_record.qr_code,
                         'entity_type': qr_record.entity_type,
                         'entity_id': qr_record.entity_id,
                         'data': qr_record.data,
-                        'scan_count': qr_record.scan_count,
+                        'scan_count': qr_record.scan_count or 0,
                         'generated_at': qr_record.generated_at
                     }
+                    self.lookup_cache.put(code, record)
+                    return record
 
         except Exception as e:
-            print(f"Error looking up QR code: {e}")
+            print(f"Error resolving QR code: {e}")
 
         return None
 
+    def deactivate_qr_code(self, qr_code_string: str) -> bool:
+        """
+        Retire a QR code so scans no longer resolve it
+
+        Args:
+            qr_code_string: QR content (compact code or legacy payload)
+
+        Returns:
+            True if an active record was deactivated
+        """
+        code = parse_qr_content(qr_code_string)
+
+        try:
+            with get_db() as db:
+                updated = db.query(QRCode).filter(
+                    QRCode.qr_code == code,
+                    QRCode.is_active == True
+                ).update({QRCode.is_active: False}, synchronize_session=False)
+        except Exception as e:
+            print(f"Error deactivating QR code: {e}")
+            return False
+
+        self.lookup_cache.pop(code)
+        return bool(updated)
+
+    def lookup_qr_code(
+        self,
+        qr_code_string: str,
+        user_id: int = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up QR code and record the scan
+
+        The scan is buffered rather than written, so the lookup itself is
+        read-only and served from the resolution cache on repeat scans.
+
+        Args:
+            qr_code_string: QR code data string
+            user_id: User performing the scan
+
+        Returns:
+            QR code information dictionary or None
+        """
+        record = self.resolve_qr_code(qr_code_string)
+        if record is None:
+            return None
+
+        self.scan_buffer.record(record['id'], record['qr_code'], user_id=user_id)
+
+        return dict(
+            record,
+            scan_count=record['scan_count'] + self.scan_buffer.pending_count(record['id'])
+        )
+
+    def get_scan_history(
+        self,
+        qr_code_string: str = None,
+        since: datetime = None,
+        limit: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get recorded scan events for analytics
+
+        Args:
+            qr_code_string: Restrict to one QR code (optional)
+            since: Only events at or after this time (optional)
+            limit: Maximum number of events (newest first)
+
+        Returns:
+            List of scan event dictionaries
+        """
+        self.scan_buffer.flush()
+
+        try:
+            with get_db() as db:
+                query = db.query(
+                    QRScanEvent.qr_code_id,
+                    QRScanEvent.scanned_at,
+                    QRScanEvent.scanned_by_id
+                )
+
+                if qr_code_string:
+                    record = self.resolve_qr_code(qr_code_string)
+                    if record is None:
+                        return []
+                    query = query.filter(QRScanEvent.qr_code_id == record['id'])
+                if since:
+                    query = query.filter(QRScanEvent.scanned_at >= since)
+
+                query = query.order_by(QRScanEvent.scanned_at.desc())
+                if limit:
+                    query = query.limit(limit)
+
+                return [
+                    {
+                        'qr_code_id': qr_code_id,
+                        'scanned_at': scanned_at,
+                        'scanned_by_id': scanned_by_id
+                    }
+                    for qr_code_id, scanned_at, scanned_by_id in query.all()
+                ]
+
+        except Exception as e:
+            print(f"Error getting scan history: {e}")
+            return []
+
 
 # Global QR generator instance
 _qr_generator = None
@@ -0,0 +1,409 @@
+"""
+Series Store - Time-series ingestion and multi-resolution aggregates
+====================================================================
+Bulk-loads TestData measurements and maintains a pyramid of min/max/mean
+aggregates per measurement type, so long-duration runs can be viewed at
+any zoom level without reading the raw series.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from sqlalchemy import delete, func, insert
+
+from components.chamber_compliance import update_compliance
+from components.visualizations import create_envelope_chart, create_time_series_chart
+from config.database import get_db
+from config.settings import config
+from database.models import SeriesAggregate, TestData
+
+
+def _to_epoch_seconds(timestamps: Sequence) -> np.ndarray:
+    """Convert timestamps to int64 seconds since the epoch"""
+    values = pd.to_datetime(pd.Series(timestamps)).to_numpy('datetime64[s]')
+    return values.astype(np.int64)
+
+
+def _from_epoch_seconds(seconds: np.ndarray) -> List[datetime]:
+    """Convert int64 epoch seconds to naive UTC datetimes"""
+    return pd.to_datetime(seconds, unit='s').to_pydatetime().tolist()
+
+
+def compute_pyramid(
+    timestamps: Sequence,
+    values: Sequence[float],
+    levels: Sequence[int] = None
+) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Compute min/max/mean aggregates at several bucket sizes
+
+    Each level is reduced from the previous one with ufunc.reduceat, so the
+    raw series is scanned once regardless of the number of levels.
+
+    Args:
+        timestamps: Sample timestamps (sorted ascending)
+        values: Sample values
+        levels: Bucket sizes in seconds, ascending, each dividing the next
+
+    Returns:
+        Dictionary mapping bucket size to arrays 'start' (epoch seconds),
+        'count', 'min', 'max' and 'mean'
+    """
+    levels = levels or config.SERIES_PYRAMID_LEVELS
+
+    t = _to_epoch_seconds(timestamps)
+    v = np.asarray(values, dtype=np.float64)
+
+    finite = np.isfinite(v)
+    t, v = t[finite], v[finite]
+
+    pyramid = {}
+    if len(v) == 0:
+        return pyramid
+
+    # Running inputs for the next level: start, count, sum, min, max
+    start, count, total, vmin, vmax = t, np.ones(len(v), dtype=np.int64), v, v, v
+
+    for bucket_seconds in sorted(levels):
+        bucket = start // bucket_seconds
+        first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
+        start = bucket[first] * bucket_seconds
+        count = np.add.reduceat(count, first)
+        total = np.add.reduceat(total, first)
+        vmin = np.minimum.reduceat(vmin, first)
+        vmax = np.maximum.reduceat(vmax, first)
+
+        pyramid[bucket_seconds] = {
+            'start': start,
+            'count': count,
+            'min': vmin,
+            'max': vmax,
+            'mean': total / count
+        }
+
+    return pyramid
+
+
+def choose_level(
+    window_seconds: float,
+    pixel_width: int,
+    levels: Sequence[int] = None
+) -> int:
+    """
+    Choose the coarsest pyramid level that still fills the pixel width
+
+    Args:
+        window_seconds: Length of the requested time window
+        pixel_width: Horizontal resolution of the chart
+        levels: Available bucket sizes in seconds
+
+    Returns:
+        Bucket size in seconds, or 0 if raw data is needed
+    """
+    levels = levels or config.SERIES_PYRAMID_LEVELS
+    max_bucket = window_seconds / max(pixel_width, 1)
+
+    suitable = [level for level in levels if level <= max_bucket]
+    return max(suitable) if suitable else 0
+
+
+def update_series_pyramid(
+    test_execution_id: int,
+    measurement_type: str,
+    since: datetime = None,
+    db=None
+) -> int:
+    """
+    (Re)build stored aggregates for a series
+
+    With since, only buckets from the coarsest bucket containing since
+    onward are recomputed, which makes appending new data cheap.
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_type: Measurement type of the series
+        since: Earliest changed timestamp (None rebuilds everything)
+        db: Existing session to use (a new one is opened otherwise)
+
+    Returns:
+        Number of aggregate rows written
+    """
+    if db is None:
+        with get_db() as session:
+            return update_series_pyramid(test_execution_id, measurement_type, since, db=session)
+
+    levels = sorted(config.SERIES_PYRAMID_LEVELS)
+    rebuild_from = None
+
+    raw_query = db.query(TestData.timestamp, TestData.value).filter(
+        TestData.test_execution_id == test_execution_id,
+        TestData.measurement_type == measurement_type,
+        TestData.is_valid == True
+    )
+    stale = delete(SeriesAggregate).where(
+        SeriesAggregate.test_execution_id == test_execution_id,
+        SeriesAggregate.measurement_type == measurement_type
+    )
+
+    if since is not None:
+        coarsest = levels[-1]
+        aligned = int(_to_epoch_seconds([since])[0]) // coarsest * coarsest
+        rebuild_from = _from_epoch_seconds(np.array([aligned]))[0]
+        raw_query = raw_query.filter(TestData.timestamp >= rebuild_from)
+        stale = stale.where(SeriesAggregate.bucket_start >= rebuild_from)
+
+    rows = raw_query.order_by(TestData.timestamp).all()
+    db.execute(stale)
+
+    if not rows:
+        return 0
+
+    timestamps, values = zip(*rows)
+    pyramid = compute_pyramid(timestamps, values, levels)
+
+    records = []
+    for bucket_seconds, level in pyramid.items():
+        starts = _from_epoch_seconds(level['start'])
+        records.extend(
+            {
+                'test_execution_id': test_execution_id,
+                'measurement_type': measurement_type,
+                'bucket_seconds': bucket_seconds,
+                'bucket_start': bucket_start,
+                'count': int(count),
+                'min_value': float(vmin),
+                'max_value': float(vmax),
+                'mean_value': float(mean)
+            }
+            for bucket_start, count, vmin, vmax, mean in zip(
+                starts, level['count'], level['min'], level['max'], level['mean']
+            )
+        )
+
+    if records:
+        db.execute(insert(SeriesAggregate), records)
+
+    return len(records)
+
+
+def ingest_measurements(
+    test_execution_id: int,
+    measurement_type: str,
+    timestamps: Sequence,
+    values: Sequence[float],
+    unit: str = None,
+    setpoint: float = None,
+    tolerance: float = None
+) -> int:
+    """
+    Bulk-insert measurements for a series and update its pyramid
+
+    Rows, aggregates and, for series with a setpoint and tolerance, the
+    chamber compliance state are written in the same transaction.
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_type: Measurement type (temperature, humidity, power, ...)
+        timestamps: Sample timestamps
+        values: Sample values
+        unit: Measurement unit
+        setpoint: Expected/target value
+        tolerance: Acceptable deviation
+
+    Returns:
+        Number of measurements inserted
+    """
+    if len(values) == 0:
+        return 0
+
+    times = pd.to_datetime(pd.Series(timestamps)).dt.to_pydatetime().tolist()
+
+    try:
+        with get_db() as db:
+            next_sequence = db.query(func.max(TestData.sequence_number)).filter(
+                TestData.test_execution_id == test_execution_id,
+                TestData.measurement_type == measurement_type
+            ).scalar()
+            next_sequence = (next_sequence or 0) + 1
+
+            db.execute(insert(TestData), [
+                {
+                    'test_execution_id': test_execution_id,
+                    'measurement_type': measurement_type,
+                    'sequence_number': next_sequence + i,
+                    'timestamp': timestamp,
+                    'value': None if value is None or not np.isfinite(value) else float(value),
+                    'unit': unit,
+                    'setpoint': setpoint,
+                    'tolerance': tolerance,
+                    'is_valid': True
+                }
+                for i, (timestamp, value) in enumerate(zip(times, values))
+            ])
+
+            update_series_pyramid(
+                test_execution_id, measurement_type, since=min(times), db=db
+            )
+            if setpoint is not None and tolerance is not None:
+                update_compliance(test_execution_id, [measurement_type], db=db)
+            db.commit()
+    except Exception as e:
+        print(f"Error ingesting measurements: {e}")
+        return 0
+
+    return len(times)
+
+
+def get_series_extent(
+    test_execution_id: int,
+    measurement_type: str
+) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Get the first and last timestamp of a series
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_type: Measurement type of the series
+
+    Returns:
+        Tuple of (start, end) or None if the series is empty
+    """
+    with get_db() as db:
+        start, end = db.query(
+            func.min(TestData.timestamp), func.max(TestData.timestamp)
+        ).filter(
+            TestData.test_execution_id == test_execution_id,
+            TestData.measurement_type == measurement_type
+        ).one()
+
+    if start is None:
+        return None
+    return start, end
+
+
+def get_series_window(
+    test_execution_id: int,
+    measurement_type: str,
+    start: datetime = None,
+    end: datetime = None,
+    pixel_width: int = 1000
+) -> Dict[str, Any]:
+    """
+    Get a series window at the coarsest resolution that fills the chart
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_type: Measurement type of the series
+        start: Window start (defaults to series start)
+        end: Window end (defaults to series end)
+        pixel_width: Horizontal resolution of the chart
+
+    Returns:
+        Dictionary with 'bucket_seconds' (0 for raw data) and lists
+        'timestamps', 'min', 'max' and 'mean'
+    """
+    result = {'bucket_seconds': 0, 'timestamps': [], 'min': [], 'max': [], 'mean': []}
+
+    try:
+        if start is None or end is None:
+            extent = get_series_extent(test_execution_id, measurement_type)
+            if extent is None:
+                return result
+            start = start or extent[0]
+            end = end or extent[1]
+
+        level = choose_level((end - start).total_seconds(), pixel_width)
+        result['bucket_seconds'] = level
+
+        with get_db() as db:
+            if level:
+                rows = db.query(
+                    SeriesAggregate.bucket_start,
+                    SeriesAggregate.min_value,
+                    SeriesAggregate.max_value,
+                    SeriesAggregate.mean_value
+                ).filter(
+                    SeriesAggregate.test_execution_id == test_execution_id,
+                    SeriesAggregate.measurement_type == measurement_type,
+                    SeriesAggregate.bucket_seconds == level,
+                    SeriesAggregate.bucket_start <= end,
+                    SeriesAggregate.bucket_start > start - pd.Timedelta(seconds=level)
+                ).order_by(SeriesAggregate.bucket_start).all()
+
+                for bucket_start, vmin, vmax, mean in rows:
+                    result['timestamps'].append(bucket_start)
+                    result['min'].append(vmin)
+                    result['max'].append(vmax)
+                    result['mean'].append(mean)
+            else:
+                rows = db.query(TestData.timestamp, TestData.value).filter(
+                    TestData.test_execution_id == test_execution_id,
+                    TestData.measurement_type == measurement_type,
+                    TestData.is_valid == True,
+                    TestData.timestamp >= start,
+                    TestData.timestamp <= end
+                ).order_by(TestData.timestamp).all()
+
+                result['timestamps'] = [timestamp for timestamp, _ in rows]
+                result['mean'] = [value for _, value in rows]
+                result['min'] = result['mean']
+                result['max'] = result['mean']
+
+    except Exception as e:
+        print(f"Error getting series window: {e}")
+
+    return result
+
+
+def create_series_chart(
+    test_execution_id: int,
+    measurement_type: str,
+    title: str,
+    y_label: str,
+    start: datetime = None,
+    end: datetime = None,
+    pixel_width: int = 1000,
+    setpoint: float = None,
+    tolerance_upper: float = None,
+    tolerance_lower: float = None
+) -> go.Figure:
+    """
+    Create a time-series chart served from the aggregate pyramid
+
+    Args:
+        test_execution_id: Test execution ID
+        measurement_type: Measurement type of the series
+        title: Chart title
+        y_label: Y-axis label
+        start: Window start (defaults to series start)
+        end: Window end (defaults to series end)
+        pixel_width: Horizontal resolution of the chart
+        setpoint: Target setpoint value
+        tolerance_upper: Upper tolerance limit
+        tolerance_lower: Lower tolerance limit
+
+    Returns:
+        Plotly figure
+    """
+    window = get_series_window(test_execution_id, measurement_type, start, end, pixel_width)
+
+    if not window['bucket_seconds']:
+        return create_time_series_chart(
+            window['timestamps'], window['mean'], title, y_label,
+            setpoint=setpoint,
+            tolerance_upper=tolerance_upper,
+            tolerance_lower=tolerance_lower
+        )
+
+    return create_envelope_chart(
+        window['timestamps'], window['mean'], window['min'], window['max'],
+        title=f"{title} ({window['bucket_seconds']} s buckets)",
+        y_label=y_label,
+        setpoint=setpoint,
+        tolerance_upper=tolerance_upper,
+        tolerance_lower=tolerance_lower
+    )
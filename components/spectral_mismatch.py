@@ -0,0 +1,515 @@
+"""
+Spectral Mismatch - SPEC-001 mismatch factor and quantum efficiency engine
+==========================================================================
+Computes the spectral mismatch factor of IEC 60904-7 between a test device
+and the reference device used to set the simulator irradiance, and
+quantum efficiency figures of measured spectral responses.
+
+All spectra and responses are resampled to one common wavelength grid
+(SPECTRAL_GRID_*), where every integral is a dot product with trapezoid
+weights. Resampling is a matrix product with a linear interpolation matrix
+cached per source wavelength grid, so a shipment of modules measured on the
+same grid is resampled in one operation and the mismatch of every module
+under every simulator lamp is a pair of matrix products.
+
+Irradiance spectra are read from SPECTRA_DIR and reference device responses
+from SPECTRAL_RESPONSE_DIR, one CSV file each named after the spectrum
+(e.g. ``AM1.5G.csv``), with a header row and two columns:
+
+    wavelength  Wavelength (nm)
+    value       Spectral irradiance (W/(m²·nm)) or spectral response (A/W)
+
+The reference spectrum ``AM1.5G.csv`` (ASTM G173-03 global tilt, as
+tabulated in IEC 60904-3) ships with the application; simulator lamp
+spectra and reference device responses are added per laboratory.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.database import get_db
+from config.settings import config, SPECTRA_DIR, SPECTRAL_RESPONSE_DIR
+from database.models import TestExecution, TestProtocol
+from utils.cache import LRUCache, content_hash
+
+
+# h·c/q in nm·W/A: QE = SR · HC_OVER_Q / wavelength
+HC_OVER_Q = 1239.841984
+
+# QE falls below this fraction of its peak at the cutoff wavelength
+CUTOFF_FRACTION = 0.5
+
+_resampling_cache = LRUCache(max_items=32)
+_spectrum_cache = LRUCache(max_items=64)
+
+
+@dataclass
+class Spectrum:
+    """Spectral irradiance or spectral response on its own wavelength grid"""
+    name: str
+    wavelength: np.ndarray  # nm
+    values: np.ndarray
+
+    def __post_init__(self):
+        wavelength = np.asarray(self.wavelength, dtype=np.float64)
+        values = np.asarray(self.values, dtype=np.float64)
+        if wavelength.shape != values.shape or wavelength.ndim != 1:
+            raise ValueError(f"Spectrum '{self.name}' needs equal-length 1-D wavelength and values")
+
+        wavelength, first = np.unique(wavelength, return_index=True)
+        if len(wavelength) < 2:
+            raise ValueError(f"Spectrum '{self.name}' needs at least two wavelengths")
+
+        self.wavelength = wavelength
+        self.values = np.nan_to_num(values[first])
+
+    @property
+    def grid_key(self) -> str:
+        """Identity of the wavelength grid (spectra sharing it resample together)"""
+        return content_hash(self.wavelength.tobytes())
+
+
+def common_grid() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Common wavelength grid and its trapezoid integration weights
+
+    Returns:
+        Tuple of (wavelength in nm, weights in nm)
+    """
+    key = f"grid:{config.SPECTRAL_GRID_START}:{config.SPECTRAL_GRID_END}:{config.SPECTRAL_GRID_STEP}"
+    grid = _resampling_cache.get(key)
+    if grid is None:
+        count = int(round((config.SPECTRAL_GRID_END - config.SPECTRAL_GRID_START)
+                          / config.SPECTRAL_GRID_STEP)) + 1
+        wavelength = np.linspace(config.SPECTRAL_GRID_START, config.SPECTRAL_GRID_END, count)
+
+        weights = np.zeros(count)
+        half_steps = np.diff(wavelength) / 2
+        weights[:-1] += half_steps
+        weights[1:] += half_steps
+
+        grid = (wavelength, weights)
+        _resampling_cache.put(key, grid)
+    return grid
+
+
+def resampling_matrix(source: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation matrix from a source wavelength grid to the common grid
+
+    Grid points outside the source range get zero (no response or
+    irradiance is assumed where none was measured).
+
+    Args:
+        source: Ascending source wavelengths (nm)
+
+    Returns:
+        Matrix of shape (n_grid, n_source)
+    """
+    grid, _ = common_grid()
+    key = content_hash(source.tobytes(), grid.tobytes())
+    matrix = _resampling_cache.get(key)
+    if matrix is not None:
+        return matrix
+
+    index = np.clip(np.searchsorted(source, grid) - 1, 0, len(source) - 2)
+    weight = (grid - source[index]) / (source[index + 1] - source[index])
+    inside = (grid >= source[0]) & (grid <= source[-1])
+    rows = np.flatnonzero(inside)
+
+    matrix = np.zeros((len(grid), len(source)))
+    matrix[rows, index[rows]] = 1 - weight[rows]
+    matrix[rows, index[rows] + 1] += weight[rows]
+
+    _resampling_cache.put(key, matrix)
+    return matrix
+
+
+def to_grid(spectra: Sequence[Spectrum]) -> np.ndarray:
+    """
+    Resample spectra to the common grid
+
+    Spectra sharing a wavelength grid are resampled with one matrix product.
+
+    Args:
+        spectra: Spectra to resample
+
+    Returns:
+        Array of shape (len(spectra), n_grid)
+    """
+    grid, _ = common_grid()
+    resampled = np.zeros((len(spectra), len(grid)))
+
+    groups: Dict[str, List[int]] = {}
+    for position, spectrum in enumerate(spectra):
+        groups.setdefault(spectrum.grid_key, []).append(position)
+
+    for positions in groups.values():
+        matrix = resampling_matrix(spectra[positions[0]].wavelength)
+        stack = np.stack([spectra[i].values for i in positions])
+        resampled[positions] = stack @ matrix.T
+
+    return resampled
+
+
+def _load_csv(directory: Path, name: str, kind: str) -> Spectrum:
+    """Load a two-column spectrum file (cached until the file changes)"""
+    path = directory / f"{name}.csv"
+    if not path.exists():
+        raise FileNotFoundError(
+            f"{kind} '{name}' not found at {path}; expected a CSV with a header row "
+            f"and columns wavelength (nm), value"
+        )
+
+    key = f"{path}:{path.stat().st_mtime_ns}"
+    spectrum = _spectrum_cache.get(key)
+    if spectrum is None:
+        df = pd.read_csv(path, usecols=[0, 1], dtype=np.float64)
+        spectrum = Spectrum(name, df.iloc[:, 0].to_numpy(), df.iloc[:, 1].to_numpy())
+        _spectrum_cache.put(key, spectrum)
+    return spectrum
+
+
+def available_spectra() -> List[str]:
+    """
+    List irradiance spectra present in SPECTRA_DIR
+
+    Returns:
+        Sorted spectrum names
+    """
+    if not SPECTRA_DIR.exists():
+        return []
+    return sorted(path.stem for path in SPECTRA_DIR.glob('*.csv'))
+
+
+def simulator_spectra() -> List[str]:
+    """
+    List simulator lamp spectra (every spectrum but the reference one)
+
+    Returns:
+        Sorted spectrum names
+    """
+    return [name for name in available_spectra() if name != config.SPECTRAL_REFERENCE_SPECTRUM]
+
+
+def load_spectrum(name: str = None) -> Spectrum:
+    """
+    Load an irradiance spectrum
+
+    Args:
+        name: Spectrum name (defaults to the reference spectrum, AM1.5G)
+
+    Returns:
+        Spectrum in W/(m²·nm)
+
+    Raises:
+        FileNotFoundError: If the spectrum file does not exist
+    """
+    return _load_csv(SPECTRA_DIR, name or config.SPECTRAL_REFERENCE_SPECTRUM, "Spectrum")
+
+
+def load_response(name: str = None) -> Spectrum:
+    """
+    Load a reference device spectral response
+
+    Args:
+        name: Device name (defaults to SPECTRAL_REFERENCE_DEVICE)
+
+    Returns:
+        Spectrum in A/W
+
+    Raises:
+        FileNotFoundError: If the response file does not exist
+    """
+    return _load_csv(
+        SPECTRAL_RESPONSE_DIR, name or config.SPECTRAL_REFERENCE_DEVICE, "Spectral response"
+    )
+
+
+def mismatch_matrix(
+    test_responses: np.ndarray,
+    reference_response: np.ndarray,
+    simulator: np.ndarray,
+    reference_spectrum: np.ndarray
+) -> np.ndarray:
+    """
+    Spectral mismatch factors on the common grid (IEC 60904-7)
+
+        MM = ∫E_ref·SR_ref · ∫E_sim·SR_test / (∫E_sim·SR_ref · ∫E_ref·SR_test)
+
+    Args:
+        test_responses: Test device responses (n_devices, n_grid)
+        reference_response: Reference device response (n_grid)
+        simulator: Simulator spectra (n_lamps, n_grid)
+        reference_spectrum: Reference spectrum (n_grid)
+
+    Returns:
+        Mismatch factors (n_devices, n_lamps); NaN where a device has no
+        response under the reference spectrum
+    """
+    _, weights = common_grid()
+    simulator_weighted = simulator * weights
+    reference_weighted = reference_spectrum * weights
+
+    test_simulator = test_responses @ simulator_weighted.T
+    test_reference = test_responses @ reference_weighted
+    device_simulator = simulator_weighted @ reference_response
+    device_reference = reference_weighted @ reference_response
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mismatch = (device_reference * test_simulator) / (
+            device_simulator[np.newaxis, :] * test_reference[:, np.newaxis]
+        )
+    return np.where(np.isfinite(mismatch), mismatch, np.nan)
+
+
+def spectral_mismatch(
+    test_responses: Sequence[Spectrum],
+    lamps: Sequence[str] = None,
+    reference_device: Spectrum = None,
+    reference_spectrum: Spectrum = None
+) -> pd.DataFrame:
+    """
+    Mismatch factor of every test device under every simulator lamp
+
+    Args:
+        test_responses: Spectral responses of the test devices (A/W)
+        lamps: Simulator spectrum names (defaults to all simulator spectra)
+        reference_device: Reference device response (defaults to SPECTRAL_REFERENCE_DEVICE)
+        reference_spectrum: Reference spectrum (defaults to AM1.5G)
+
+    Returns:
+        DataFrame of mismatch factors indexed by device name, one column per lamp
+    """
+    lamps = list(lamps) if lamps is not None else simulator_spectra()
+    reference_device = reference_device or load_response()
+    reference_spectrum = reference_spectrum or load_spectrum()
+
+    spectra = to_grid([reference_spectrum] + [load_spectrum(lamp) for lamp in lamps])
+    responses = to_grid([reference_device] + list(test_responses))
+
+    mismatch = mismatch_matrix(responses[1:], responses[0], spectra[1:], spectra[0])
+    return pd.DataFrame(
+        mismatch,
+        index=[response.name for response in test_responses],
+        columns=lamps
+    )
+
+
+def quantum_efficiency(wavelength: np.ndarray, spectral_response: np.ndarray) -> np.ndarray:
+    """
+    External quantum efficiency from spectral response
+
+    Args:
+        wavelength: Wavelength (nm)
+        spectral_response: Spectral response (A/W)
+
+    Returns:
+        Quantum efficiency (fraction)
+    """
+    return np.asarray(spectral_response) * HC_OVER_Q / np.asarray(wavelength)
+
+
+def analyze_quantum_efficiency(
+    responses: Sequence[Spectrum],
+    reference_spectrum: Spectrum = None
+) -> pd.DataFrame:
+    """
+    Quantum efficiency figures of many spectral responses
+
+    Args:
+        responses: Spectral responses (A/W)
+        reference_spectrum: Spectrum for the short-circuit current density
+            (defaults to AM1.5G)
+
+    Returns:
+        DataFrame with one row per response: device, peak_qe,
+        peak_wavelength (nm), cutoff_wavelength (nm, long-wavelength edge
+        where QE falls below half its peak), jsc_ma_cm2 (NaN when the
+        reference spectrum file is missing)
+    """
+    grid, weights = common_grid()
+    if reference_spectrum is None:
+        try:
+            reference_spectrum = load_spectrum()
+        except FileNotFoundError as e:
+            print(f"Short-circuit current density skipped: {e}")
+
+    spectral_response = to_grid(responses)
+    qe = quantum_efficiency(grid, spectral_response)
+
+    peak = qe.argmax(axis=1)
+    peak_qe = qe[np.arange(len(responses)), peak]
+
+    # Last grid point at or above the cutoff level
+    above = qe >= CUTOFF_FRACTION * peak_qe[:, np.newaxis]
+    cutoff = len(grid) - 1 - np.argmax(above[:, ::-1], axis=1)
+
+    if reference_spectrum is not None:
+        # A/m² -> mA/cm²
+        irradiance = to_grid([reference_spectrum])[0]
+        jsc = spectral_response @ (irradiance * weights) / 10
+    else:
+        jsc = np.full(len(responses), np.nan)
+
+    return pd.DataFrame({
+        'device': [response.name for response in responses],
+        'peak_qe': peak_qe,
+        'peak_wavelength': grid[peak],
+        'cutoff_wavelength': grid[cutoff],
+        'jsc_ma_cm2': jsc
+    })
+
+
+def response_from_raw(raw_data: Dict[str, Any], name: str) -> Optional[Spectrum]:
+    """
+    Spectral response of a SPEC-001 execution
+
+    Uses raw_data['spectral_response'] (A/W), or raw_data['quantum_efficiency']
+    (%) converted to spectral response, against raw_data['wavelength'] (nm).
+
+    Args:
+        raw_data: Execution raw data
+        name: Name given to the response
+
+    Returns:
+        Spectrum, or None if the execution has no response data
+    """
+    if not raw_data or not raw_data.get('wavelength'):
+        return None
+
+    wavelength = np.asarray(raw_data['wavelength'], dtype=np.float64)
+    if raw_data.get('spectral_response'):
+        values = np.asarray(raw_data['spectral_response'], dtype=np.float64)
+    elif raw_data.get('quantum_efficiency'):
+        qe = np.asarray(raw_data['quantum_efficiency'], dtype=np.float64) / 100
+        values = qe * wavelength / HC_OVER_Q
+    else:
+        return None
+
+    return Spectrum(name, wavelength, values)
+
+
+def analyze_executions(
+    test_execution_ids: Sequence[int] = None,
+    service_request_id: int = None,
+    lamps: Sequence[str] = None,
+    save: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Quantum efficiency and mismatch of SPEC-001 executions in one batch
+
+    Pass a service request to analyze every module of a shipment. Results
+    are stored in processed_data['spectral_mismatch']; mismatch factors are
+    omitted when no reference device response is available.
+
+    Args:
+        test_execution_ids: Executions to analyze
+        service_request_id: Analyze all SPEC-001 executions of this request
+        lamps: Simulator spectrum names (defaults to all simulator spectra)
+        save: Write the results back to the executions
+
+    Returns:
+        DataFrame with one row per execution (test_execution_id, sample_id,
+        quantum efficiency columns, one mismatch column per lamp), or None on error
+    """
+    try:
+        with get_db() as db:
+            query = db.query(TestExecution)
+            if service_request_id is not None:
+                query = query.join(
+                    TestProtocol, TestExecution.protocol_id == TestProtocol.id
+                ).filter(
+                    TestExecution.service_request_id == service_request_id,
+                    TestProtocol.protocol_id == 'SPEC-001'
+                )
+            if test_execution_ids is not None:
+                query = query.filter(TestExecution.id.in_(list(test_execution_ids)))
+
+            tests, responses = [], []
+            for test in query.order_by(TestExecution.id).all():
+                response = response_from_raw(test.raw_data, test.sample_id or str(test.id))
+                if response is not None:
+                    tests.append(test)
+                    responses.append(response)
+
+            if not tests:
+                return None
+
+            result = analyze_quantum_efficiency(responses)
+            result.insert(0, 'test_execution_id', [test.id for test in tests])
+            result.insert(1, 'sample_id', [test.sample_id for test in tests])
+
+            lamps = list(lamps) if lamps is not None else simulator_spectra()
+            try:
+                mismatch = spectral_mismatch(responses, lamps)
+            except FileNotFoundError as e:
+                print(f"Spectral mismatch skipped: {e}")
+                mismatch = None
+
+            if mismatch is not None:
+                for lamp in lamps:
+                    result[lamp] = mismatch[lamp].to_numpy()
+
+            if save:
+                for position, test in enumerate(tests):
+                    record = result.iloc[position]
+                    processed = dict(test.processed_data or {})
+                    processed['spectral_mismatch'] = {
+                        'peak_qe': float(record['peak_qe']),
+                        'peak_wavelength': float(record['peak_wavelength']),
+                        'cutoff_wavelength': float(record['cutoff_wavelength']),
+                        'jsc_ma_cm2': None if np.isnan(record['jsc_ma_cm2']) else float(record['jsc_ma_cm2']),
+                        'reference_device': config.SPECTRAL_REFERENCE_DEVICE,
+                        'mismatch': None if mismatch is None else {
+                            lamp: None if np.isnan(record[lamp]) else float(record[lamp])
+                            for lamp in lamps
+                        }
+                    }
+                    test.processed_data = processed
+
+        return result
+
+    except Exception as e:
+        print(f"Error analyzing spectral mismatch: {e}")
+        return None
+
+
+def create_quantum_efficiency_chart(
+    responses: Sequence[Spectrum],
+    title: str = "Quantum Efficiency"
+) -> go.Figure:
+    """
+    Create the quantum efficiency curves of spectral responses
+
+    Args:
+        responses: Spectral responses (A/W)
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    fig = go.Figure()
+
+    for response in responses:
+        fig.add_trace(go.Scatter(
+            x=response.wavelength,
+            y=quantum_efficiency(response.wavelength, response.values) * 100,
+            mode='lines',
+            name=response.name
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Wavelength (nm)",
+        yaxis_title="Quantum Efficiency (%)",
+        hovermode='x unified',
+        template='plotly_white'
+    )
+
+    return fig
@@ -0,0 +1,304 @@
+"""
+Stabilization Monitor - Streaming LID/LETID stabilization detection
+===================================================================
+Consumes Pmax measurements as they arrive for each test execution and
+emits a stabilization event as soon as IEC 61215-2 MQT 19 is met, so the
+light-soaking exposure can be stopped without re-evaluating the series.
+"""
+
+import math
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from components.data_traceability import log_action
+from config.database import get_db
+from config.settings import config
+from database.models import TestData, TestExecution
+
+
+# TestData measurement type of the Pmax checks
+PMAX_MEASUREMENT_TYPE = 'pmax'
+
+
+@dataclass
+class StabilizationEvent:
+    """Stabilization reached by a test execution"""
+    test_execution_id: int
+    measurement_index: int  # 0-based index of the stabilizing measurement
+    stabilized_at: Optional[datetime]
+    pmax: float  # Mean Pmax of the final window
+    relative_change: float  # (Pmax - Pmin) / Pmean of the final window
+    initial_pmax: float
+    degradation_pct: float
+
+    def to_dict(self) -> Dict:
+        """Event as a JSON-serializable dictionary"""
+        event = asdict(self)
+        if self.stabilized_at is not None:
+            event['stabilized_at'] = self.stabilized_at.isoformat()
+        return event
+
+
+class StabilizationTracker:
+    """
+    Rolling MQT 19 check for one execution
+
+    Keeps only the last `window` Pmax values, so each update costs O(window)
+    regardless of how many measurements came before.
+    """
+
+    def __init__(
+        self,
+        test_execution_id: int,
+        threshold: float = None,
+        window: int = None
+    ):
+        self.test_execution_id = test_execution_id
+        self.threshold = config.STABILIZATION_RELATIVE_CHANGE if threshold is None else threshold
+        self.window = window or config.STABILIZATION_WINDOW
+
+        self.values: deque = deque(maxlen=self.window)
+        self.count = 0
+        self.initial_pmax: Optional[float] = None
+        self.relative_change: Optional[float] = None
+        self.event: Optional[StabilizationEvent] = None
+
+    def update(self, pmax: float, timestamp: datetime = None) -> Optional[StabilizationEvent]:
+        """
+        Add a Pmax measurement
+
+        Failed readings (None or non-finite Pmax) are counted as
+        measurements but never enter the window.
+
+        Args:
+            pmax: Measured maximum power (W)
+            timestamp: Measurement time
+
+        Returns:
+            StabilizationEvent the first time stabilization is reached,
+            otherwise None
+        """
+        self.count += 1
+        if pmax is None or not math.isfinite(pmax):
+            return None
+
+        if self.initial_pmax is None:
+            self.initial_pmax = pmax
+
+        self.values.append(pmax)
+
+        if len(self.values) < self.window:
+            return None
+
+        mean = sum(self.values) / self.window
+        self.relative_change = (max(self.values) - min(self.values)) / mean
+
+        if self.event is not None or not (
+            math.isfinite(self.relative_change) and self.relative_change < self.threshold
+        ):
+            return None
+
+        self.event = StabilizationEvent(
+            test_execution_id=self.test_execution_id,
+            measurement_index=self.count - 1,
+            stabilized_at=timestamp,
+            pmax=mean,
+            relative_change=self.relative_change,
+            initial_pmax=self.initial_pmax,
+            degradation_pct=(1 - mean / self.initial_pmax) * 100
+        )
+        return self.event
+
+    @property
+    def is_stable(self) -> bool:
+        return self.event is not None
+
+
+class StabilizationMonitor:
+    """
+    Per-execution stabilization trackers with event callbacks
+
+    Callbacks registered with on_stabilized (e.g. a chamber controller that
+    ends the exposure) are called once per execution when it stabilizes.
+    The event is also stored in processed_data['stabilization'] and logged
+    to the audit trail.
+    """
+
+    def __init__(self):
+        self._trackers: Dict[int, StabilizationTracker] = {}
+        self._callbacks: List[Callable[[StabilizationEvent], None]] = []
+        self._lock = threading.Lock()
+
+    def on_stabilized(self, callback: Callable[[StabilizationEvent], None]):
+        """Register a callback for stabilization events"""
+        self._callbacks.append(callback)
+
+    def get_tracker(self, test_execution_id: int, before: datetime = None) -> StabilizationTracker:
+        """
+        Get the tracker of an execution, restoring it from the database
+
+        A restored tracker is seeded from the initial Pmax and the last
+        `window` stored Pmax checks only.
+
+        Args:
+            test_execution_id: Test execution ID
+            before: Only restore from checks taken before this time
+
+        Returns:
+            StabilizationTracker
+        """
+        with self._lock:
+            tracker = self._trackers.get(test_execution_id)
+            if tracker is None:
+                tracker = self._restore(test_execution_id, before)
+                self._trackers[test_execution_id] = tracker
+            return tracker
+
+    def _restore(self, test_execution_id: int, before: datetime = None) -> StabilizationTracker:
+        """Rebuild a tracker from stored Pmax checks"""
+        tracker = StabilizationTracker(test_execution_id)
+
+        try:
+            with get_db() as db:
+                series = db.query(TestData.value).filter(
+                    TestData.test_execution_id == test_execution_id,
+                    TestData.measurement_type == PMAX_MEASUREMENT_TYPE,
+                    TestData.is_valid == True
+                )
+                if before is not None:
+                    series = series.filter(TestData.timestamp < before)
+
+                # Failed readings count as measurements but stay out of the window
+                count = series.count()
+                series = series.filter(TestData.value.isnot(None))
+                first = series.order_by(TestData.timestamp.asc()).first()
+                if first is None:
+                    tracker.count = count
+                    return tracker
+
+                recent = series.order_by(TestData.timestamp.desc()).limit(tracker.window).all()
+
+                test = db.query(TestExecution.processed_data).filter(
+                    TestExecution.id == test_execution_id
+                ).first()
+                stored_event = ((test and test[0]) or {}).get('stabilization')
+
+            tracker.initial_pmax = first[0]
+            tracker.values.extend(value for value, in reversed(recent))
+            tracker.count = count
+            if len(tracker.values) == tracker.window:
+                values = tracker.values
+                tracker.relative_change = (max(values) - min(values)) / (sum(values) / len(values))
+
+            if stored_event:
+                if stored_event.get('stabilized_at'):
+                    stored_event = dict(stored_event)
+                    stored_event['stabilized_at'] = datetime.fromisoformat(stored_event['stabilized_at'])
+                tracker.event = StabilizationEvent(**stored_event)
+
+        except Exception as e:
+            print(f"Error restoring stabilization state: {e}")
+
+        return tracker
+
+    def add_measurement(
+        self,
+        test_execution_id: int,
+        pmax: float,
+        timestamp: datetime = None
+    ) -> Optional[StabilizationEvent]:
+        """
+        Feed a Pmax check of an execution
+
+        The check may already be stored in TestData; a tracker restored for
+        it only uses earlier checks.
+
+        Args:
+            test_execution_id: Test execution ID
+            pmax: Measured maximum power (W)
+            timestamp: Measurement time (defaults to now)
+
+        Returns:
+            StabilizationEvent if this measurement stabilized the execution
+        """
+        timestamp = timestamp or datetime.utcnow()
+        tracker = self.get_tracker(test_execution_id, before=timestamp)
+
+        with self._lock:
+            event = tracker.update(pmax, timestamp)
+
+        if event is not None:
+            self._emit(event)
+
+        return event
+
+    def _emit(self, event: StabilizationEvent):
+        """Persist an event and notify callbacks"""
+        record = event.to_dict()
+
+        try:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(
+                    TestExecution.id == event.test_execution_id
+                ).first()
+                if test is not None:
+                    processed = dict(test.processed_data or {})
+                    processed['stabilization'] = record
+                    test.processed_data = processed
+        except Exception as e:
+            print(f"Error saving stabilization event: {e}")
+
+        log_action(
+            user_id=None,
+            action='stabilization',
+            table_name='test_executions',
+            record_id=event.test_execution_id,
+            new_values=record,
+            summary=(
+                f"Stabilized after {event.measurement_index + 1} measurements "
+                f"({event.degradation_pct:.2f}% degradation)"
+            )
+        )
+
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in stabilization callback: {e}")
+
+    def reset(self, test_execution_id: int):
+        """Forget the tracker of an execution (e.g. after a retest)"""
+        with self._lock:
+            self._trackers.pop(test_execution_id, None)
+
+    def status(self, test_execution_id: int) -> Dict:
+        """
+        Get the current stabilization status of an execution
+
+        Returns:
+            Dictionary with measurements, relative_change, threshold,
+            stable and event
+        """
+        tracker = self.get_tracker(test_execution_id)
+        return {
+            'measurements': tracker.count,
+            'relative_change': tracker.relative_change,
+            'threshold': tracker.threshold,
+            'stable': tracker.is_stable,
+            'event': tracker.event.to_dict() if tracker.event else None
+        }
+
+
+# Global monitor instance
+_stabilization_monitor = None
+
+
+def get_stabilization_monitor() -> StabilizationMonitor:
+    """Get or create global stabilization monitor instance"""
+    global _stabilization_monitor
+    if _stabilization_monitor is None:
+        _stabilization_monitor = StabilizationMonitor()
+    return _stabilization_monitor
@@ -0,0 +1,346 @@
+"""
+Temperature Coefficients - TEMP-001 / NOCT-001 regression engine
+================================================================
+Extracts the temperature coefficients alpha (Isc), beta (Voc) and gamma
+(Pmax) from multi-temperature I-V sweeps, for one or many samples at once,
+and detects thermal stabilization of the module temperature.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from components.iv_analysis import extract_from_measurements
+from config.database import get_db
+from config.settings import config
+from database.models import TestData, TestExecution
+from utils.statistics import RollingWindow, grouped_linear_regression
+
+
+REFERENCE_TEMPERATURE = 25.0  # °C
+
+# TestData measurement types holding the module temperature log
+TEMPERATURE_LOG_TYPES = ('module_temperature', 'temperature')
+
+# Coefficient name -> I-V parameter it is regressed from
+COEFFICIENTS = {
+    'alpha_isc': 'isc',
+    'beta_voc': 'voc',
+    'gamma_pmax': 'pmax'
+}
+
+
+def fit_temperature_coefficients(
+    temperature: Sequence[float],
+    parameters: Dict[str, Sequence[float]],
+    sample_ids: Sequence[Any] = None,
+    confidence: float = 0.95
+) -> pd.DataFrame:
+    """
+    Fit temperature coefficients for one or many samples
+
+    Each parameter is regressed linearly on temperature per sample. The
+    relative coefficient is the slope divided by the fitted value at 25 °C,
+    in %/°C; its interval is the slope interval scaled the same way.
+
+    Args:
+        temperature: Module temperature per curve (°C)
+        parameters: Arrays 'isc', 'voc' and/or 'pmax' aligned with temperature
+        sample_ids: Sample identifier per curve (one sample if None)
+        confidence: Confidence level of the intervals
+
+    Returns:
+        DataFrame with one row per sample: sample, n_curves, and for each
+        coefficient its value (%/°C), '<name>_ci' half-width (%/°C),
+        '<name>_abs' slope (unit/°C), '<name>_r2' and the fitted value at
+        25 °C ('<parameter>_25')
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+
+    if sample_ids is None:
+        samples = np.array([0])
+        groups = np.zeros(len(temperature), dtype=np.intp)
+    else:
+        samples, groups = np.unique(np.asarray(sample_ids), return_inverse=True)
+
+    result = {'sample': samples}
+
+    for name, parameter in COEFFICIENTS.items():
+        if parameter not in parameters:
+            continue
+
+        fit = grouped_linear_regression(
+            temperature, parameters[parameter], groups,
+            n_groups=len(samples), confidence=confidence
+        )
+        value_25 = fit['intercept'] + fit['slope'] * REFERENCE_TEMPERATURE
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[name] = fit['slope'] / value_25 * 100
+            result[f'{name}_ci'] = fit['slope_ci'] / np.abs(value_25) * 100
+
+        result[f'{name}_abs'] = fit['slope']
+        result[f'{name}_r2'] = fit['r_squared']
+        result[f'{parameter}_25'] = value_25
+        result['n_curves'] = fit['n']
+
+    return pd.DataFrame(result)
+
+
+def normalize_to_reference(
+    values: Sequence[float],
+    temperature: Sequence[float],
+    coefficient: float,
+    reference_temperature: float = REFERENCE_TEMPERATURE
+) -> np.ndarray:
+    """
+    Correct values to the reference temperature with a relative coefficient
+
+    Args:
+        values: Measured values
+        temperature: Module temperature per value (°C)
+        coefficient: Relative temperature coefficient (%/°C)
+        reference_temperature: Target temperature (°C)
+
+    Returns:
+        Values at the reference temperature
+    """
+    delta = np.asarray(temperature, dtype=np.float64) - reference_temperature
+    return np.asarray(values, dtype=np.float64) / (1 + coefficient / 100 * delta)
+
+
+def stability_mask(
+    timestamps: Sequence,
+    temperature: Sequence[float],
+    window_seconds: float = None,
+    max_range: float = None
+) -> np.ndarray:
+    """
+    Flag samples taken while the temperature was stable
+
+    A sample is stable when the temperature range over the preceding window
+    (including the sample) is within max_range and the series is at least
+    one window long at that sample.
+
+    Args:
+        timestamps: Sample timestamps (ascending)
+        temperature: Temperature per sample (°C)
+        window_seconds: Stabilization window length
+        max_range: Maximum temperature range within the window (°C)
+
+    Returns:
+        Boolean array
+    """
+    window_seconds = window_seconds or config.TEMPCO_STABILITY_WINDOW_SECONDS
+    max_range = config.TEMPCO_STABILITY_MAX_RANGE if max_range is None else max_range
+
+    index = pd.DatetimeIndex(pd.to_datetime(pd.Series(timestamps)))
+    series = pd.Series(np.asarray(temperature, dtype=np.float64), index=index)
+    window = series.rolling(pd.Timedelta(seconds=window_seconds), closed='both')
+
+    temperature_range = (window.max() - window.min()).to_numpy()
+    elapsed = (index - index[0]).total_seconds().to_numpy() if len(index) else np.array([])
+
+    return (temperature_range <= max_range) & (elapsed >= window_seconds)
+
+
+class ThermalStabilityDetector:
+    """
+    Streaming thermal stabilization detector
+
+    Feed temperature readings as they arrive; stability is reported once the
+    temperature range over the last window stays within max_range.
+    """
+
+    def __init__(self, window_seconds: float = None, max_range: float = None):
+        self.window_seconds = window_seconds or config.TEMPCO_STABILITY_WINDOW_SECONDS
+        self.max_range = config.TEMPCO_STABILITY_MAX_RANGE if max_range is None else max_range
+        self.window = RollingWindow(self.window_seconds)
+        self.stable_since: Optional[datetime] = None
+        self._first_time: Optional[datetime] = None
+        self._last_time: Optional[datetime] = None
+
+    def update(self, timestamp: datetime, temperature: float) -> bool:
+        """
+        Add a reading
+
+        Args:
+            timestamp: Reading time
+            temperature: Temperature (°C)
+
+        Returns:
+            True if the temperature is currently stable
+        """
+        self.window.push(timestamp.timestamp(), temperature)
+        self._first_time = self._first_time or timestamp
+        self._last_time = timestamp
+
+        stable = self.is_stable
+        if stable and self.stable_since is None:
+            self.stable_since = timestamp
+        elif not stable:
+            self.stable_since = None
+
+        return stable
+
+    @property
+    def is_stable(self) -> bool:
+        """Whether a full window of readings is within the allowed range"""
+        if self._last_time is None:
+            return False
+        return (
+            (self._last_time - self._first_time).total_seconds() >= self.window_seconds and
+            self.window.range <= self.max_range
+        )
+
+    @property
+    def stable_seconds(self) -> float:
+        """How long the temperature has been stable"""
+        if self.stable_since is None:
+            return 0.0
+        return (self._last_time - self.stable_since).total_seconds()
+
+
+def analyze_measurements(
+    measurements: List[Dict[str, Any]],
+    require_stable: bool = True,
+    temperature_log: tuple = None
+) -> pd.DataFrame:
+    """
+    Fit temperature coefficients from measurement dictionaries
+
+    Each measurement holds 'temperature' and either 'isc'/'voc'/'pmax' or
+    'voltage'/'current' arrays; optional 'timestamp' and 'stable' feed the
+    stability filter and optional 'sample_id' fits several samples at once.
+
+    Stability is judged on the temperature log when one is given and every
+    curve has a timestamp (a curve is stable if the log was stable at its
+    timestamp). Without a log, only curves whose own 'stable' flag (set by
+    the acquisition once the chamber settled) is False are rejected; the
+    curve temperatures themselves are a staircase of set points and say
+    nothing about stabilisation.
+
+    Args:
+        measurements: Measurement dictionaries
+        require_stable: Only use curves taken at a stable temperature
+        temperature_log: Optional (timestamps, temperatures) of the chamber log
+
+    Returns:
+        DataFrame as returned by fit_temperature_coefficients, with an extra
+        'n_excluded' column counting curves rejected as unstable
+    """
+    n = len(measurements)
+    temperature = np.array([m.get('temperature', np.nan) for m in measurements], dtype=np.float64)
+
+    parameters = {}
+    for parameter in COEFFICIENTS.values():
+        parameters[parameter] = np.array(
+            [m.get(parameter, np.nan) for m in measurements], dtype=np.float64
+        )
+
+    # Extract the parameters of curves that only carry raw I-V data
+    needs_curve = ~np.isfinite(parameters['pmax'])
+    if needs_curve.any():
+        extracted = extract_from_measurements(
+            [m for m, needed in zip(measurements, needs_curve) if needed]
+        )
+        for parameter in parameters:
+            parameters[parameter][needs_curve] = extracted[parameter]
+
+    sample_ids = None
+    if any('sample_id' in m for m in measurements):
+        sample_ids = np.array([str(m.get('sample_id', '')) for m in measurements])
+
+    used = np.ones(n, dtype=bool)
+    if require_stable and n:
+        has_log = temperature_log is not None and len(temperature_log[0])
+        if has_log and all(m.get('timestamp') is not None for m in measurements):
+            times = pd.to_datetime(pd.Series([m['timestamp'] for m in measurements])).to_numpy()
+            log_times = pd.to_datetime(pd.Series(temperature_log[0])).to_numpy()
+            log_stable = stability_mask(log_times, temperature_log[1])
+            position = np.searchsorted(log_times, times, side='right') - 1
+            used = (position >= 0) & log_stable[np.maximum(position, 0)]
+        else:
+            used = np.array([m.get('stable') is not False for m in measurements])
+
+    return _fit_used(temperature, parameters, sample_ids, used)
+
+
+def _fit_used(
+    temperature: np.ndarray,
+    parameters: Dict[str, np.ndarray],
+    sample_ids: Optional[np.ndarray],
+    used: np.ndarray
+) -> pd.DataFrame:
+    """Fit the curves selected by used and count the excluded ones"""
+    result = fit_temperature_coefficients(
+        temperature[used],
+        {parameter: values[used] for parameter, values in parameters.items()},
+        sample_ids[used] if sample_ids is not None else None
+    )
+
+    if sample_ids is None:
+        result['n_excluded'] = int(np.sum(~used))
+    else:
+        excluded = pd.Series(~used).groupby(sample_ids).sum()
+        result['n_excluded'] = excluded.reindex(result['sample']).fillna(0).astype(int).to_numpy()
+
+    return result
+
+
+def analyze_execution(
+    test_execution_id: int,
+    require_stable: bool = True,
+    save: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Fit temperature coefficients of a TEMP-001/NOCT-001 execution
+
+    Measurements are read from raw_data['measurements'] and the module
+    temperature log from TestData; results are stored in
+    processed_data['temperature_coefficients'].
+
+    Args:
+        test_execution_id: Test execution ID
+        require_stable: Only use curves taken at a stable temperature
+        save: Write the results back to the execution
+
+    Returns:
+        DataFrame of coefficients, or None on error
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(
+                TestExecution.id == test_execution_id
+            ).first()
+
+            if not test or not test.raw_data:
+                return None
+
+            log = db.query(TestData.timestamp, TestData.value).filter(
+                TestData.test_execution_id == test_execution_id,
+                TestData.measurement_type.in_(TEMPERATURE_LOG_TYPES),
+                TestData.is_valid == True
+            ).order_by(TestData.timestamp).all()
+
+            result = analyze_measurements(
+                test.raw_data.get('measurements', []),
+                require_stable,
+                temperature_log=tuple(zip(*log)) if log else None
+            )
+
+            if save:
+                records = result.replace({np.nan: None}).to_dict('records')
+                processed = dict(test.processed_data or {})
+                processed['temperature_coefficients'] = (
+                    records[0] if len(records) == 1 else records
+                )
+                test.processed_data = processed
+
+        return result
+
+    except Exception as e:
+        print(f"Error analyzing temperature coefficients: {e}")
+        return None
@@ -0,0 +1,403 @@
+"""
+Thermal Cycling Analyzer - TC-001 chamber log segmentation (IEC 61215-2 MQT 11)
+===============================================================================
+Splits a chamber temperature log into cycles and computes per-cycle dwell
+times, ramp rates and out-of-tolerance excursions against the TC-001
+template parameters, with whole-array NumPy operations.
+
+Chamber logs can be stored as ``.npy`` files, which are memory-mapped
+rather than read into memory. A log is either a 2D float array with the
+columns (time in seconds, temperature in °C[, current in A]) or a
+structured array with fields 'time', 'temperature' and optionally 'current'.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from components.visualizations import create_time_series_chart
+from config.database import get_db
+from config.protocols_registry import get_template_parameter
+from config.settings import config
+from database.models import TestData, TestExecution
+from utils.statistics import rolling_slope
+
+
+PROTOCOL_ID = "TC-001"
+
+
+def load_chamber_log(path: Path) -> Dict[str, np.ndarray]:
+    """
+    Open a chamber log without reading it into memory
+
+    Args:
+        path: .npy file (memory-mapped) or .csv file with columns
+            time, temperature[, current]
+
+    Returns:
+        Dictionary of arrays 'time' (s), 'temperature' (°C) and optionally
+        'current' (A); .npy columns are views into the memory map
+    """
+    path = Path(path)
+
+    if path.suffix == '.csv':
+        df = pd.read_csv(path)
+        return {column: df[column].to_numpy(np.float64) for column in df.columns
+                if column in ('time', 'temperature', 'current')}
+
+    data = np.load(path, mmap_mode='r')
+
+    if data.dtype.names:
+        return {name: data[name] for name in ('time', 'temperature', 'current')
+                if name in data.dtype.names}
+
+    log = {'time': data[:, 0], 'temperature': data[:, 1]}
+    if data.shape[1] > 2:
+        log['current'] = data[:, 2]
+    return log
+
+
+def _profile_parameters(overrides: Dict[str, Any] = None) -> Dict[str, float]:
+    """TC-001 profile limits from template defaults and overrides"""
+    overrides = overrides or {}
+
+    def parameter(name):
+        value = overrides.get(name)
+        return value if value is not None else get_template_parameter(PROTOCOL_ID, name)
+
+    return {
+        'temp_min': float(parameter('temp_min')),
+        'temp_max': float(parameter('temp_max')),
+        'dwell_time': float(parameter('dwell_time')),  # minutes
+        'number_of_cycles': int(parameter('number_of_cycles') or 0),
+        'tolerance': float(overrides.get('tolerance', config.TC_TEMPERATURE_TOLERANCE)),
+        'max_ramp_rate': float(overrides.get('max_ramp_rate', config.TC_MAX_RAMP_RATE))
+    }
+
+
+def _runs(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Run-length encode an array into (run start indices, run values)"""
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return starts, values[starts]
+
+
+def segment_cycles(
+    time_s: np.ndarray,
+    temperature: np.ndarray,
+    current: np.ndarray = None,
+    parameters: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """
+    Segment a thermal cycling log and check each cycle
+
+    Samples within the tolerance of temp_max/temp_min are in the hot/cold
+    band. A cycle starts when the hot band is entered after the cold band
+    was last visited, so noise at a band edge does not split cycles. The
+    last cycle ends when its cold dwell ends, or at the end of the log if
+    the chamber is still in the cold band.
+
+    Args:
+        time_s: Sample times in seconds (ascending)
+        temperature: Chamber/module temperature (°C)
+        current: Optional injected current (A)
+        parameters: Overrides of temp_min, temp_max, dwell_time (minutes),
+            tolerance (°C) and max_ramp_rate (°C/h)
+
+    Returns:
+        Dictionary with 'cycles' (DataFrame, one row per complete cycle),
+        'excursions' (DataFrame, one row per out-of-tolerance run),
+        'parameters' and 'summary'
+    """
+    p = _profile_parameters(parameters)
+    t = np.asarray(time_s, dtype=np.float64)
+    T = np.asarray(temperature, dtype=np.float64)
+    n = len(T)
+
+    # Duration represented by each sample (to the next sample)
+    dt = np.empty(n)
+    dt[:-1] = np.diff(t)
+    dt[-1:] = 0.0
+
+    hot = T >= p['temp_max'] - p['tolerance']
+    cold = T <= p['temp_min'] + p['tolerance']
+    state = hot.astype(np.int8) - cold.astype(np.int8)
+
+    # Last band visited at each sample (forward fill of non-zero states)
+    last_index = np.maximum.accumulate(np.where(state != 0, np.arange(n), 0))
+    last_band = state[last_index]
+
+    boundaries = np.flatnonzero((last_band[1:] == 1) & (last_band[:-1] != 1)) + 1
+
+    # Close the last cycle after its cold dwell (or at the end of the log)
+    if len(boundaries):
+        tail_cold = np.flatnonzero(cold[boundaries[-1]:])
+        if len(tail_cold):
+            boundaries = np.append(boundaries, boundaries[-1] + tail_cold[-1] + 1)
+    n_cycles = max(len(boundaries) - 1, 0)
+
+    # Excursions beyond the tolerance of either extreme
+    deviation = np.maximum(
+        T - (p['temp_max'] + p['tolerance']),
+        (p['temp_min'] - p['tolerance']) - T
+    )
+    out = deviation > 0
+    run_starts, run_values = _runs(out) if n else (np.array([], dtype=np.intp), np.array([], dtype=bool))
+    excursion_starts = run_starts[run_values]
+    excursion_ends = np.append(run_starts[1:], n)[run_values]
+
+    if len(excursion_starts):
+        excursion_seconds = np.add.reduceat(dt * out, excursion_starts)
+        excursion_peak = np.maximum.reduceat(deviation, excursion_starts)
+    else:
+        excursion_seconds = excursion_peak = np.array([])
+
+    excursions = pd.DataFrame({
+        'start_time': t[excursion_starts],
+        'end_time': t[np.maximum(excursion_ends - 1, 0)] if len(excursion_ends) else np.array([]),
+        'duration_seconds': excursion_seconds,
+        'peak_deviation': excursion_peak,
+        # 1-based cycle number; 0 before the first cycle, n + 1 after the last
+        'cycle': np.searchsorted(boundaries, excursion_starts, side='right')
+    })
+
+    cycles = pd.DataFrame()
+    if n_cycles:
+        def per_cycle(ufunc, values):
+            # The padding keeps the last boundary (possibly n) a valid index;
+            # reduceat's last segment is whatever follows the last cycle
+            return ufunc.reduceat(np.append(values, values[:1]), boundaries)[:n_cycles]
+
+        start_t = t[boundaries[:-1]]
+        end_t = t[np.minimum(boundaries[1:], n - 1)]
+
+        # Ramp rate (°C/h): least-squares slope over the trailing window,
+        # fitted per cycle (plus one window before it) to keep the time
+        # offsets of the running sums small on long logs
+        window = config.TC_RAMP_WINDOW_SECONDS
+        ramp = np.full(n, np.nan)
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            first = np.searchsorted(t, t[start] - window)
+            fit = rolling_slope(t[first:end], T[first:end], window)
+            full = fit['span'] >= window * 0.9
+            ramp[start:end] = np.where(full, fit['slope'] * 3600, np.nan)[start - first:]
+
+        # Ramp rates from the transitions between the bands
+        starts, values = _runs(state)
+        previous = np.r_[0, values[:-1]]
+        following = np.r_[values[1:], 0]
+        ends = np.append(starts[1:], n) - 1
+        transition = (values == 0) & (previous != 0) & (following != 0) & (previous != following)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            run_rate = (T[ends] - T[starts]) / (t[ends] - t[starts]) * 3600
+        run_cycle = np.searchsorted(boundaries, starts, side='right') - 1
+        in_range = transition & (run_cycle >= 0) & (run_cycle < n_cycles)
+
+        def mean_rate(selected):
+            cycle = run_cycle[selected]
+            counts = np.bincount(cycle, minlength=n_cycles)
+            with np.errstate(invalid='ignore'):
+                return np.bincount(cycle, weights=run_rate[selected], minlength=n_cycles) / counts
+
+        heating_rate = mean_rate(in_range & (following == 1))
+        cooling_rate = mean_rate(in_range & (following == -1))
+
+        cycles = pd.DataFrame({
+            'cycle': np.arange(1, n_cycles + 1),
+            'start_time': start_t,
+            'duration_hours': (end_t - start_t) / 3600,
+            'min_temperature': per_cycle(np.minimum, T),
+            'max_temperature': per_cycle(np.maximum, T),
+            'dwell_hot_minutes': per_cycle(np.add, dt * hot) / 60,
+            'dwell_cold_minutes': per_cycle(np.add, dt * cold) / 60,
+            'heating_rate': heating_rate,
+            'cooling_rate': cooling_rate,
+            'peak_ramp_rate': per_cycle(np.fmax, np.abs(ramp)),
+            'excursion_count': np.bincount(
+                excursions['cycle'][excursions['cycle'].between(1, n_cycles)] - 1,
+                minlength=n_cycles
+            ),
+            'excursion_seconds': per_cycle(np.add, dt * out)
+        })
+
+        if current is not None:
+            heating = state == 0
+            current = np.asarray(current, dtype=np.float64)
+            with np.errstate(invalid='ignore'):
+                cycles['mean_heating_current'] = (
+                    per_cycle(np.add, current * dt * heating) / per_cycle(np.add, dt * heating)
+                )
+
+        cycles['compliant'] = (
+            (cycles['min_temperature'] <= p['temp_min'] + p['tolerance']) &
+            (cycles['max_temperature'] >= p['temp_max'] - p['tolerance']) &
+            (cycles['dwell_hot_minutes'] >= p['dwell_time']) &
+            (cycles['dwell_cold_minutes'] >= p['dwell_time']) &
+            (cycles['peak_ramp_rate'] <= p['max_ramp_rate']) &
+            (cycles['excursion_count'] == 0)
+        )
+
+    summary = {
+        'samples': n,
+        'cycles_completed': n_cycles,
+        'cycles_required': p['number_of_cycles'],
+        'cycles_compliant': int(cycles['compliant'].sum()) if n_cycles else 0,
+        'excursions': len(excursions),
+        'excursion_seconds': float(excursions['duration_seconds'].sum()) if len(excursions) else 0.0,
+        'max_peak_ramp_rate': float(cycles['peak_ramp_rate'].max()) if n_cycles else None,
+        'min_dwell_minutes': float(
+            cycles[['dwell_hot_minutes', 'dwell_cold_minutes']].min().min()
+        ) if n_cycles else None
+    }
+    summary['passed'] = bool(
+        n_cycles >= p['number_of_cycles'] and
+        summary['cycles_compliant'] == n_cycles
+    )
+
+    return {'cycles': cycles, 'excursions': excursions, 'parameters': p, 'summary': summary}
+
+
+def analyze_execution_log(
+    test_execution_id: int,
+    log_path: Path = None,
+    save: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyze the chamber log of a TC-001 execution
+
+    The log is taken from log_path, else raw_data['chamber_log'] (a file
+    path), else the TestData 'temperature' series. Profile parameters come
+    from input_data, falling back to the template.
+
+    Args:
+        test_execution_id: Test execution ID
+        log_path: Explicit chamber log file
+        save: Store summary and per-cycle table in processed_data['thermal_cycling']
+
+    Returns:
+        Result of segment_cycles, or None on error
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(
+                TestExecution.id == test_execution_id
+            ).first()
+            if test is None:
+                return None
+
+            inputs = test.input_data or {}
+            log_path = log_path or (test.raw_data or {}).get('chamber_log')
+
+            if log_path is None:
+                rows = db.query(TestData.timestamp, TestData.value).filter(
+                    TestData.test_execution_id == test_execution_id,
+                    TestData.measurement_type == 'temperature',
+                    TestData.is_valid == True
+                ).order_by(TestData.timestamp).all()
+
+        if log_path is not None:
+            log = load_chamber_log(log_path)
+        else:
+            if not rows:
+                return None
+            timestamps, values = zip(*rows)
+            seconds = pd.to_datetime(pd.Series(timestamps)).to_numpy('datetime64[ns]').astype(np.int64) / 1e9
+            log = {'time': seconds, 'temperature': np.asarray(values, dtype=np.float64)}
+
+        result = segment_cycles(
+            log['time'], log['temperature'], log.get('current'), parameters=inputs
+        )
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(
+                    TestExecution.id == test_execution_id
+                ).first()
+                processed = dict(test.processed_data or {})
+                processed['thermal_cycling'] = {
+                    'summary': result['summary'],
+                    'cycles': result['cycles'].replace({np.nan: None}).to_dict('list'),
+                    'excursions': result['excursions'].to_dict('records')
+                }
+                test.processed_data = processed
+
+        return result
+
+    except Exception as e:
+        print(f"Error analyzing thermal cycling log: {e}")
+        return None
+
+
+def create_thermal_profile_chart(
+    time_s: np.ndarray,
+    temperature: np.ndarray,
+    parameters: Dict[str, Any] = None,
+    title: str = "Thermal Cycling Profile"
+) -> go.Figure:
+    """
+    Create thermal profile chart with the hot and cold tolerance bands
+
+    Args:
+        time_s: Sample times in seconds
+        temperature: Temperature (°C)
+        parameters: Profile overrides (see segment_cycles)
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    p = _profile_parameters(parameters)
+    hours = np.asarray(time_s, dtype=np.float64)
+    hours = (hours - hours[0]) / 3600 if len(hours) else hours
+
+    fig = create_time_series_chart(hours, temperature, title, "Temperature (°C)")
+    fig.update_xaxes(title_text="Time (h)")
+
+    for extreme in (p['temp_min'], p['temp_max']):
+        fig.add_hrect(
+            y0=extreme - p['tolerance'],
+            y1=extreme + p['tolerance'],
+            fillcolor='rgba(0, 128, 0, 0.1)',
+            line_width=0,
+            layer='below'
+        )
+
+    return fig
+
+
+def create_cycle_statistics_chart(cycles: pd.DataFrame, title: str = "Cycle Statistics") -> go.Figure:
+    """
+    Create per-cycle dwell time and ramp rate chart
+
+    Args:
+        cycles: Per-cycle table from segment_cycles
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    fig = go.Figure()
+
+    for column, name in [('dwell_hot_minutes', 'Hot Dwell (min)'), ('dwell_cold_minutes', 'Cold Dwell (min)')]:
+        fig.add_trace(go.Scatter(
+            x=cycles['cycle'], y=cycles[column], mode='lines+markers', name=name
+        ))
+
+    fig.add_trace(go.Scatter(
+        x=cycles['cycle'], y=cycles['peak_ramp_rate'], mode='lines+markers',
+        name='Peak Ramp Rate (°C/h)', yaxis='y2'
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Cycle",
+        yaxis=dict(title="Dwell Time (min)"),
+        yaxis2=dict(title="Ramp Rate (°C/h)", overlaying='y', side='right'),
+        hovermode='x unified',
+        template='plotly_white'
+    )
+
+    return fig
@@ -0,0 +1,270 @@
+"""
+Thumbnails - WebP derivatives of inspection and test photos
+===========================================================
+Thumbnail and preview renditions of photos are kept in a size-bounded,
+content-addressed disk cache, so pages can show photo galleries without
+sending multi-megabyte originals to the browser.
+
+Derivatives are created lazily on first request, or eagerly when photos
+are uploaded by a background thread pool. All sizes of a photo are
+rendered from a single decode.
+"""
+
+import atexit
+import io
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from config.settings import config, DATA_DIR, UPLOAD_DIR
+from utils.cache import ContentAddressedStore, LRUCache, content_hash, file_hash
+
+
+THUMBNAIL_DIR = DATA_DIR / "thumbnails"
+PHOTO_UPLOAD_DIR = UPLOAD_DIR / "photos"
+
+_thumbnail_store = None
+_source_hashes = None
+_executor = None
+
+
+def get_thumbnail_store() -> ContentAddressedStore:
+    """Get or create the global thumbnail store"""
+    global _thumbnail_store
+    if _thumbnail_store is None:
+        _thumbnail_store = ContentAddressedStore(
+            THUMBNAIL_DIR,
+            max_bytes=config.THUMBNAIL_CACHE_MAX_MB * 1024 * 1024,
+            suffix='.webp'
+        )
+    return _thumbnail_store
+
+
+def derivative_sizes() -> Dict[str, int]:
+    """Longest side in pixels of each derivative"""
+    return {'preview': config.PREVIEW_SIZE, 'thumbnail': config.THUMBNAIL_SIZE}
+
+
+def photo_hash(path: Path) -> str:
+    """
+    Content hash of a photo, memoized by path, size and modification time
+
+    Args:
+        path: Photo file
+
+    Returns:
+        SHA-256 hex digest of the file contents
+    """
+    global _source_hashes
+    if _source_hashes is None:
+        _source_hashes = LRUCache(max_items=config.THUMBNAIL_HASH_CACHE_ITEMS)
+
+    stat = Path(path).stat()
+    key = f"{Path(path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = _source_hashes.get(key)
+    if digest is None:
+        digest = file_hash(path)
+        _source_hashes.put(key, digest)
+    return digest
+
+
+def thumbnail_key(source_hash: str, max_side: int) -> str:
+    """Store key of a derivative of a source file"""
+    return content_hash('thumbnail', source_hash, max_side, config.THUMBNAIL_QUALITY)
+
+
+def render_webp(img, max_side: int) -> bytes:
+    """
+    Render a PIL image as a WebP no larger than max_side on either axis
+
+    Args:
+        img: PIL image (already orientation-corrected)
+        max_side: Longest side in pixels
+
+    Returns:
+        WebP bytes
+    """
+    derivative = img.copy()
+    derivative.thumbnail((max_side, max_side))
+    if derivative.mode not in ('RGB', 'RGBA', 'L'):
+        derivative = derivative.convert('RGB')
+
+    buffer = io.BytesIO()
+    derivative.save(buffer, format='WEBP', quality=config.THUMBNAIL_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def open_photo(path: Path, max_side: int = None):
+    """
+    Open a photo upright, decoding JPEGs at reduced scale where possible
+
+    Args:
+        path: Photo file
+        max_side: Size the image will be reduced to (enables JPEG draft mode)
+
+    Returns:
+        PIL image
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img:
+        if max_side:
+            img.draft('RGB', (max_side, max_side))
+        return ImageOps.exif_transpose(img)
+
+
+def create_derivatives(path: Path, digest: str = None) -> Dict[str, Path]:
+    """
+    Render and store every derivative size of a photo from one decode
+
+    Sizes already in the store are not rendered again.
+
+    Args:
+        path: Photo file
+        digest: Content hash of the photo if already known
+
+    Returns:
+        Dictionary of size name -> stored WebP path
+    """
+    store = get_thumbnail_store()
+    digest = digest or photo_hash(path)
+    sizes = derivative_sizes()
+
+    keys = {name: thumbnail_key(digest, side) for name, side in sizes.items()}
+    missing = [name for name, key in keys.items() if key not in store]
+
+    if missing:
+        largest = max(sizes[name] for name in missing)
+        with open_photo(path, largest) as img:
+            # Largest first, so each smaller size is reduced from the previous one
+            for name in sorted(missing, key=sizes.get, reverse=True):
+                img.thumbnail((sizes[name], sizes[name]))
+                store.put(keys[name], render_webp(img, sizes[name]))
+
+    return {name: store.path_for(key) for name, key in keys.items()}
+
+
+def get_derivative(path: Path, size: str = 'thumbnail') -> Optional[Path]:
+    """
+    Get a derivative of a photo, creating all sizes on first request
+
+    Args:
+        path: Photo file
+        size: 'thumbnail' or 'preview'
+
+    Returns:
+        Path of the WebP file, or None if the photo cannot be read
+    """
+    try:
+        digest = photo_hash(path)
+        key = thumbnail_key(digest, derivative_sizes()[size])
+        store = get_thumbnail_store()
+        if key in store:
+            return store.path_for(key)
+
+        return create_derivatives(path, digest)[size]
+    except Exception as e:
+        print(f"Error creating {size} for {Path(path).name}: {e}")
+        return None
+
+
+def get_thumbnail(path: Path, max_side: int = None, source_hash: str = None) -> Optional[Path]:
+    """
+    Get a thumbnail of a photo at any size, creating it on first request
+
+    Args:
+        path: Photo file
+        max_side: Longest side in pixels (defaults to THUMBNAIL_SIZE)
+        source_hash: Content hash of the photo if already known
+
+    Returns:
+        Path of the WebP thumbnail, or None if the photo cannot be read
+    """
+    max_side = max_side or config.THUMBNAIL_SIZE
+    store = get_thumbnail_store()
+
+    try:
+        key = thumbnail_key(source_hash or photo_hash(path), max_side)
+        if key in store:
+            return store.path_for(key)
+
+        with open_photo(path, max_side) as img:
+            return store.put(key, render_webp(img, max_side))
+    except Exception as e:
+        print(f"Error creating thumbnail: {e}")
+        return None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get or create the background derivative pool"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def queue_derivatives(paths: Sequence[Path]) -> List[Future]:
+    """
+    Create derivatives of photos in the background
+
+    Pillow releases the GIL while decoding and encoding, so a thread pool
+    renders several photos in parallel without blocking the page.
+
+    Args:
+        paths: Photo files
+
+    Returns:
+        One future per photo resolving to its derivative paths (empty on error)
+    """
+    def create(path):
+        try:
+            return create_derivatives(path)
+        except Exception as e:
+            print(f"Error creating derivatives for {Path(path).name}: {e}")
+            return {}
+
+    executor = _get_executor()
+    return [executor.submit(create, path) for path in paths]
+
+
+def get_gallery(paths: Sequence[Path], size: str = 'thumbnail') -> List[Optional[Path]]:
+    """
+    Get derivatives of many photos, rendering missing ones in parallel
+
+    Args:
+        paths: Photo files
+        size: 'thumbnail' or 'preview'
+
+    Returns:
+        Derivative path per photo (None for unreadable photos)
+    """
+    return list(_get_executor().map(lambda path: get_derivative(path, size), paths))
+
+
+def save_uploaded_photos(uploaded_files: Sequence, folder: str) -> List[str]:
+    """
+    Save uploaded photos and queue their derivatives
+
+    Args:
+        uploaded_files: Streamlit UploadedFile objects
+        folder: Subfolder of the photo upload directory (e.g. inspection number)
+
+    Returns:
+        Saved file paths, for IncomingInspection.photos / TestExecution.photos
+    """
+    directory = PHOTO_UPLOAD_DIR / re.sub(r'[^A-Za-z0-9_.-]', '_', folder)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for uploaded in uploaded_files:
+        path = directory / re.sub(r'[^A-Za-z0-9_.-]', '_', Path(uploaded.name).name)
+        path.write_bytes(uploaded.getvalue())
+        paths.append(path)
+
+    queue_derivatives(paths)
+    return [str(path) for path in paths]
@@ -0,0 +1,476 @@
+"""
+Tracker Analytics - Streaming tracking accuracy and gain for TRACK-001/CONC-001
+===============================================================================
+Reads long outdoor logs of tracked and fixed reference systems chunk by
+chunk and keeps only running totals: an online histogram of the tracking
+error, trapezoidal energy integrals of the tracked and fixed outputs (in
+total and per day) and, for concentrators, DNI-filtered performance sums.
+Months of 1-second data are processed with the memory of one chunk.
+
+Logs are CSV files with a header row; columns other than the time are
+optional and each enables the results that need it:
+
+    timestamp (or time)            Sample time
+    tracking_error                 Pointing error (°), or else
+    sun_azimuth, sun_elevation,    Sun and tracker normal directions (°)
+    tracker_azimuth, tracker_elevation
+    power_tracked, power_fixed     Output of the tracked and fixed references (W)
+    dni                            Direct normal irradiance (W/m²)
+
+Tracking error is only evaluated while the sun is above the horizon (when
+sun_elevation is logged). Intervals longer than TRACK_MAX_GAP_SECONDS are
+not integrated.
+
+Daily energies are split at local midnight. With a site UTC offset
+configured, naive timestamps are taken as UTC and all times are shifted
+by the offset; otherwise the wall-clock date written in the log is used
+(naive timestamps as-is, timezone-aware ones in their own zone).
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config.database import get_db
+from config.settings import config
+from database.models import TestExecution
+
+
+TIME_COLUMNS = ('timestamp', 'time')
+ANGLE_COLUMNS = ('sun_azimuth', 'sun_elevation', 'tracker_azimuth', 'tracker_elevation')
+VALUE_COLUMNS = ('tracking_error', *ANGLE_COLUMNS, 'power_tracked', 'power_fixed', 'dni')
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86400 * NS_PER_SECOND
+JOULES_PER_KWH = 3.6e6
+
+# Percentiles of the tracking error reported in the summary
+ERROR_PERCENTILES = (50, 95, 99)
+
+
+def tracking_error(
+    sun_azimuth: np.ndarray,
+    sun_elevation: np.ndarray,
+    tracker_azimuth: np.ndarray,
+    tracker_elevation: np.ndarray
+) -> np.ndarray:
+    """
+    Angle between the sun direction and the tracker normal
+
+    Args:
+        sun_azimuth: Sun azimuth (°)
+        sun_elevation: Sun elevation (°)
+        tracker_azimuth: Azimuth of the tracker normal (°)
+        tracker_elevation: Elevation of the tracker normal (°)
+
+    Returns:
+        Tracking error (°)
+    """
+    sun_el, tracker_el = np.radians(sun_elevation), np.radians(tracker_elevation)
+    cos_error = (
+        np.sin(sun_el) * np.sin(tracker_el)
+        + np.cos(sun_el) * np.cos(tracker_el) * np.cos(np.radians(sun_azimuth - tracker_azimuth))
+    )
+    return np.degrees(np.arccos(np.clip(cos_error, -1, 1)))
+
+
+def histogram_percentile(edges: np.ndarray, counts: np.ndarray, overflow: float, q: float) -> float:
+    """
+    Percentile of a histogram, interpolated linearly within the bin
+
+    Args:
+        edges: Bin edges
+        counts: Count per bin
+        overflow: Count above the last edge
+        q: Percentile (0-100)
+
+    Returns:
+        Percentile value, inf if it falls in the overflow, NaN if empty
+    """
+    total = counts.sum() + overflow
+    if total == 0:
+        return float('nan')
+
+    target = q / 100 * total
+    cumulative = np.cumsum(counts)
+    if target > cumulative[-1]:
+        return float('inf')
+
+    index = int(np.searchsorted(cumulative, target))
+    before = cumulative[index - 1] if index else 0.0
+    fraction = (target - before) / counts[index] if counts[index] else 0.0
+    return float(edges[index] + fraction * (edges[index + 1] - edges[index]))
+
+
+class TrackingAnalyzer:
+    """
+    Incremental tracker log analyzer
+
+    Feed log chunks in time order with process(). The last sample of each
+    chunk is carried over so integrals join seamlessly across chunks and
+    files; samples not later than it are skipped.
+    """
+
+    def __init__(
+        self,
+        accuracy_limit: float = None,
+        acceptance_angle: float = None,
+        max_gap_seconds: float = None,
+        utc_offset_hours: float = None
+    ):
+        """
+        Args:
+            accuracy_limit: Allowed 95th percentile tracking error (°)
+            acceptance_angle: CPV acceptance half-angle (°)
+            max_gap_seconds: Longer intervals are not integrated
+            utc_offset_hours: Site offset from UTC for daily energy dates
+                (defaults to config; None uses the log's wall-clock dates)
+        """
+        self.accuracy_limit = accuracy_limit or config.TRACK_ACCURACY_LIMIT
+        self.acceptance_angle = acceptance_angle or config.CONC_ACCEPTANCE_ANGLE
+        self.max_gap_ns = int((max_gap_seconds or config.TRACK_MAX_GAP_SECONDS) * NS_PER_SECOND)
+        if utc_offset_hours is None:
+            utc_offset_hours = config.TRACK_UTC_OFFSET_HOURS
+        self.utc_offset_ns = None if utc_offset_hours is None else int(utc_offset_hours * 3600 * NS_PER_SECOND)
+
+        self.edges = np.arange(0, config.TRACK_ERROR_MAX_DEG + config.TRACK_ERROR_BIN_DEG,
+                               config.TRACK_ERROR_BIN_DEG)
+        self.counts = np.zeros(len(self.edges) - 1)
+        self.overflow = 0.0
+        self.error_sum = 0.0
+        self.error_sq_sum = 0.0
+        self.error_max = 0.0
+        self.within_acceptance = 0.0
+
+        self.samples = 0
+        self.first_ns: Optional[int] = None
+        self.last: Optional[Dict[str, float]] = None  # Last sample (time, local time and values)
+        self.integrated_seconds = 0.0
+        self.gap_seconds = 0.0
+
+        self.energy = {'power_tracked': 0.0, 'power_fixed': 0.0, 'dni': 0.0}  # J (J/m² for dni)
+        self.daily: Dict[int, np.ndarray] = {}  # Local day number -> [tracked, fixed] J
+
+        self.cpv_seconds = 0.0
+        self.cpv_energy = 0.0  # J while DNI >= CONC_MIN_DNI
+        self.cpv_dni = 0.0  # J/m² while DNI >= CONC_MIN_DNI
+
+    def process(self, chunk: pd.DataFrame):
+        """
+        Fold a chunk of log rows into the running totals
+
+        Args:
+            chunk: Log rows with a time column and any of VALUE_COLUMNS
+        """
+        time_column = next((column for column in TIME_COLUMNS if column in chunk.columns), None)
+        if time_column is None:
+            raise ValueError(f"Tracker log needs a {' or '.join(TIME_COLUMNS)} column")
+
+        parsed = pd.to_datetime(chunk[time_column])
+        times = parsed.to_numpy('datetime64[ns]').astype(np.int64)  # UTC when timezone-aware
+        if self.utc_offset_ns is not None:
+            local_times = times + self.utc_offset_ns
+        elif parsed.dt.tz is not None:
+            local_times = parsed.dt.tz_localize(None).to_numpy('datetime64[ns]').astype(np.int64)
+        else:
+            local_times = times
+        columns = {
+            name: chunk[name].to_numpy(dtype=np.float64)
+            for name in VALUE_COLUMNS if name in chunk.columns
+        }
+
+        order = np.argsort(times, kind='stable')
+        keep = order if self.last is None else order[times[order] > self.last['time']]
+        if not len(keep):
+            return
+        times, local_times = times[keep], local_times[keep]
+        columns = {name: values[keep] for name, values in columns.items()}
+
+        if self.first_ns is None:
+            self.first_ns = int(times[0])
+        self.samples += len(times)
+
+        self._update_errors(columns)
+        self._update_integrals(times, local_times, columns)
+
+        self.last = {
+            'time': int(times[-1]),
+            'local_time': int(local_times[-1]),
+            **{name: float(values[-1]) for name, values in columns.items()}
+        }
+
+    def _update_errors(self, columns: Dict[str, np.ndarray]):
+        """Add the tracking errors of a chunk to the histogram"""
+        if 'tracking_error' in columns:
+            error = np.abs(columns['tracking_error'])
+        elif all(name in columns for name in ANGLE_COLUMNS):
+            error = tracking_error(*(columns[name] for name in ANGLE_COLUMNS))
+        else:
+            return
+
+        valid = np.isfinite(error)
+        if 'sun_elevation' in columns:
+            valid &= columns['sun_elevation'] > 0
+        error = error[valid]
+
+        counts, _ = np.histogram(error, bins=self.edges)
+        self.counts += counts
+        self.overflow += int(np.count_nonzero(error > self.edges[-1]))
+        self.error_sum += float(error.sum())
+        self.error_sq_sum += float(np.square(error).sum())
+        self.error_max = max(self.error_max, float(error.max(initial=0.0)))
+        self.within_acceptance += int(np.count_nonzero(error <= self.acceptance_angle))
+
+    def _update_integrals(self, times: np.ndarray, local_times: np.ndarray, columns: Dict[str, np.ndarray]):
+        """Add the trapezoidal integrals of a chunk, joined to the previous one"""
+        if self.last is not None:
+            times = np.insert(times, 0, self.last['time'])
+            local_times = np.insert(local_times, 0, self.last['local_time'])
+            columns = {
+                name: np.insert(values, 0, self.last.get(name, np.nan))
+                for name, values in columns.items()
+            }
+        if len(times) < 2:
+            return
+
+        dt_ns = np.diff(times)
+        integrated = dt_ns <= self.max_gap_ns
+        dt = np.where(integrated, dt_ns / NS_PER_SECOND, 0.0)
+        self.integrated_seconds += float(dt.sum())
+        self.gap_seconds += float(dt_ns[~integrated].sum()) / NS_PER_SECOND
+
+        def integral(values: np.ndarray) -> np.ndarray:
+            return np.nan_to_num((values[:-1] + values[1:]) / 2) * dt
+
+        # Intervals belong to the local day they start in
+        days = local_times[:-1] // NS_PER_DAY
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        daily = np.zeros((len(unique_days), 2))
+
+        for position, name in enumerate(('power_tracked', 'power_fixed')):
+            if name in columns:
+                energy = integral(columns[name])
+                self.energy[name] += float(energy.sum())
+                daily[:, position] = np.bincount(day_index, weights=energy, minlength=len(unique_days))
+
+        for day, values in zip(unique_days.tolist(), daily):
+            self.daily[day] = self.daily.get(day, np.zeros(2)) + values
+
+        if 'dni' in columns:
+            dni_energy = integral(columns['dni'])
+            self.energy['dni'] += float(dni_energy.sum())
+
+            # Intervals that start and end at high DNI
+            high = (columns['dni'][:-1] >= config.CONC_MIN_DNI) & (columns['dni'][1:] >= config.CONC_MIN_DNI)
+            self.cpv_seconds += float(dt[high].sum())
+            self.cpv_dni += float(dni_energy[high].sum())
+            if 'power_tracked' in columns:
+                self.cpv_energy += float(integral(columns['power_tracked'])[high].sum())
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize everything processed so far
+
+        Returns:
+            Dictionary with the sample span, tracking error statistics and
+            histogram, energy totals and gain, daily energies and CPV
+            performance
+        """
+        evaluated = float(self.counts.sum() + self.overflow)
+        percentiles = {
+            f"error_p{q}": histogram_percentile(self.edges, self.counts, self.overflow, q)
+            for q in ERROR_PERCENTILES
+        }
+
+        tracked_kwh = self.energy['power_tracked'] / JOULES_PER_KWH
+        fixed_kwh = self.energy['power_fixed'] / JOULES_PER_KWH
+        accuracy = percentiles['error_p95']
+
+        gain = tracked_kwh / fixed_kwh if fixed_kwh > 0 else None
+        cpv_ratio = self.cpv_energy / self.cpv_dni if self.cpv_dni > 0 else None
+
+        # Trim the histogram to the occupied bins
+        occupied = np.flatnonzero(self.counts)
+        last_bin = int(occupied[-1]) + 1 if len(occupied) else 0
+
+        return {
+            'samples': self.samples,
+            'start': None if self.first_ns is None else pd.Timestamp(self.first_ns).isoformat(),
+            'end': None if self.last is None else pd.Timestamp(self.last['time']).isoformat(),
+            'integrated_hours': self.integrated_seconds / 3600,
+            'gap_hours': self.gap_seconds / 3600,
+            'error_samples': int(evaluated),
+            'error_mean': self.error_sum / evaluated if evaluated else None,
+            'error_rms': float(np.sqrt(self.error_sq_sum / evaluated)) if evaluated else None,
+            'error_max': self.error_max if evaluated else None,
+            **{key: (value if np.isfinite(value) else None) for key, value in percentiles.items()},
+            'error_overflow_fraction': self.overflow / evaluated if evaluated else None,
+            'tracking_accuracy': accuracy if np.isfinite(accuracy) else None,
+            'accuracy_limit': self.accuracy_limit,
+            'accuracy_passed': bool(accuracy <= self.accuracy_limit) if evaluated else None,
+            'error_histogram': {
+                'bin_width': config.TRACK_ERROR_BIN_DEG,
+                'counts': self.counts[:last_bin].astype(int).tolist()
+            },
+            'energy_tracked_kwh': tracked_kwh,
+            'energy_fixed_kwh': fixed_kwh,
+            'tracking_gain': gain,
+            'daily_energy': [
+                {
+                    'date': pd.Timestamp(day * NS_PER_DAY).date().isoformat(),
+                    'tracked_kwh': float(values[0]) / JOULES_PER_KWH,
+                    'fixed_kwh': float(values[1]) / JOULES_PER_KWH,
+                    'gain': float(values[0] / values[1]) if values[1] > 0 else None
+                }
+                for day, values in sorted(self.daily.items())
+            ],
+            'dni_kwh_m2': self.energy['dni'] / JOULES_PER_KWH,
+            'acceptance_angle': self.acceptance_angle,
+            'within_acceptance_fraction': self.within_acceptance / evaluated if evaluated else None,
+            'cpv_hours': self.cpv_seconds / 3600,
+            'cpv_power_per_dni': cpv_ratio  # W per W/m² (effective aperture, m²)
+        }
+
+
+def iter_log_chunks(path: Path, chunk_rows: int = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a tracker log in chunks of rows
+
+    Only the time column and known value columns are read.
+
+    Args:
+        path: CSV log file (may be compressed)
+        chunk_rows: Rows per chunk (defaults to TRACK_CHUNK_ROWS)
+
+    Yields:
+        DataFrames of at most chunk_rows rows
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in header if column in TIME_COLUMNS or column in VALUE_COLUMNS]
+
+    yield from pd.read_csv(
+        path,
+        usecols=usecols,
+        chunksize=chunk_rows or config.TRACK_CHUNK_ROWS,
+        dtype={column: np.float64 for column in usecols if column in VALUE_COLUMNS}
+    )
+
+
+def analyze_logs(
+    paths: Sequence[Path],
+    accuracy_limit: float = None,
+    acceptance_angle: float = None,
+    utc_offset_hours: float = None
+) -> Dict[str, Any]:
+    """
+    Stream tracker logs (in time order) through one analyzer
+
+    Args:
+        paths: CSV log files, e.g. one per month
+        accuracy_limit: Allowed 95th percentile tracking error (°)
+        acceptance_angle: CPV acceptance half-angle (°)
+        utc_offset_hours: Site offset from UTC for daily energy dates
+
+    Returns:
+        Summary dictionary (see TrackingAnalyzer.summary)
+    """
+    analyzer = TrackingAnalyzer(accuracy_limit, acceptance_angle, utc_offset_hours=utc_offset_hours)
+    for path in paths:
+        for chunk in iter_log_chunks(path):
+            analyzer.process(chunk)
+    return analyzer.summary()
+
+
+def analyze_execution_logs(
+    test_execution_id: int,
+    paths: Sequence[Path] = None,
+    save: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyze the outdoor logs of a TRACK-001 or CONC-001 execution
+
+    Logs are taken from paths, else raw_data['tracking_logs'], else the CSV
+    files among data_files. The accuracy limit comes from
+    input_data['tracking_accuracy'], the acceptance angle from
+    input_data['acceptance_angle'] and the site UTC offset from
+    input_data['utc_offset_hours'] when set.
+
+    Args:
+        test_execution_id: Test execution ID
+        paths: Explicit log files
+        save: Store the summary in processed_data['tracking']
+
+    Returns:
+        Summary dictionary, or None on error
+    """
+    try:
+        with get_db() as db:
+            test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+            if test is None:
+                return None
+            inputs = test.input_data or {}
+            if paths is None:
+                paths = (test.raw_data or {}).get('tracking_logs') or [
+                    path for path in (test.data_files or [])
+                    if Path(path).name.lower().endswith(('.csv', '.csv.gz'))
+                ]
+
+        if not paths:
+            return None
+
+        summary = analyze_logs(
+            paths,
+            inputs.get('tracking_accuracy'),
+            inputs.get('acceptance_angle'),
+            inputs.get('utc_offset_hours')
+        )
+
+        if save:
+            with get_db() as db:
+                test = db.query(TestExecution).filter(TestExecution.id == test_execution_id).first()
+                processed = dict(test.processed_data or {})
+                processed['tracking'] = summary
+                test.processed_data = processed
+
+        return summary
+
+    except Exception as e:
+        print(f"Error analyzing tracker logs: {e}")
+        return None
+
+
+def create_tracking_error_chart(summary: Dict[str, Any], title: str = "Tracking Error Distribution") -> go.Figure:
+    """
+    Create the tracking error histogram with its accuracy limit
+
+    Args:
+        summary: Result of analyze_logs
+        title: Chart title
+
+    Returns:
+        Plotly figure
+    """
+    histogram = summary['error_histogram']
+    counts = np.asarray(histogram['counts'], dtype=np.float64)
+    total = summary['error_samples'] or 1
+    centres = (np.arange(len(counts)) + 0.5) * histogram['bin_width']
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=centres, y=counts / total * 100, name='Samples'))
+
+    for key, label, color in (('error_p95', 'P95', 'orange'), ('accuracy_limit', 'Limit', 'red')):
+        if summary.get(key) is not None:
+            fig.add_vline(x=summary[key], line_dash='dash', line_color=color, annotation_text=label)
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Tracking Error (°)",
+        yaxis_title="Share of Samples (%)",
+        bargap=0,
+        template='plotly_white'
+    )
+
+    return fig
@@ -11,7 +11,12 @@ import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 import streamlit as st
 
+from config.settings import config
+from components.figure_cache import cached_figure
+from utils.downsampling import downsample_indices
 
+
+@cached_figure
 def create_iv_curve(
     voltage: List[float],
     current: List[float],
@@ -76,6 +81,7 @@ def create_iv_curve(
     return fig
 
 
+@cached_figure
 def create_pv_curve(
     voltage: List[float],
     power: List[float],
@@ -141,6 +147,12 @@ def create_pv_curve(
     return fig
 
 
+def _scatter_trace_class(n_points: int):
+    """Get the Plotly scatter class for a trace size (WebGL above threshold)"""
+    return go.Scattergl if n_points > config.CHART_WEBGL_THRESHOLD else go.Scatter
+
+
+@cached_figure
 def create_time_series_chart(
     timestamps: List,
     values: List[float],
@@ -148,11 +160,15 @@ def create_time_series_chart(
     y_label: str,
     setpoint: float = None,
     tolerance_upper: float = None,
-    tolerance_lower: float = None
+    tolerance_lower: float = None,
+    max_points: int = None
 ) -> go.Figure:
     """
     Create time series chart with optional setpoint and tolerance bands
 
+    Series longer than the point budget are reduced with LTTB, and constant
+    setpoint/tolerance levels are drawn as shapes rather than full traces.
+
     Args:
         timestamps: List of timestamps
         values: List of measurement values
@@ -161,53 +177,141 @@ def create_time_series_chart(
         setpoint: Target setpoint value
         tolerance_upper: Upper tolerance limit
         tolerance_lower: Lower tolerance limit
+        max_points: Point budget (defaults to config.CHART_MAX_POINTS)
 
     Returns:
         Plotly figure
     """
     fig = go.Figure()
 
+    max_points = max_points or config.CHART_MAX_POINTS
+    x = np.asarray(timestamps)
+    y = np.asarray(values, dtype=np.float64)
+
+    if len(y) > max_points:
+        idx = downsample_indices(x, y, max_points)
+        x, y = x[idx], y[idx]
+
+    trace_class = _scatter_trace_class(len(y))
+
     # Actual values
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=values,
-        mode='lines+markers',
+    fig.add_trace(trace_class(
+        x=x,
+        y=y,
+        mode='lines' if trace_class is go.Scattergl else 'lines+markers',
         name='Measured',
         line=dict(color='#1f77b4', width=2),
         marker=dict(size=4)
     ))
 
+    _add_limit_shapes(fig, setpoint, tolerance_upper, tolerance_lower)
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time",
+        yaxis_title=y_label,
+        hovermode='x unified',
+        height=400
+    )
+
+    return fig
+
+
+def _add_limit_shapes(
+    fig: go.Figure,
+    setpoint: float = None,
+    tolerance_upper: float = None,
+    tolerance_lower: float = None
+):
+    """Draw setpoint and tolerance band as shapes spanning the x-axis"""
+    # Tolerance band
+    if tolerance_upper is not None and tolerance_lower is not None:
+        fig.add_hrect(
+            y0=tolerance_lower,
+            y1=tolerance_upper,
+            fillcolor='rgba(255, 0, 0, 0.1)',
+            line_width=0,
+            layer='below'
+        )
+
+        for limit, label in [(tolerance_upper, 'Upper Limit'), (tolerance_lower, 'Lower Limit')]:
+            fig.add_hline(
+                y=limit,
+                line=dict(color='red', width=1, dash='dot'),
+                annotation_text=label,
+                annotation_position='right'
+            )
+
     # Setpoint line
     if setpoint is not None:
-        fig.add_trace(go.Scatter(
-            x=timestamps,
-            y=[setpoint] * len(timestamps),
-            mode='lines',
-            name='Setpoint',
-            line=dict(color='green', width=2, dash='dash')
-        ))
+        fig.add_hline(
+            y=setpoint,
+            line=dict(color='green', width=2, dash='dash'),
+            annotation_text='Setpoint',
+            annotation_position='left'
+        )
 
-    # Tolerance bands
-    if tolerance_upper is not None and tolerance_lower is not None:
-        fig.add_trace(go.Scatter(
-            x=timestamps,
-            y=[tolerance_upper] * len(timestamps),
-            mode='lines',
-            name='Upper Limit',
-            line=dict(color='red', width=1, dash='dot'),
-            showlegend=True
-        ))
 
-        fig.add_trace(go.Scatter(
-            x=timestamps,
-            y=[tolerance_lower] * len(timestamps),
-            mode='lines',
-            name='Lower Limit',
-            line=dict(color='red', width=1, dash='dot'),
-            fill='tonexty',
-            fillcolor='rgba(255, 0, 0, 0.1)',
-            showlegend=True
-        ))
+@cached_figure
+def create_envelope_chart(
+    timestamps: List,
+    mean: List[float],
+    minimum: List[float],
+    maximum: List[float],
+    title: str,
+    y_label: str,
+    setpoint: float = None,
+    tolerance_upper: float = None,
+    tolerance_lower: float = None
+) -> go.Figure:
+    """
+    Create time series chart of aggregated buckets (mean line, min/max band)
+
+    Args:
+        timestamps: Bucket start timestamps
+        mean: Bucket mean values
+        minimum: Bucket minimum values
+        maximum: Bucket maximum values
+        title: Chart title
+        y_label: Y-axis label
+        setpoint: Target setpoint value
+        tolerance_upper: Upper tolerance limit
+        tolerance_lower: Lower tolerance limit
+
+    Returns:
+        Plotly figure
+    """
+    trace_class = _scatter_trace_class(len(timestamps))
+
+    fig = go.Figure()
+
+    fig.add_trace(trace_class(
+        x=timestamps,
+        y=maximum,
+        mode='lines',
+        name='Max',
+        line=dict(color='rgba(31, 119, 180, 0.4)', width=0.5)
+    ))
+
+    fig.add_trace(trace_class(
+        x=timestamps,
+        y=minimum,
+        mode='lines',
+        name='Min',
+        line=dict(color='rgba(31, 119, 180, 0.4)', width=0.5),
+        fill='tonexty',
+        fillcolor='rgba(31, 119, 180, 0.2)'
+    ))
+
+    fig.add_trace(trace_class(
+        x=timestamps,
+        y=mean,
+        mode='lines',
+        name='Mean',
+        line=dict(color='#1f77b4', width=2)
+    ))
+
+    _add_limit_shapes(fig, setpoint, tolerance_upper, tolerance_lower)
 
     fig.update_layout(
         title=title,
@@ -220,9 +324,11 @@ def create_time_series_chart(
     return fig
 
 
+@cached_figure
 def create_degradation_chart(
     measurements: List[Dict[str, Any]],
-    title: str = "Power Degradation Over Time"
+    title: str = "Power Degradation Over Time",
+    max_points: int = None
 ) -> go.Figure:
     """
     Create degradation chart showing power loss over time
@@ -230,6 +336,7 @@ def create_degradation_chart(
     Args:
         measurements: List of measurement dictionaries with 'timestamp' and 'power'
         title: Chart title
+        max_points: Point budget (defaults to config.CHART_MAX_POINTS)
 
     Returns:
         Plotly figure
@@ -243,23 +350,30 @@ def create_degradation_chart(
     initial_power = df['power'].iloc[0]
     df['degradation_%'] = ((df['power'] - initial_power) / initial_power) * 100
 
+    max_points = max_points or config.CHART_MAX_POINTS
+    if len(df) > max_points:
+        df = df.iloc[downsample_indices(df['timestamp'], df['power'], max_points)]
+
+    trace_class = _scatter_trace_class(len(df))
+    mode = 'lines' if trace_class is go.Scattergl else 'lines+markers'
+
     fig = go.Figure()
 
     # Power over time
-    fig.add_trace(go.Scatter(
+    fig.add_trace(trace_class(
         x=df['timestamp'],
         y=df['power'],
-        mode='lines+markers',
+        mode=mode,
         name='Power',
         yaxis='y',
         line=dict(color='#1f77b4', width=2)
     ))
 
     # Degradation percentage
-    fig.add_trace(go.Scatter(
+    fig.add_trace(trace_class(
         x=df['timestamp'],
         y=df['degradation_%'],
-        mode='lines+markers',
+        mode=mode,
         name='Degradation %',
         yaxis='y2',
         line=dict(color='#ff7f0e', width=2)
@@ -288,6 +402,7 @@ def create_degradation_chart(
     return fig
 
 
+@cached_figure
 def create_heatmap(
     data: pd.DataFrame,
     title: str,
@@ -308,16 +423,19 @@ def create_heatmap(
     Returns:
         Plotly figure
     """
-    fig = go.Figure(data=go.Heatmap(
+    heatmap_args = dict(
         z=data.values,
         x=data.columns,
         y=data.index,
         colorscale=colorscale,
-        text=data.values,
-        texttemplate='%{text:.2f}',
-        textfont={"size": 10},
         colorbar=dict(title="Value")
-    ))
+    )
+
+    # Cell labels are unreadable (and slow to render) on large grids
+    if data.size <= config.HEATMAP_LABEL_MAX_CELLS:
+        heatmap_args.update(texttemplate='%{z:.2f}', textfont={"size": 10})
+
+    fig = go.Figure(data=go.Heatmap(**heatmap_args))
 
     fig.update_layout(
         title=title,
@@ -446,6 +564,7 @@ def create_box_plot(
     return fig
 
 
+@cached_figure
 def create_3d_surface_plot(
     x: np.ndarray,
     y: np.ndarray,
@@ -6,12 +6,13 @@ Centralized registry for all 54 testing protocols with auto-discovery.
 
 import json
 import importlib
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, field
 import streamlit as st
 
-from config.settings import config, PROTOCOLS_DIR
+from config.settings import config, PROTOCOLS_DIR, PROTOCOL_TEMPLATES_DIR
 
 
 @dataclass
@@ -369,6 +370,45 @@ def register_sample_protocols(registry: ProtocolRegistry):
         registry.register_protocol(metadata)
 
 
+@lru_cache(maxsize=None)
+def load_protocol_template(protocol_id: str) -> Dict[str, Any]:
+    """
+    Load a protocol JSON template (e.g. "PERF-001")
+
+    Args:
+        protocol_id: Protocol identifier
+
+    Returns:
+        Template dictionary, or an empty dictionary if not found
+    """
+    template_path = PROTOCOL_TEMPLATES_DIR / f"{protocol_id}.json"
+
+    try:
+        with open(template_path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error loading protocol template {template_path}: {e}")
+        return {}
+
+
+def get_template_parameter(protocol_id: str, name: str, default: Any = None) -> Any:
+    """
+    Get the default value of a protocol template test parameter
+
+    Args:
+        protocol_id: Protocol identifier
+        name: Parameter name
+        default: Value returned if the parameter is not defined
+
+    Returns:
+        Parameter default value
+    """
+    for parameter in load_protocol_template(protocol_id).get('test_parameters', []):
+        if parameter.get('name') == name:
+            return parameter.get('default', default)
+    return default
+
+
 # Cache protocol registry in Streamlit session
 @st.cache_resource
 def get_cached_protocol_registry() -> ProtocolRegistry:
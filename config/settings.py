@@ -18,6 +18,13 @@ DATA_DIR = PROJECT_ROOT / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
 STATIC_DIR = PROJECT_ROOT / "static"
 PROTOCOLS_DIR = PROJECT_ROOT / "protocols"
+PROTOCOL_TEMPLATES_DIR = PROJECT_ROOT / "templates" / "protocols"
+REFERENCE_DATA_DIR = DATA_DIR / "reference"  # Standard datasets (climates, spectra, ...)
+CLIMATE_PROFILES_DIR = REFERENCE_DATA_DIR / "climate"
+SPECTRA_DIR = REFERENCE_DATA_DIR / "spectra"  # Reference and simulator irradiance spectra
+SPECTRAL_RESPONSE_DIR = REFERENCE_DATA_DIR / "spectral_response"  # Reference device responses
+SUN_POSITION_DIR = REFERENCE_DATA_DIR / "sun_position"  # Hourly sun position and irradiance per site
+IMAGE_CACHE_DIR = DATA_DIR / "image_cache"  # Decoded .npy copies of uploaded images
 
 # Create directories if they don't exist
 for directory in [DATA_DIR, UPLOAD_DIR, STATIC_DIR]:
@@ -66,6 +73,117 @@ class AppConfig:
     REQUIRE_SUPERVISOR_APPROVAL: bool = True
     AUTO_SAVE_INTERVAL_SECONDS: int = 60
 
+    # QR code image cache
+    QR_MEMORY_CACHE_ITEMS: int = 512
+    QR_DISK_CACHE_MAX_MB: int = 200
+    QR_CODE_PREFIX: str = "PV:"  # Prefix of compact codes encoded in QR images
+    QR_LOOKUP_CACHE_ITEMS: int = 4096
+    QR_LOOKUP_CACHE_SECONDS: float = 60.0  # Max age of a cached scan resolution (e.g. deactivation lag)
+    QR_SCAN_FLUSH_SECONDS: float = 5.0  # Interval for folding scan events into counters
+    QR_SCAN_FLUSH_SIZE: int = 500  # Pending events that trigger an early flush
+    QR_SCAN_MAX_ATTEMPTS: int = 5  # Failed flushes before a code's scan events are dead-lettered
+
+    # Chart rendering
+    CHART_MAX_POINTS: int = 4000  # Point budget per time-series trace
+    CHART_WEBGL_THRESHOLD: int = 1000  # Use WebGL traces above this many points
+    FIGURE_CACHE_MAX_ITEMS: int = 256
+    FIGURE_CACHE_MAX_MB: int = 64
+    HEATMAP_LABEL_MAX_CELLS: int = 400  # Cell value labels only up to this grid size
+
+    # Time-series pyramid (bucket sizes in seconds; each must divide the next)
+    SERIES_PYRAMID_LEVELS: tuple = (10, 60, 600, 3600, 21600)
+
+    # Energy rating (IEC 61853-3 module temperature model, Faiman coefficients)
+    ENERGY_RATING_U0: float = 25.0  # W/(m²·K)
+    ENERGY_RATING_U1: float = 6.84  # W·s/(m³·K)
+
+    # Temperature coefficient stabilization (TEMP-001 / NOCT-001)
+    TEMPCO_STABILITY_WINDOW_SECONDS: float = 300.0
+    TEMPCO_STABILITY_MAX_RANGE: float = 1.0  # °C within the window
+
+    # Stabilization per IEC 61215-2 MQT 19: (Pmax - Pmin) / Pmean < x over
+    # the last STABILIZATION_WINDOW consecutive measurements
+    STABILIZATION_RELATIVE_CHANGE: float = 0.01
+    STABILIZATION_WINDOW: int = 3
+
+    # Thermal cycling profile checks (IEC 61215-2 MQT 11)
+    TC_TEMPERATURE_TOLERANCE: float = 2.0  # °C around temp_min/temp_max
+    TC_MAX_RAMP_RATE: float = 100.0  # °C/h
+    TC_RAMP_WINDOW_SECONDS: float = 300.0  # Least-squares window of the peak ramp rate
+
+    # Chamber setpoint compliance (HF-001/DH-001)
+    CHAMBER_MAX_GAP_SECONDS: float = 600.0  # Longer logging gaps are not judged
+    CHAMBER_MAX_EXCURSION_SECONDS: float = 900.0  # Longest allowed out-of-tolerance run
+    CHAMBER_COMPLIANCE_BATCH_SIZE: int = 50000  # TestData rows read per query
+
+    # Decoded EL/IR images under IMAGE_CACHE_DIR (least recently used are evicted)
+    IMAGE_CACHE_MAX_MB: int = 4096
+
+    # EL crack detection (CRACK-001, crack modes A/B/C per IEC TS 60904-13)
+    EL_CELL_ROWS: int = 6
+    EL_CELL_COLUMNS: int = 24  # 144 half-cut cells
+    EL_CRACK_CONTRAST: float = 0.2  # Dark-line depth relative to module brightness
+    EL_CRACK_MIN_FRACTION: float = 0.002  # Crack pixels per cell to report a crack
+    EL_INACTIVE_LEVEL: float = 0.35  # Relative brightness below which area is inactive
+    EL_DEGRADED_LEVEL: float = 0.7  # Relative brightness below which area is partly isolated
+    EL_MODE_AREA_FRACTION: float = 0.02  # Cell area fraction that makes a mode B/C crack
+    EL_CRACK_MODEL_PATH: str = os.getenv("EL_CRACK_MODEL_PATH", "")  # Optional ONNX classifier
+
+    # EL registration and defect progression
+    EL_REGISTRATION_TILES: int = 3  # Tiles per side matched for the affine fit
+    EL_PYRAMID_CACHE_ITEMS: int = 64
+    EL_PYRAMID_CACHE_MB: int = 512
+
+    # IR thermography (HOT-001 hot spots, BYPASS-001 thermal runaway)
+    IR_FRAME_RATE: float = 1.0  # Frames per second when a sequence has no time sidecar
+    IR_COUNTS_SCALE: float = 0.01  # K per count of integer radiometric frames
+    IR_COUNTS_OFFSET: float = -273.15  # °C at zero counts
+    IR_CHUNK_FRAMES: int = 256  # Frames read per step
+    IR_RUNAWAY_WINDOW_SECONDS: float = 300.0  # Trailing window of the heating rate
+    IR_RUNAWAY_RATE: float = 1.0  # °C/min that flags thermal runaway
+    IR_PROFILE_POINTS: int = 2000  # Stored points per region profile
+
+    # Photo defect segmentation (DELAM/SNAIL/SPONGE/CHALK) and thumbnails
+    SEGMENTATION_MAX_SIDE: int = 1024  # Photos are analyzed at most this large
+    SEGMENTATION_MAX_DEFECTS: int = 50  # Largest defects listed per photo
+    SEGMENTATION_CACHE_MAX_MB: int = 50
+    THUMBNAIL_SIZE: int = 256
+    PREVIEW_SIZE: int = 1280
+    THUMBNAIL_QUALITY: int = 80  # WebP quality of thumbnails and previews
+    THUMBNAIL_CACHE_MAX_MB: int = 500
+    THUMBNAIL_WORKERS: int = 4  # Background derivative threads
+    THUMBNAIL_HASH_CACHE_ITEMS: int = 8192  # Memoized photo content hashes
+
+    # Spectral mismatch (SPEC-001, IEC 60904-7); spectra are resampled to a
+    # common wavelength grid that must cover the responses of the devices
+    SPECTRAL_GRID_START: float = 300.0  # nm
+    SPECTRAL_GRID_END: float = 1200.0  # nm
+    SPECTRAL_GRID_STEP: float = 1.0  # nm
+    SPECTRAL_REFERENCE_SPECTRUM: str = "AM1.5G"  # IEC 60904-3 spectrum in SPECTRA_DIR
+    SPECTRAL_REFERENCE_DEVICE: str = os.getenv("SPECTRAL_REFERENCE_DEVICE", "reference_cell")
+
+    # Incidence angle modifier (IAM-001, IEC 61853-2) and annual angular losses
+    IAM_GLASS_EXTINCTION: float = 0.008  # K·L of the physical model (4 m⁻¹ × 2 mm glass)
+    IAM_MODULE_TILT: float = 30.0  # ° from horizontal
+    IAM_MODULE_AZIMUTH: float = 180.0  # ° clockwise from north
+    IAM_ALBEDO: float = 0.2
+    IAM_ANGLE_BIN: float = 0.5  # ° width of the angle-of-incidence histogram
+    IAM_LOSS_MODEL: str = "martin_ruiz"  # Fitted model used for angular losses
+
+    # Irradiance linearity (LIC-001, IEC 60904-10)
+    LIC_BIN_WIDTH: float = 25.0  # W/m² width of the irradiance bins
+    LIC_MAX_DEVIATION: float = 2.0  # % allowed deviation of Isc and Voc from their fits
+
+    # Tracker and CPV outdoor logs (TRACK-001 / CONC-001)
+    TRACK_CHUNK_ROWS: int = 200000  # Log rows read per step
+    TRACK_ERROR_BIN_DEG: float = 0.05  # Tracking error histogram bin width
+    TRACK_ERROR_MAX_DEG: float = 20.0  # Larger errors go to an overflow bin
+    TRACK_ACCURACY_LIMIT: float = 5.0  # ° allowed 95th percentile tracking error
+    TRACK_MAX_GAP_SECONDS: float = 60.0  # Longer logging gaps are not integrated
+    TRACK_UTC_OFFSET_HOURS: float = None  # Site offset for daily energy dates; None keeps log wall-clock dates
+    CONC_ACCEPTANCE_ANGLE: float = 1.0  # ° CPV acceptance half-angle
+    CONC_MIN_DNI: float = 700.0  # W/m² DNI for CPV performance samples
+
     # Export settings
     EXPORT_FORMATS: list = None
     PDF_LOGO_PATH: Optional[Path] = STATIC_DIR / "images" / "logo.png"
@@ -406,12 +406,74 @@ class TestData(Base):
     __table_args__ = (
         Index('idx_test_data_execution', 'test_execution_id'),
         Index('idx_test_data_type', 'measurement_type'),
+        Index('idx_test_data_series', 'test_execution_id', 'measurement_type', 'timestamp'),
     )
 
     def __repr__(self):
         return f"<TestData(type='{self.measurement_type}', value={self.value})>"
 
 
+class SeriesAggregate(Base):
+    """Time-series pyramid model - min/max/mean of TestData per time bucket and resolution"""
+    __tablename__ = "series_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Series identification
+    test_execution_id = Column(Integer, ForeignKey("test_executions.id"), nullable=False)
+    measurement_type = Column(String(100), nullable=False)
+
+    # Resolution and bucket
+    bucket_seconds = Column(Integer, nullable=False)  # Pyramid level
+    bucket_start = Column(DateTime, nullable=False)
+
+    # Aggregates
+    count = Column(Integer, nullable=False)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    mean_value = Column(Float)
+
+    __table_args__ = (
+        Index(
+            'idx_series_aggregate_lookup',
+            'test_execution_id', 'measurement_type', 'bucket_seconds', 'bucket_start'
+        ),
+    )
+
+    def __repr__(self):
+        return f"<SeriesAggregate(type='{self.measurement_type}', level={self.bucket_seconds}s)>"
+
+
+class ChamberExcursion(Base):
+    """Chamber excursion model - contiguous run of TestData outside setpoint ± tolerance"""
+    __tablename__ = "chamber_excursions"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Series identification
+    test_execution_id = Column(Integer, ForeignKey("test_executions.id"), nullable=False)
+    measurement_type = Column(String(100), nullable=False)
+
+    # Excursion extent
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)  # Time the value returned within tolerance
+    duration_seconds = Column(Float, nullable=False)
+    sample_count = Column(Integer)
+
+    # Severity
+    direction = Column(String(10))  # high, low
+    peak_deviation = Column(Float)  # Largest distance beyond the tolerance limit
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_chamber_excursion_series', 'test_execution_id', 'measurement_type', 'start_time'),
+    )
+
+    def __repr__(self):
+        return f"<ChamberExcursion(type='{self.measurement_type}', {self.duration_seconds:.0f}s)>"
+
+
 class AuditLog(Base):
     """Audit trail model - tracks all system changes"""
     __tablename__ = "audit_logs"
@@ -450,6 +512,37 @@ class AuditLog(Base):
         return f"<AuditLog(action='{self.action}', table='{self.table_name}')>"
 
 
+class FieldChange(Base):
+    """Field-level change history - one row per modified field of an audited update"""
+    __tablename__ = "field_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Source audit entry
+    audit_log_id = Column(Integer, ForeignKey("audit_logs.id"))
+
+    # What was changed
+    entity_type = Column(String(50), nullable=False)  # table name of the entity
+    entity_id = Column(Integer, nullable=False)
+    field_name = Column(String(100), nullable=False)
+
+    # Change details
+    old_value = Column(JSON)
+    new_value = Column(JSON)
+
+    # Who and when
+    user_id = Column(Integer, ForeignKey("users.id"))
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_field_change_entity_field', 'entity_type', 'entity_id', 'field_name'),
+        Index('idx_field_change_changed', 'changed_at'),
+    )
+
+    def __repr__(self):
+        return f"<FieldChange(entity='{self.entity_type}:{self.entity_id}', field='{self.field_name}')>"
+
+
 class QRCode(Base):
     """QR code mapping model - links QR codes to samples/equipment"""
     __tablename__ = "qr_codes"
@@ -481,3 +574,22 @@ class QRCode(Base):
 
     def __repr__(self):
         return f"<QRCode(code='{self.qr_code}', type='{self.entity_type}')>"
+
+
+class QRScanEvent(Base):
+    """QR scan event model - one row per scan, for usage analytics"""
+    __tablename__ = "qr_scan_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    qr_code_id = Column(Integer, ForeignKey("qr_codes.id"), nullable=False)
+    scanned_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    scanned_by_id = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (
+        Index('idx_qr_scan_code_time', 'qr_code_id', 'scanned_at'),
+        Index('idx_qr_scan_time', 'scanned_at'),
+    )
+
+    def __repr__(self):
+        return f"<QRScanEvent(qr_code_id={self.qr_code_id}, scanned_at='{self.scanned_at}')>"
@@ -17,6 +17,7 @@ from config.settings import setup_page_config
 from config.database import get_db
 from components.navigation import render_header, render_sidebar_navigation
 from components.qr_generator import render_qr_code_generator_ui, get_qr_generator
+from components.thumbnails import get_gallery, save_uploaded_photos
 from database.models import IncomingInspection, ServiceRequest, InspectionStatus
 
 # Page configuration
@@ -200,6 +201,7 @@ def render_new_inspection_form():
                     'weight_kg': weight_kg if weight_kg > 0 else None,
                     'status': status,
                     'passed': (passed == "Passed"),
+                    'photos': save_uploaded_photos(photos, inspection_number) if photos else None,
                     'remarks': remarks,
                     'inspector_id': 1,  # Demo user
                     'inspection_date': datetime.utcnow()
@@ -263,6 +265,10 @@ def render_inspections_list():
                     if insp.remarks:
                         st.markdown(f"**Remarks:** {insp.remarks}")
 
+                    if insp.photos:
+                        thumbnails = [str(path) for path in get_gallery(insp.photos) if path]
+                        st.image(thumbnails, width=120)
+
     except Exception as e:
         st.error(f"Error loading inspections: {str(e)}")
 
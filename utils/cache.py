@@ -0,0 +1,311 @@
+"""
+Cache Utilities - In-memory LRU and content-addressed disk storage
+==================================================================
+Shared caching primitives for generated artifacts (QR images, figures,
+image derivatives) keyed by a hash of their inputs.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def content_hash(*parts: Any) -> str:
+    """
+    Compute a stable SHA-256 hex digest over the given parts
+
+    Args:
+        parts: Values to hash (bytes are hashed as-is, others via str())
+
+    Returns:
+        64-character hexadecimal digest
+    """
+    digest = hashlib.sha256()
+
+    for part in parts:
+        if not isinstance(part, (bytes, bytearray, memoryview)):
+            part = str(part).encode('utf-8')
+        digest.update(part)
+        digest.update(b'\x1f')  # Separator so ('ab', 'c') != ('a', 'bc')
+
+    return digest.hexdigest()
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's contents
+
+    Args:
+        path: File to hash
+        chunk_size: Read size in bytes
+
+    Returns:
+        64-character hexadecimal digest
+    """
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by item count and bytes
+
+    Values are sized with len() when they support it; other values count
+    as zero bytes and are bounded by max_items only. With ttl set, entries
+    older than ttl seconds are treated as missing.
+    """
+
+    def __init__(self, max_items: int = 256, max_bytes: int = None, ttl: float = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value and mark it as recently used"""
+        with self._lock:
+            if key in self._data and self.ttl is not None and self._expires[key] <= time.monotonic():
+                self._remove(key)
+
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting least-recently-used entries as needed"""
+        try:
+            size = len(value)
+        except TypeError:
+            size = 0
+
+        with self._lock:
+            if key in self._data:
+                self._total_bytes -= self._sizes[key]
+
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self._total_bytes += size
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+
+            while self._data and (
+                len(self._data) > self.max_items or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove a value from the cache"""
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def _remove(self, key: str) -> Any:
+        """Drop an entry (lock held)"""
+        self._total_bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
+        return self._data.pop(key)
+
+    def clear(self):
+        """Remove all entries and reset statistics"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'items': len(self._data),
+            'bytes': self._total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class ContentAddressedStore:
+    """
+    Size-bounded on-disk store of files named by their content key
+
+    Files are written as <key><suffix> under the store directory. When the
+    total size exceeds max_bytes, the least recently used files are deleted.
+    Only files whose names look like store keys are managed, so the store
+    can share a directory with other files.
+    """
+
+    _KEY_PATTERN = re.compile(r'^[0-9a-f]{16,128}$')
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ''):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index: OrderedDict = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        """Index existing files, ordered by last access"""
+        entries = []
+
+        for path in self.directory.glob(f"*{self.suffix}"):
+            key = path.name[:len(path.name) - len(self.suffix)] if self.suffix else path.name
+            if not self._KEY_PATTERN.match(key):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def path_for(self, key: str) -> Path:
+        """Get the file path for a key"""
+        return self.directory / f"{key}{self.suffix}"
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read stored content
+
+        Args:
+            key: Content key
+
+        Returns:
+            File bytes or None if not stored
+        """
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+
+        path = self.path_for(key)
+        try:
+            content = path.read_bytes()
+            os.utime(path)  # Persist recency for the next index load
+            return content
+        except OSError:
+            self._forget(key)
+            return None
+
+    def touch(self, key: str) -> Optional[Path]:
+        """
+        Mark stored content as recently used without reading it
+
+        Args:
+            key: Content key
+
+        Returns:
+            Path of the stored file or None if not stored
+        """
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            return path
+        except OSError:
+            self._forget(key)
+            return None
+
+    def put(self, key: str, content: bytes) -> Path:
+        """
+        Store content under a key, evicting old files if over budget
+
+        Args:
+            key: Content key
+            content: Bytes to store
+
+        Returns:
+            Path of the stored file
+        """
+        path = self.path_for(key)
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+                return path
+
+        # Write atomically so concurrent readers never see partial files
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = len(content)
+                self._total_bytes += len(content)
+            self._index.move_to_end(key)
+            self._evict()
+
+        return path
+
+    def _forget(self, key: str):
+        """Drop a key from the index"""
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        """Delete least recently used files until within budget (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        return {
+            'files': len(self._index),
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,172 @@
+"""
+Downsampling Utilities - Point reduction for large time-series charts
+=====================================================================
+Largest-Triangle-Three-Buckets (LTTB) and min/max bucket reduction in NumPy.
+All functions return indices into the input so callers can slice any
+aligned arrays (timestamps, other series) without converting them.
+"""
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def to_numeric_axis(x: Sequence) -> np.ndarray:
+    """
+    Convert an x-axis (numbers, datetimes, timestamp strings) to float64
+
+    Datetimes are converted to nanoseconds since the epoch.
+
+    Args:
+        x: Axis values
+
+    Returns:
+        float64 array of the same length
+    """
+    arr = np.asarray(x)
+
+    if np.issubdtype(arr.dtype, np.number):
+        return arr.astype(np.float64)
+
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+
+    return pd.to_datetime(pd.Series(x)).to_numpy('datetime64[ns]').astype(np.int64).astype(np.float64)
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Select the minimum and maximum of each of n_out // 2 equal buckets
+
+    Preserves every peak and trough at bucket resolution, which makes it a
+    good fast pre-selection for LTTB on very long series.
+
+    Args:
+        y: Values (must be finite)
+        n_out: Target number of points
+
+    Returns:
+        Sorted unique indices (at most n_out, plus first and last point)
+    """
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+
+    if n <= n_out:
+        return np.arange(n)
+
+    bucket_size = -(-n // n_buckets)  # ceil division
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, bucket_size)
+
+    # Buckets at the end can be entirely padding when n is small
+    valid = ~np.all(np.isnan(padded), axis=1)
+    padded = padded[valid]
+    offsets = np.flatnonzero(valid) * bucket_size
+
+    mins = np.nanargmin(padded, axis=1) + offsets
+    maxs = np.nanargmax(padded, axis=1) + offsets
+
+    return np.unique(np.concatenate(([0], mins, maxs, [n - 1])))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Select n_out points with the Largest-Triangle-Three-Buckets algorithm
+
+    The first and last points are always kept. Each inner bucket keeps the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves the visual shape.
+
+    Args:
+        x: Monotonic numeric x values (float64)
+        y: Values (must be finite)
+        n_out: Target number of points (>= 3)
+
+    Returns:
+        Sorted indices of length min(n_out, len(x))
+    """
+    n = len(x)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Relative x keeps float precision for epoch-nanosecond timestamps
+    x = x - x[0]
+
+    n_buckets = n_out - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+    # Bucket averages from cumulative sums (one pass, no per-bucket mean)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+
+    # The bucket after the last inner bucket is the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for k in range(n_buckets):
+        lo, hi = edges[k], max(edges[k + 1], edges[k] + 1)
+        ax, ay = x[a], y[a]
+        areas = np.abs(
+            (ax - next_x[k]) * (y[lo:hi] - ay) -
+            (ax - x[lo:hi]) * (next_y[k] - ay)
+        )
+        a = lo + int(np.argmax(areas))
+        selected[k + 1] = a
+
+    return selected
+
+
+def downsample_indices(
+    x: Sequence,
+    y: Sequence,
+    max_points: int,
+    method: str = "lttb"
+) -> np.ndarray:
+    """
+    Choose which points of a series to plot within a point budget
+
+    Non-finite values are skipped. For very long series LTTB runs on a
+    min/max pre-selection so the cost stays proportional to the budget.
+
+    Args:
+        x: X values (numeric or datetime-like)
+        y: Y values
+        max_points: Maximum number of points to keep
+        method: "lttb" or "minmax"
+
+    Returns:
+        Sorted indices into the original series
+    """
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(y))
+
+    if len(finite) <= max_points:
+        return finite
+
+    y_finite = y[finite]
+
+    if method == "minmax":
+        return finite[minmax_indices(y_finite, max_points)]
+
+    if method != "lttb":
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    x_finite = to_numeric_axis(x)[finite]
+    candidates = np.arange(len(finite))
+
+    if len(finite) > 8 * max_points:
+        candidates = minmax_indices(y_finite, 4 * max_points)
+
+    chosen = lttb_indices(x_finite[candidates], y_finite[candidates], max_points)
+    return finite[candidates[chosen]]
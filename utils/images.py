@@ -0,0 +1,204 @@
+"""
+Image Utilities - Memory-mapped image loading, filters and labeling
+===================================================================
+Helpers shared by the EL, IR and photo analyses. Images are decoded once
+to .npy under IMAGE_CACHE_DIR and memory-mapped afterwards, so repeated
+analyses and worker processes read the same pixels without decoding or
+pickling them again. The decoded copies are bounded by IMAGE_CACHE_MAX_MB;
+least recently used ones are deleted and decoded again when needed.
+"""
+
+import io
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from config.settings import IMAGE_CACHE_DIR, config
+from utils.cache import ContentAddressedStore, file_hash
+
+
+# Source file (path, mtime, size) -> content hash of the file
+_array_keys: Dict[Tuple[str, float, int], str] = {}
+_array_keys_lock = threading.Lock()
+
+_image_store = None
+
+
+def get_image_store() -> ContentAddressedStore:
+    """Get or create the global store of decoded images"""
+    global _image_store
+    if _image_store is None:
+        _image_store = ContentAddressedStore(
+            IMAGE_CACHE_DIR,
+            max_bytes=config.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+            suffix='.npy'
+        )
+    return _image_store
+
+
+def decode_image(path: Path) -> np.ndarray:
+    """
+    Decode an image file to a 2-D array, keeping 16-bit depth
+
+    Args:
+        path: Image file (.npy, or any format Pillow reads: TIFF, PNG, ...)
+
+    Returns:
+        Array of the first channel/frame (uint16 for 16-bit images)
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.npy':
+        return np.load(path)
+
+    from PIL import Image
+
+    with Image.open(path) as img:
+        if img.mode in ('I;16', 'I;16B', 'I;16L', 'I', 'F'):
+            array = np.asarray(img)
+        else:
+            array = np.asarray(img.convert('L'))
+
+    if array.dtype.byteorder == '>':
+        array = array.astype(array.dtype.newbyteorder('<'))
+    return array
+
+
+def array_path(path: Path) -> Path:
+    """
+    Get a memory-mappable .npy path holding an image's pixels
+
+    .npy files are used directly; other formats are decoded once into the
+    image store under the hash of their contents. The returned file may be
+    evicted later, so callers should not keep the path beyond one analysis.
+
+    Args:
+        path: Image file
+
+    Returns:
+        Path of the .npy file
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.npy':
+        return path
+
+    stat = path.stat()
+    source_key = (str(path.resolve()), stat.st_mtime, stat.st_size)
+
+    with _array_keys_lock:
+        key = _array_keys.get(source_key)
+    if key is None:
+        key = file_hash(path)
+        with _array_keys_lock:
+            _array_keys[source_key] = key
+
+    store = get_image_store()
+    cached = store.touch(key)
+    if cached is None:
+        buffer = io.BytesIO()
+        np.save(buffer, decode_image(path))
+        cached = store.put(key, buffer.getbuffer())
+    return cached
+
+
+def load_image(path: Path, mmap: bool = True) -> np.ndarray:
+    """
+    Load an image as a 2-D array
+
+    Args:
+        path: Image file
+        mmap: Memory-map the pixels read-only instead of reading them
+
+    Returns:
+        Image array (a read-only np.memmap when mmap is True)
+    """
+    mmap_mode = 'r' if mmap else None
+    try:
+        return np.load(array_path(path), mmap_mode=mmap_mode)
+    except FileNotFoundError:
+        # Evicted by another writer between lookup and load
+        return np.load(array_path(path), mmap_mode=mmap_mode)
+
+
+def _box_mean_axis(image: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Mean over a clipped window of `size` samples along one axis"""
+    length = image.shape[axis]
+    table = np.zeros(image.shape[:axis] + (length + 1,) + image.shape[axis + 1:], dtype=np.float64)
+    np.cumsum(image, axis=axis, out=table[(slice(None),) * axis + (slice(1, None),)])
+
+    positions = np.arange(length) - size // 2
+    low, high = np.clip(positions, 0, length), np.clip(positions + size, 0, length)
+
+    sums = np.take(table, high, axis=axis) - np.take(table, low, axis=axis)
+    counts = (high - low).reshape((-1,) + (1,) * (image.ndim - axis - 1))
+    return (sums / counts).astype(np.float32)
+
+
+def box_filter(image: np.ndarray, size: int) -> np.ndarray:
+    """
+    Mean over a size x size window around each pixel (separable running sums)
+
+    Windows are clipped at the image border, so edge pixels average over
+    fewer neighbours rather than over padding.
+
+    Args:
+        image: 2-D array
+        size: Window size in pixels (odd sizes are centred)
+
+    Returns:
+        float32 array of the image's shape
+    """
+    size = max(int(size), 1)
+    if size == 1:
+        return np.asarray(image, dtype=np.float32)
+
+    return _box_mean_axis(_box_mean_axis(image, size, 0), size, 1)
+
+
+def label_components(mask: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Label 4-connected components of a boolean mask
+
+    Union-find by repeated hooking of neighbouring roots to the smaller
+    index and pointer jumping; converges in a logarithmic number of
+    vectorized rounds.
+
+    Args:
+        mask: 2-D boolean array
+
+    Returns:
+        Tuple of (int32 labels with 0 as background and 1..n per component, n)
+    """
+    height, width = mask.shape
+    flat = np.ascontiguousarray(mask).ravel()
+    parent = np.arange(flat.size)
+
+    index = np.arange(flat.size - 1)
+    right = np.flatnonzero(flat[:-1] & flat[1:] & (index % width != width - 1))
+    down = np.flatnonzero(flat[:-width] & flat[width:])
+    a = np.concatenate([right, down])
+    b = np.concatenate([right + 1, down + width])
+
+    while len(a):
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        root_a, root_b = root_a[differ], root_b[differ]
+        low = np.minimum(root_a, root_b)
+        np.minimum.at(parent, np.maximum(root_a, root_b), low)
+
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        a, b = a[differ], b[differ]
+
+    labels = np.zeros(flat.size, dtype=np.int32)
+    members = np.flatnonzero(flat)
+    roots, inverse = np.unique(parent[members], return_inverse=True)
+    labels[members] = inverse + 1
+
+    return labels.reshape(height, width), len(roots)
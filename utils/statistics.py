@@ -0,0 +1,271 @@
+"""
+Statistics Utilities - Vectorized regression and rolling statistics
+===================================================================
+Grouped least-squares fits computed for many samples at once with
+np.bincount, trailing-window slopes from cumulative sums, Student-t
+quantiles without SciPy, and an O(1) rolling window for streaming
+measurements.
+"""
+
+import math
+from collections import deque
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+def t_quantile(p: float, dof) -> np.ndarray:
+    """
+    Quantile of Student's t distribution
+
+    Exact for 1 and 2 degrees of freedom, Cornish-Fisher expansion
+    otherwise (within 0.2% for dof >= 3 at usual confidence levels).
+
+    Args:
+        p: Probability (e.g. 0.975 for a two-sided 95% interval)
+        dof: Degrees of freedom (scalar or array)
+
+    Returns:
+        Quantile(s) as float64 array; NaN where dof < 1
+    """
+    v = np.asarray(dof, dtype=np.float64)
+    z = NormalDist().inv_cdf(p)
+
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = z + g1 / v + g2 / v ** 2 + g3 / v ** 3 + g4 / v ** 4
+
+    t = np.where(v == 1, math.tan(math.pi * (p - 0.5)), t)
+    t = np.where(v == 2, (2 * p - 1) / math.sqrt(2 * p * (1 - p)), t)
+    return np.where(v >= 1, t, np.nan)
+
+
+def grouped_linear_regression(
+    x: Sequence[float],
+    y: Sequence[float],
+    groups: Sequence[int] = None,
+    n_groups: int = None,
+    confidence: float = 0.95
+) -> Dict[str, np.ndarray]:
+    """
+    Ordinary least-squares line fit for every group in one pass
+
+    Sums are accumulated per group with np.bincount on centered values, so
+    thousands of groups cost about as much as one fit over all points.
+
+    Args:
+        x: Predictor values
+        y: Response values
+        groups: Integer group index per point (0..n_groups-1); one group if None
+        n_groups: Number of groups (defaults to max(groups) + 1)
+        confidence: Confidence level of the returned intervals
+
+    Returns:
+        Dictionary of arrays (one entry per group): 'slope', 'intercept',
+        'slope_ci' and 'intercept_ci' (half-widths), 'slope_se', 'r_squared',
+        'n', 'x_mean', 'sxx' and 'residual_variance'. Groups with fewer than
+        two points are NaN; fewer than three give NaN intervals.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    groups = np.zeros(len(x), dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y, groups = x[finite], y[finite], groups[finite]
+
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+
+    n = np.bincount(groups, minlength=n_groups).astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(groups, weights=x, minlength=n_groups) / n
+        y_mean = np.bincount(groups, weights=y, minlength=n_groups) / n
+
+        dx = x - x_mean[groups]
+        dy = y - y_mean[groups]
+        sxx = np.bincount(groups, weights=dx * dx, minlength=n_groups)
+        sxy = np.bincount(groups, weights=dx * dy, minlength=n_groups)
+        syy = np.bincount(groups, weights=dy * dy, minlength=n_groups)
+
+        slope = np.where(n >= 2, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+
+        dof = n - 2
+        sse = np.clip(syy - slope * sxy, 0, None)
+        residual_variance = np.where(dof > 0, sse / dof, np.nan)
+        slope_se = np.sqrt(residual_variance / sxx)
+        intercept_se = np.sqrt(residual_variance * (1 / n + x_mean ** 2 / sxx))
+        r_squared = np.where(syy > 0, 1 - sse / syy, np.nan)
+
+    t = t_quantile(0.5 + confidence / 2, dof)
+
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'slope_se': slope_se,
+        'slope_ci': t * slope_se,
+        'intercept_ci': t * intercept_se,
+        'r_squared': r_squared,
+        'n': n.astype(np.int64),
+        'x_mean': x_mean,
+        'sxx': sxx,
+        'residual_variance': residual_variance
+    }
+
+
+def rolling_slope(
+    t: Sequence[float],
+    y: np.ndarray,
+    window: float
+) -> Dict[str, np.ndarray]:
+    """
+    Least-squares slope of y over the trailing time window of every sample
+
+    Window sums come from cumulative sums, so the cost is O(n) for any
+    window length. Several series sharing the time axis can be passed as
+    the columns of y.
+
+    Args:
+        t: Sample times (ascending)
+        y: Values, shape (n,) or (n, k)
+        window: Window length in the units of t (samples with
+            t[i] - t[j] <= window are included)
+
+    Returns:
+        Dictionary with slope (shape of y, NaN with fewer than two distinct
+        times), count and span (time covered) per sample
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(t) == 0:
+        return {'slope': y.copy(), 'count': np.zeros(0, dtype=np.int64), 'span': np.zeros(0)}
+
+    start = np.searchsorted(t, t - window, side='left')
+    end = np.arange(1, len(t) + 1)
+
+    # Shift for numerically stable sums
+    tc = t - t[0]
+    yc = y - y[0]
+    expand = (slice(None),) + (None,) * (y.ndim - 1)
+
+    def window_sum(values):
+        cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+        return cumulative[end] - cumulative[start]
+
+    n = (end - start).astype(np.float64)
+    sum_t, sum_tt = window_sum(tc), window_sum(tc * tc)
+    sum_y, sum_ty = window_sum(yc), window_sum(tc[expand] * yc)
+
+    denominator = n * sum_tt - sum_t * sum_t
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n[expand] * sum_ty - sum_t[expand] * sum_y) / denominator[expand]
+    slope = np.where((denominator > 0)[expand], slope, np.nan)
+
+    return {'slope': slope, 'count': end - start, 'span': t - t[start]}
+
+
+class RollingWindow:
+    """
+    Time-based rolling window with O(1) amortized updates
+
+    Keeps running sums for mean and variance and monotonic deques for the
+    minimum and maximum, so no sample is visited more than twice.
+    """
+
+    def __init__(self, window: float):
+        """
+        Args:
+            window: Window length in the units of the sample times
+        """
+        self.window = window
+        self._samples: deque = deque()
+        self._min: deque = deque()
+        self._max: deque = deque()
+        self._shift: Optional[float] = None  # Offset for numerically stable sums
+        self._pushed = 0  # Sequence number of the next sample
+        self._evicted = 0  # Sequence number of the oldest sample in the window
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def push(self, t: float, value: float):
+        """Add a sample and drop those older than the window"""
+        if self._shift is None:
+            self._shift = value
+
+        shifted = value - self._shift
+        self._samples.append((t, value))
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+
+        sequence = self._pushed
+        self._pushed += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((sequence, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((sequence, value))
+
+        while self._samples and t - self._samples[0][0] > self.window:
+            _, old_value = self._samples.popleft()
+            old_shifted = old_value - self._shift
+            self._sum -= old_shifted
+            self._sum_sq -= old_shifted * old_shifted
+            if self._min[0][0] == self._evicted:
+                self._min.popleft()
+            if self._max[0][0] == self._evicted:
+                self._max.popleft()
+            self._evicted += 1
+
+    def reset(self):
+        """Remove all samples"""
+        self.__init__(self.window)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    @property
+    def span(self) -> float:
+        """Time between the oldest and newest sample in the window"""
+        if not self._samples:
+            return 0.0
+        return self._samples[-1][0] - self._samples[0][0]
+
+    @property
+    def mean(self) -> float:
+        if not self._samples:
+            return math.nan
+        return self._shift + self._sum / len(self._samples)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation"""
+        n = len(self._samples)
+        if n < 2:
+            return math.nan
+        variance = (self._sum_sq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self._max else math.nan
+
+    @property
+    def range(self) -> float:
+        return self.max - self.min if self._samples else math.nan
+
+    @property
+    def first(self) -> Optional[tuple]:
+        """Oldest (time, value) sample in the window"""
+        return self._samples[0] if self._samples else None